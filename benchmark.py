@@ -0,0 +1,751 @@
+#!/usr/bin/env python3
+
+## @file benchmark.py
+#  @brief Mikro-Benchmarks für die BYMY-Prozesse (lokal, ohne echte Peers)
+#  @details
+#  Aufruf: python3 benchmark.py <name> [Optionen]
+#  Lasttests mit echten Prozessen (Discovery + N Peers): siehe loadgen.py.
+#  Struktur & Ablauf:
+#   1) Hilfsfunktionen (Zeitmessung, Ausgabe)
+#   2) bench_ipc – Nachrichten/s zwischen zwei Prozessen: FIFO pro Nachricht vs. IpcChannel
+#   3) bench_transfer – Bilddurchsatz über Loopback (sendfile → recv_into/Temp-Datei)
+#   4) bench_registry – WHO-Lookup & KNOWNUSERS-Seiten mit 10k simulierten Peers
+#   5) bench_membership – Bytes & Verarbeitungszeit: volle KNOWNUSERS-Liste vs. DELTA seit Epoche
+#   6) bench_fanout – Fan-out an viele Peers: Socket pro Nachricht vs. send_batch
+#   7) bench_fileindex – "send <bild>": os.walk pro Suche vs. FileIndex-Präfixsuche
+#   8) bench_config – get_config_value: toml.load pro Aufruf vs. mtime-Cache
+#   9) bench_offline – Offline-Nachrichten: open/append/close pro Nachricht vs. OfflineStore
+#  10) bench_history – Verlauf: record, /search & Scrollback über args.count Nachrichten
+#  11) bench_metrics – Empfangsschleife (recvfrom + handle_datagram), Metriken aus vs. an
+#  12) bench_reliable – Zustellung bei Paketverlust: MSG vs. Stop-and-Wait vs. Schiebefenster
+#  13) bench_compression – Bytes auf der Leitung & Transferzeit: roh vs. zlib vs. lzma
+#      (Text, unkomprimiertes Bild, bereits komprimierte Daten)
+#  14) bench_burst – Datagramm-Stoß bei hängender CLI: Verarbeitung im Empfangsthread
+#      vs. Ring aus receive_ring.py (Kernel-Verluste, Ring-Verluste, zugestellt)
+#  15) bench_peers – Teilnehmerliste für die CLI: KNOWNUSERS-Text erzeugen & parsen
+#      vs. gemeinsame Tabelle (peer_table.py) schreiben & lesen
+#  16) bench_render – Eingabelatenz am "> "-Prompt, CPU & Terminal-Bytes bei eingehendem
+#      Stoß (MSG bzw. JOIN): print pro Zeile vs. renderer.py
+#  17) bench_joinstorm – args.storm Peers starten gleichzeitig: Datagramme von Discovery,
+#      jede Änderung einzeln vs. gesammelte DELTA-Ankündigungen vs. zusätzlich Token-Bucket
+#  18) main – Auswahl des Benchmarks per Kommandozeile
+
+import os, sys, time, socket, resource, tempfile, argparse, threading, multiprocessing
+
+RESET = "\033[0m"; CYAN = "\033[96m"; GREEN = "\033[92m"
+
+## 1) Gibt ein Ergebnis einheitlich aus.
+#  @param label Bezeichnung der Messung.
+#  @param count Anzahl verarbeiteter Einheiten.
+#  @param seconds Gemessene Dauer.
+#  @param unit Einheit (z.B. "msg").
+def report(label, count, seconds, unit="msg"):
+    rate = count / seconds if seconds > 0 else float("inf")
+    print(f"{CYAN}{label:<40}{RESET} {count:>8} {unit} in {seconds:7.3f}s  → {GREEN}{rate:12.0f} {unit}/s{RESET}")
+
+## @brief Liefert einen freien lokalen Port p, bei dem auch p + 1 frei ist (UDP/TCP-Paar).
+#  @return Portnummer.
+def free_port_pair():
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.bind(("127.0.0.1", port + 1))
+            return port
+        except OSError:
+            continue
+
+## @brief Wandelt Größenangaben wie "1M" oder "1G" in Bytes um.
+#  @param text Größe mit optionalem Suffix K/M/G.
+#  @return Anzahl Bytes.
+def parse_size(text):
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper()
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+## 2a) Leser der alten Variante: öffnet die FIFO nach jedem EOF neu.
+def _fifo_reader(path, count, done):
+    received = 0
+    while received < count:
+        with open(path, "r") as pipe:
+            for _ in pipe:
+                received += 1
+    done.set()
+
+## 2b) Leser der neuen Variante: ein dauerhafter IpcChannel.
+def _channel_reader(path, count, done):
+    from ipc_channel import IpcChannel
+    channel = IpcChannel(path, server=True)
+    received = 0
+    for _ in channel.messages():
+        received += 1
+        if received >= count:
+            break
+    done.set()
+    channel.close()
+
+## 2) Misst Nachrichten pro Sekunde zwischen zwei Prozessen (vorher/nachher).
+#  @param args Kommandozeilenargumente (count).
+def bench_ipc(args):
+    from ipc_channel import IpcChannel
+    count = args.count
+    msg = "MSG Bilal " + "x" * 40
+    with tempfile.TemporaryDirectory() as tmp:
+        fifo = os.path.join(tmp, "bench.pipe")
+        os.mkfifo(fifo)
+        done = multiprocessing.Event()
+        reader = multiprocessing.Process(target=_fifo_reader, args=(fifo, count, done))
+        reader.start()
+        start = time.perf_counter()
+        for _ in range(count):
+            with open(fifo, "w") as pipe:
+                pipe.write(msg + "\n")
+        done.wait()
+        report("FIFO, open-per-message (alt)", count, time.perf_counter() - start)
+        reader.join()
+
+        sock_path = os.path.join(tmp, "bench.sock")
+        done = multiprocessing.Event()
+        reader = multiprocessing.Process(target=_channel_reader, args=(sock_path, count, done))
+        reader.start()
+        channel = IpcChannel(sock_path, server=False)
+        start = time.perf_counter()
+        for _ in range(count):
+            channel.send(msg)
+        done.wait()
+        report("IpcChannel, gerahmt & gepuffert (neu)", count, time.perf_counter() - start)
+        channel.close()
+        reader.join()
+
+## 3) Misst den Bilddurchsatz über Loopback mit send_image/tcp_image_receiver.
+#  Zusätzlich wird der maximale RSS ausgegeben: er darf mit der Dateigröße nicht wachsen.
+#  @param args Kommandozeilenargumente (sizes).
+def bench_transfer(args):
+    import network_process
+    from ipc_channel import IpcChannel
+    with tempfile.TemporaryDirectory() as tmp:
+        network_process.cli_channel = IpcChannel(os.path.join(tmp, "bench.sock"), server=True)
+        port = free_port_pair()
+        image_dir = os.path.join(tmp, "receive")
+        config = {"handle": "bench", "imagepath": image_dir}
+        threading.Thread(target=network_process.tcp_image_receiver, args=(port, config), daemon=True).start()
+        time.sleep(0.2)
+        peers = {"bench": ("127.0.0.1", port)}
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            src = os.path.join(tmp, f"img_{label}.bin")
+            with open(src, "wb") as f:
+                f.truncate(size)
+            dest = os.path.join(image_dir, os.path.basename(src))
+            start = time.perf_counter()
+            network_process.send_image("bench", src, None, peers, config)
+            while not os.path.exists(dest):
+                time.sleep(0.001)
+            elapsed = time.perf_counter() - start
+            report(f"Bildtransfer {label}", round(size / (1 << 20), 1), elapsed, unit="MB")
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"{'':<40} max. RSS bisher: {rss:.1f} MB")
+            os.remove(src)
+            os.remove(dest)
+
+## 4) Vergleicht lineare WHO-Suche (alt) mit dem IP-Index der PeerRegistry (neu)
+#  und misst Aufbau & Zusammensetzen der seitenweisen KNOWNUSERS-Antwort.
+#  @param args Kommandozeilenargumente (peers, count).
+def bench_registry(args):
+    from peer_registry import PeerRegistry, PageAssembler, parse_knownusers, MAX_DATAGRAM
+    peers = args.peers
+    plain = {}
+    registry = PeerRegistry()
+    for i in range(peers):
+        ip = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        plain[f"user{i}"] = (ip, 5000 + i % 1000)
+        registry.add(f"user{i}", ip, 5000 + i % 1000)
+    last_ip = plain[f"user{peers - 1}"][0]
+    lookups = min(args.count, 2000)
+
+    start = time.perf_counter()
+    for _ in range(lookups):
+        for h, (ip, p) in plain.items():
+            if ip == last_ip:
+                break
+    report(f"WHO-Lookup linear ({peers} Peers, alt)", lookups, time.perf_counter() - start, unit="op")
+    start = time.perf_counter()
+    for _ in range(lookups):
+        registry.port_for_ip(last_ip)
+    report(f"WHO-Lookup IP-Index ({peers} Peers, neu)", lookups, time.perf_counter() - start, unit="op")
+
+    single = ("KNOWNUSERS " + ", ".join(f"{h} {ip} {p}" for h, (ip, p) in plain.items())).encode()
+    print(f"{'':<40} alte Antwort: 1 Datagramm mit {len(single)} Bytes (recvfrom 1024 schneidet ab)")
+    start = time.perf_counter()
+    pages = registry.pages()
+    elapsed = time.perf_counter() - start
+    report("KNOWNUSERS-Seiten erzeugen", len(pages), elapsed, unit="page")
+    print(f"{'':<40} größtes Datagramm: {max(map(len, pages))} Bytes (Limit {MAX_DATAGRAM})")
+    assembler = PageAssembler()
+    start = time.perf_counter()
+    for page in pages:
+        result = assembler.add("discovery", *parse_knownusers(page.decode()))
+    report("KNOWNUSERS-Seiten zusammensetzen", len(pages), time.perf_counter() - start, unit="page")
+    print(f"{'':<40} vollständig: {len(result or [])} von {peers} Peers")
+
+## 5) Vergleicht eine volle WHO-Antwort mit einer Delta-Antwort nach wenigen Änderungen.
+#  @param args Kommandozeilenargumente (peers).
+def bench_membership(args):
+    from peer_registry import PeerRegistry, PageAssembler, parse_page
+    registry = PeerRegistry()
+    for i in range(args.peers):
+        registry.add(f"user{i}", f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 5000)
+    since = registry.epoch
+    for i in range(10):
+        registry.add(f"neu{i}", "10.255.0.1", 6000 + i)
+        registry.remove(f"user{i}")
+    for label, pages in (("volle Liste (WHO)", registry.pages()),
+                         ("Delta seit Epoche (WHO <e>)", registry.delta_pages(since))):
+        assembler = PageAssembler()
+        start = time.perf_counter()
+        for page in pages:
+            entries, meta = parse_page(page.decode())
+            assembler.add("discovery", entries, meta.get("page"))
+        elapsed = time.perf_counter() - start
+        report(f"{label}, {args.peers} Peers", sum(map(len, pages)), elapsed, unit="B")
+        print(f"{'':<40} {len(pages)} Datagramm(e)")
+
+## 6) Fan-out einer Nachricht an viele lokale Peers (Standard: 1000).
+#  Alt: neuer UDP-Socket pro Empfänger (wie früher send_msg je SEND_MSG).
+#  Neu: ein langlebiger Socket, einmal kodiert, ein Durchlauf (fanout.send_batch).
+#  @param args Kommandozeilenargumente (fanout, count).
+def bench_fanout(args):
+    import fanout
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+    receiver.bind(("127.0.0.1", 0))
+    base = receiver.getsockname()
+    addrs = [base] * args.fanout
+    rounds = max(1, args.count // args.fanout)
+    text = "MSG Bilal bin gerade offline."
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for addr in addrs:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(text.encode(), addr)
+    report(f"Fan-out {args.fanout} Peers, Socket je Send", rounds * args.fanout, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fanout.send_batch(text, addrs)
+    report(f"Fan-out {args.fanout} Peers, send_batch", rounds * args.fanout, time.perf_counter() - start)
+    receiver.close()
+
+## 7) Vergleicht die alte Suche (os.walk bis zum ersten Treffer) mit FileIndex.lookup.
+#  @param args Kommandozeilenargumente (root, prefix, count).
+def bench_fileindex(args):
+    from file_index import FileIndex
+    root = os.path.expanduser(args.root)
+    prefix = args.prefix.lower()
+    start = time.perf_counter()
+    for _, _, files in os.walk(root):
+        if any(f.lower().startswith(prefix) for f in files):
+            break
+    report("os.walk bis zum ersten Treffer (alt)", 1, time.perf_counter() - start, unit="op")
+    index = FileIndex([root])
+    start = time.perf_counter()
+    index.refresh()
+    report(f"FileIndex aufbauen ({len(index.entries)} Dateien)", 1, time.perf_counter() - start, unit="op")
+    start = time.perf_counter()
+    index.refresh()
+    report("FileIndex inkrementell (unverändert)", 1, time.perf_counter() - start, unit="op")
+    start = time.perf_counter()
+    for _ in range(args.count):
+        index.lookup(prefix)
+    report("FileIndex.lookup", args.count, time.perf_counter() - start, unit="op")
+
+## 8) Lookups auf dem heißen Pfad: altes Parsen pro Aufruf vs. gecachter Zugriff.
+#  @param args Kommandozeilenargumente (count).
+def bench_config(args):
+    import toml, config_handler
+    start = time.perf_counter()
+    for _ in range(args.count):
+        toml.load(config_handler.CONFIG_FILE).get("autoreply")
+    report("toml.load pro Lookup (alt)", args.count, time.perf_counter() - start, unit="op")
+    start = time.perf_counter()
+    for _ in range(args.count):
+        config_handler.get_config_value("autoreply")
+    report("get_config_value mit mtime-Cache", args.count, time.perf_counter() - start, unit="op")
+
+## 9) Offline-Nachrichten speichern & die erste Seite abspielen.
+#  @param args Kommandozeilenargumente (count).
+def bench_offline(args):
+    from offline_store import OfflineStore
+    with tempfile.TemporaryDirectory() as tmp:
+        txt = os.path.join(tmp, "offline_messages.txt")
+        start = time.perf_counter()
+        for i in range(args.count):
+            with open(txt, "a", encoding="utf-8") as f:
+                f.write(f"peer{i % 50}: Nachricht {i}\n")
+        report("open/append/close pro Nachricht (alt)", args.count, time.perf_counter() - start)
+        start = time.perf_counter()
+        lines = open(txt, encoding="utf-8").readlines()
+        report("online: ganze Datei lesen (alt)", len(lines), time.perf_counter() - start)
+        store = OfflineStore(os.path.join(tmp, "store"))
+        start = time.perf_counter()
+        for i in range(args.count):
+            store.append(f"peer{i % 50}", f"Nachricht {i}")
+        store.flush()
+        report("OfflineStore.append + Group-Commit", args.count, time.perf_counter() - start)
+        start = time.perf_counter()
+        reader = OfflineStore(os.path.join(tmp, "store"), writer=False)
+        page = reader.page(0, 20)
+        report("online: Index laden + erste Seite", len(page), time.perf_counter() - start)
+
+## 10) Verlauf füllen, dann /search und Scrollback messen.
+#  @param args Kommandozeilenargumente (count, peers).
+def bench_history(args):
+    from history_store import HistoryStore
+    words = "hallo welt bild katze hund treffen morgen heute essen kino film buch".split()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        start = time.perf_counter()
+        for i in range(args.count):
+            text = " ".join(words[(i * k) % len(words)] for k in (1, 3, 7)) + f" nr{i}"
+            store.record(f"peer{i % args.peers}", text, outgoing=i % 2)
+        report("record (nur Puffer)", args.count, time.perf_counter() - start)
+        start = time.perf_counter()
+        store.flush()
+        report("flush (eine Transaktion)", args.count, time.perf_counter() - start)
+        queries = ["katze", "kino hund", f"nr{args.count // 2}", "gibtesnicht"]
+        start = time.perf_counter()
+        for _ in range(100):
+            for q in queries:
+                store.search(q)
+        report("/search", 100 * len(queries), time.perf_counter() - start, unit="op")
+        start = time.perf_counter()
+        for i in range(1000):
+            store.tail(f"peer{i % args.peers}", 20)
+        report("Scrollback (tail 20)", 1000, time.perf_counter() - start, unit="op")
+        store.close()
+
+## 11) Kosten der Metriken: Empfangsschleife wie listen_on_port, Erfassen aus vs. an.
+#  Gemessen wird nur der Empfänger (recvfrom + handle_datagram); die CLI-Ausgabe geht
+#  in eine Liste statt über den IPC-Kanal.
+#  @param args Kommandozeilenargumente (count).
+def bench_metrics(args):
+    import metrics, network_process
+    class Sink(list):
+        send = list.append
+    config = {"handle": "Bench", "whoisport": 1, "autoreply": ""}
+    datagrams = [(f"JOIN peer{i % 500} {6000 + i % 500}".encode(), ("127.0.0.1", 6000)) if i % 2 else
+                 (f"MSG peer{i % 500} Nachricht {i}".encode(), ("127.0.0.1", 6000)) for i in range(args.count)]
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target = rx.getsockname()
+    results = {False: float("inf"), True: float("inf")}
+    for enabled in (False, True) * 3:  # abwechselnd, jeweils bester von drei Läufen
+        metrics.set_enabled(enabled)
+        network_process.cli_channel = Sink()
+        elapsed = 0.0
+        for i in range(0, len(datagrams), 100):
+            batch = datagrams[i:i + 100]
+            for data, _ in batch:
+                tx.sendto(data, target)
+            start = time.perf_counter()
+            for n, _ in enumerate(batch, 1):  # wie listen_on_port: recvfrom + handle_datagram + Stichprobe
+                data, addr = rx.recvfrom(65535)
+                timed = n % network_process.TIMING_SAMPLE == 0
+                t0 = time.perf_counter() if timed else 0.0
+                network_process.handle_datagram(data, addr, config)
+                if timed:
+                    network_process.DATAGRAM_SECONDS.observe(time.perf_counter() - t0)
+            elapsed += time.perf_counter() - start
+        results[enabled] = min(results[enabled], elapsed)
+    for enabled in (False, True):
+        report("Empfangsschleife, Metriken " + ("an" if enabled else "aus"), args.count, results[enabled])
+    metrics.set_enabled(True)
+    rx.close(); tx.close()
+    print(f"Mehrkosten: {100 * (results[True] / results[False] - 1):.1f} %")
+
+## 12) Zuverlässige Zustellung über Loopback mit künstlichem Verlust (args.loss, beide Richtungen).
+#  Vergleicht einfaches MSG (Verluste bleiben Verluste), Fenster 1 (Stop-and-Wait) und Fenster 32.
+#  @param args Kommandozeilenargumente (count, loss).
+def bench_reliable(args):
+    import random, fanout, reliable
+    count = min(args.count, 5000)
+    texts = [f"Nachricht {i} " + "x" * (i % 3000) for i in range(count)]  # teils mehrere Fragmente
+    send_to = fanout.send_to
+    def lossy_send_to(msg, addr):
+        if random.random() >= args.loss:
+            send_to(msg, addr)
+    reliable.fanout.send_to = lossy_send_to  # RACK/RSYNACK des Empfängers gehen ebenfalls verloren
+
+    def receiver(endpoint, sock, stop):
+        sock.settimeout(0.2)
+        while not stop.is_set():
+            try:
+                data, addr = sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            if random.random() >= args.loss:
+                endpoint.handle_datagram(data, addr)
+
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(0.2)
+    rx.settimeout(0.01)
+    start, received = time.perf_counter(), 0
+    for i in range(0, count, 50):  # in Blöcken, damit der Empfangspuffer nicht überläuft
+        for text in texts[i:i + 50]:
+            if random.random() >= args.loss:
+                tx.sendto(f"MSG Bench {text}".encode(), rx.getsockname())
+        try:
+            while True:
+                rx.recvfrom(65535)
+                received += 1
+        except socket.timeout:
+            pass
+    report(f"MSG (zugestellt {received}/{count})", count, time.perf_counter() - start)
+    rx.close(); tx.close()
+
+    for window in (1, 32):
+        got, done, stop = [], threading.Event(), threading.Event()
+        def deliver(sender, text, msg_id):
+            got.append(text)
+            if len(got) == count:
+                done.set()
+        sender = reliable.Endpoint({"handle": "Bench"}, None, lambda h, t: print(f"aufgegeben: {len(t)}"), window)
+        peer = reliable.Endpoint({"handle": "Peer"}, deliver, None, window)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        thread = threading.Thread(target=receiver, args=(peer, sock, stop), daemon=True)
+        thread.start()
+        while not sender.send("Peer", sock.getsockname(), "hallo"):
+            time.sleep(0.05)
+        while not got:  # RSYN beantwortet & erste Nachricht da: ab jetzt wird gemessen
+            time.sleep(0.01)
+        got.clear()
+        retransmits = sum(reliable.RETRANSMITS.values.values())
+        start = time.perf_counter()
+        for text in texts:
+            sender.send("Peer", sock.getsockname(), text)
+        done.wait(120)
+        elapsed = time.perf_counter() - start
+        report(f"RMSG Fenster {window:2d} (zugestellt {len(got)}/{count}, in Reihenfolge: {got == texts})", count, elapsed)
+        print(f"  Wiederholungen: {sum(reliable.RETRANSMITS.values.values()) - retransmits}, "
+              f"RTO zuletzt: {sender.streams['Peer'].rto * 1000:.1f} ms")
+        stop.set()
+        thread.join()
+        sender.sock.close(); peer.sock.close(); sock.close()
+    reliable.fanout.send_to = send_to
+
+## 13) Dateitransfer (file_transfer.send_file) über Loopback mit und ohne Kompression.
+#  Bytes auf der Leitung = Nutzdaten der Blöcke (ohne Kopfzeilen); dazu die geschätzte
+#  Übertragungsdauer bei args.link MBit/s, da Loopback selbst kaum begrenzt.
+#  @param args Kommandozeilenargumente (link).
+def bench_compression(args):
+    import random, compression, file_transfer
+    size = 32 << 20
+    line = b"2026-10-17 12:00:00 INFO peer=%d msg=Nachricht zugestellt, Fenster=32 rto=0.30\n"
+    rng = random.Random(1)
+    kinds = {
+        "Text/Log": b"".join(line % i for i in range(size // len(line) + 1))[:size],
+        "BMP (Verlauf)": bytes((x + y // 64 + rng.randrange(4)) & 255 for y in range(256) for x in range(4096)) * (size // (1 << 20)),
+        "JPEG-ähnlich (zufällig)": os.urandom(size),
+    }
+    sent = lambda counter: sum(counter.values.values())
+    with tempfile.TemporaryDirectory() as tmp:
+        image_dir = os.path.join(tmp, "receive")
+        os.makedirs(image_dir)
+        done = threading.Event()
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        def accept():
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    return
+                threading.Thread(target=file_transfer.serve_connection,
+                                 args=(conn, image_dir, lambda sender, filename: done.set(), list(compression.CODECS)),
+                                 daemon=True).start()
+        threading.Thread(target=accept, daemon=True).start()
+        peers = {"bench": ("127.0.0.1", server.getsockname()[1] - 1)}
+        for kind, data in kinds.items():
+            src = os.path.join(tmp, "bild.bin")
+            for mode in ["off"] + list(compression.CODECS):
+                with open(src, "wb") as f:
+                    f.write(data)
+                config = {"handle": "bench", "compression": mode, "transfer_streams": 4}
+                raw, wire = sent(compression.RAW_BYTES), sent(compression.WIRE_BYTES)
+                done.clear()
+                start = time.perf_counter()
+                ok = file_transfer.send_file("bench", src, peers, config)
+                done.wait(60)
+                elapsed = time.perf_counter() - start
+                on_wire = size - (sent(compression.RAW_BYTES) - raw) + (sent(compression.WIRE_BYTES) - wire)
+                report(f"{kind}, {mode}" + ("" if ok else " (FEHLER)"), size >> 20, elapsed, unit="MB")
+                print(f"{'':<40} Leitung: {on_wire / (1 << 20):7.1f} MB ({100 * on_wire / size:5.1f} %), "
+                      f"bei {args.link} MBit/s ≈ {on_wire * 8 / (args.link * 1e6) + elapsed:6.2f}s")
+                with open(os.path.join(image_dir, "bild.bin"), "rb") as f:
+                    if f.read() != data:
+                        print(f"{'':<40} Inhalt weicht ab!")
+                os.remove(os.path.join(image_dir, "bild.bin"))
+        server.close()
+
+    text = ("Protokoll vom Treffen: " + "Punkt erledigt, nächster Schritt offen. " * 60).encode("utf-8")
+    for codec in compression.CODECS:
+        packed, used = compression.compress(codec, text)
+        print(f"{CYAN}{'Chat-Nachricht, ' + codec:<40}{RESET} {len(text)} → {len(packed)} Bytes "
+              f"({-(-len(packed) // 1000)} statt {-(-len(text) // 1000)} RMSG-Fragmente)")
+
+## 14) Stoß von args.count MSG-Datagrammen, während die CLI alle 500 Nachrichten args.stall ms hängt.
+#  "inline" ist die alte Empfangsschleife (recvfrom + handle_datagram im selben Thread);
+#  die Ring-Varianten nutzen listen_on_port, einmal mit Systempuffer, einmal mit udp_rcvbuf.
+#  @param args Kommandozeilenargumente (count, stall).
+def bench_burst(args):
+    import metrics, network_process, receive_ring
+    class StallingSink:
+        def __init__(self):
+            self.count = 0
+        def send(self, msg):
+            self.count += 1
+            if self.count % 500 == 0:
+                time.sleep(args.stall / 1000)
+    config = {"handle": "Bench", "whoisport": 1, "autoreply": "", "receive_queue": receive_ring.RING_SIZE}
+    def inline(sock):
+        handler = network_process.DatagramHandler(config)
+        while True:
+            data, addr = sock.recvfrom(65535)
+            handler.datagram_received(data, addr)
+    variants = [("inline, Systempuffer", inline, 0),
+                ("Ring, Systempuffer", lambda sock: network_process.listen_on_port(sock, config), 0),
+                ("Ring, udp_rcvbuf 4 MiB", lambda sock: network_process.listen_on_port(sock, config), receive_ring.UDP_RCVBUF)]
+    queue_full = lambda: network_process.DATAGRAMS_DROPPED.values.get("queue_full", 0)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for label, loop, rcvbuf in variants:
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receive_ring.set_rcvbuf(rx, rcvbuf)
+        rx.bind(("127.0.0.1", 0))
+        port = rx.getsockname()[1]
+        sink = network_process.cli_channel = StallingSink()
+        kernel, full = metrics.udp_socket_drops(port) or 0, queue_full()
+        threading.Thread(target=loop, args=(rx,), daemon=True).start()
+        start = time.perf_counter()
+        for i in range(args.count):
+            tx.sendto(f"MSG peer{i % 100} Nachricht {i}".encode(), ("127.0.0.1", port))
+        last = -1
+        while sink.count != last:  # warten, bis nichts mehr zugestellt wird
+            last, done = sink.count, time.perf_counter()
+            time.sleep(0.2 + args.stall / 1000)
+        kernel = (metrics.udp_socket_drops(port) or 0) - kernel
+        report(label, sink.count, done - start, unit="msg")
+        print(f"{'':<40} gesendet {args.count}, zugestellt {sink.count}, Kernel verworfen {kernel}, "
+              f"Ring verworfen {queue_full() - full}")
+
+## 15) Teilnehmerliste mit args.peers Nutzern: alter Text-Abgleich über den IPC-Kanal
+#  (Netzwerk formatiert KNOWNUSERS, CLI parst) vs. mmap-Tabelle (ein Schreiber, Seqlock-Leser).
+#  @param args Kommandozeilenargumente (peers, count).
+def bench_peers(args):
+    from peer_table import PeerTableWriter, PeerTableReader
+    users = {f"user{i}": (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 5000) for i in range(args.peers)}
+    start = time.perf_counter()
+    line = "KNOWNUSERS " + ", ".join(f"{h} {ip} {p}" for h, (ip, p) in users.items())
+    parsed = {}
+    for p in line.partition(" ")[2].split(", "):
+        fields = p.split()
+        if len(fields) == 3:
+            parsed[fields[0]] = (fields[1], int(fields[2]))
+    report(f"KNOWNUSERS-Zeile, {args.peers} Peers (alt)", len(parsed), time.perf_counter() - start, unit="peer")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bymy.peers")
+        writer, reader = PeerTableWriter(path), PeerTableReader(path)
+        start = time.perf_counter()
+        for handle, addr in users.items():
+            writer[handle] = addr
+        report("Tabelle schreiben (Netzwerk)", len(users), time.perf_counter() - start, unit="peer")
+        start = time.perf_counter()
+        snapshot = reader.snapshot()
+        report("Tabelle lesen nach Änderung (CLI)", len(snapshot), time.perf_counter() - start, unit="peer")
+        start = time.perf_counter()
+        hits = sum(f"user{i % (2 * args.peers)}" in reader for i in range(args.count))
+        report("'name in known_users' ohne Änderung", args.count, time.perf_counter() - start, unit="op")
+        print(f"{'':<40} Treffer {hits}, Dateigröße {os.path.getsize(path) >> 10} KiB")
+
+## 16) Ein echter prompt_toolkit-Prompt (Eingabe über eine Pipe, Ausgabe in einen zählenden
+#  Puffer statt ins Terminal), während 2 s lang args.rate Meldungen/s eintreffen. Gemessen
+#  wird die Zeit vom Senden eines Zeichens bis zu seiner Übernahme in die Eingabezeile.
+#  @param args Kommandozeilenargumente (rate).
+def bench_render(args):
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.input import create_pipe_input
+    from prompt_toolkit.output.vt100 import Vt100_Output
+    from prompt_toolkit.data_structures import Size
+    from prompt_toolkit.application import create_app_session
+    from prompt_toolkit.patch_stdout import patch_stdout
+    from renderer import Renderer
+    class Terminal:
+        encoding = "utf-8"
+        def __init__(self):
+            self.bytes = 0
+        def write(self, data):
+            self.bytes += len(data)
+        def flush(self):
+            pass
+        def isatty(self):
+            return True
+        def fileno(self):
+            return 1
+    def run(kind, new):
+        terminal = Terminal()
+        output = Vt100_Output(terminal, lambda: Size(rows=40, columns=120), term="xterm")
+        sent, latency = [], []
+        renderer = Renderer() if new else None
+        def incoming(i):  # wie listen_pipe_loop vor bzw. nach renderer.py
+            if kind == "MSG":
+                renderer.post(f"peer{i % 50}: Nachricht {i}") if new else print(f"\npeer{i % 50}: Nachricht {i}")
+            else:
+                renderer.joined(f"peer{i}") if new else print(f"peer{i} ist dem Chat beigetreten.")
+        def burst():
+            end, i = time.perf_counter() + 2.0, 0
+            while time.perf_counter() < end:
+                for _ in range(max(1, int(args.rate) // 100)):
+                    incoming(i)
+                    i += 1
+                time.sleep(0.01)
+            if new:
+                renderer.flush()
+            inp.send_text("\r")
+        def typing():
+            time.sleep(0.1)
+            for _ in range(150):
+                sent.append(time.perf_counter())
+                inp.send_text("x")
+                time.sleep(0.01)
+        with create_pipe_input() as inp, create_app_session(input=inp, output=output):
+            session = PromptSession()
+            session.default_buffer.on_text_changed += \
+                lambda _: latency.append(time.perf_counter() - sent[len(latency)]) if len(sent) > len(latency) else None
+            with patch_stdout():
+                threads = [threading.Thread(target=burst), threading.Thread(target=typing)]
+                cpu = time.process_time()
+                for t in threads:
+                    t.start()
+                session.prompt("> ")
+                for t in threads:
+                    t.join()
+                cpu = time.process_time() - cpu
+        latency.sort()
+        label = f"{kind}-Stoß, " + ("renderer.py" if new else "print pro Zeile")
+        print(f"{CYAN}{label:<40}{RESET} Eingabe p50 {latency[len(latency) // 2] * 1000:6.2f} ms  "
+              f"p99 {latency[int(len(latency) * 0.99)] * 1000:6.2f} ms  CPU {cpu:5.2f}s  "
+              f"Terminal {terminal.bytes >> 10:6d} KiB" + (f"  Frames {renderer.frames}" if new else ""))
+    for kind in ("MSG", "JOIN"):
+        for new in (False, True):
+            run(kind, new)
+
+## 17) args.storm simulierte Peers (je ein UDP-Socket) senden in args.repeat Runden (je 1 s)
+#  JOIN an einen echten Discovery-Prozess – Runde 1 ist der Start eines ganzen Raums, die
+#  weiteren sind Wiederholungen (z.B. Clients, die JOIN bis zur Antwort erneut senden).
+#  Gezählt wird, was bei den Peers ankommt, und wie viele Peers jeder danach kennt.
+#  @param args Kommandozeilenargumente (storm, repeat).
+def bench_joinstorm(args):
+    import selectors, metrics, receive_ring, discovery_process
+    variants = [("einzeln & sofort (alt)", {"announce_interval": 0, "join_rate": 0}),
+                ("DELTA je Takt, ohne Token-Bucket", {"announce_interval": 0.25, "join_rate": 0}),
+                ("DELTA je Takt + Token-Bucket", {"announce_interval": 0.25})]
+    for label, settings in variants:
+        whoisport = free_port_pair()
+        discovery = multiprocessing.Process(target=discovery_process.run_discovery_process,
+                                            args=(whoisport, 15.0, settings), daemon=True)
+        discovery.start()
+        time.sleep(0.5)
+        peers, selector = [], selectors.DefaultSelector()
+        for i in range(args.storm):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            receive_ring.set_rcvbuf(sock, receive_ring.UDP_RCVBUF)
+            sock.bind(("127.0.0.1", 0))
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ, i)
+            peers.append(sock)
+        handles = [f"peer{i}" for i in range(args.storm)]
+        known = [set() for _ in peers]
+        totals = {"datagrams": 0, "bytes": 0}
+        def receive():
+            while True:
+                for key, _ in selector.select():
+                    try:
+                        data = key.fileobj.recv(65535)
+                    except (BlockingIOError, OSError):
+                        continue
+                    totals["datagrams"] += 1
+                    totals["bytes"] += len(data)
+                    msg = data.decode()
+                    if msg.startswith("JOIN "):
+                        known[key.data].add(msg.split()[1])
+                    elif msg.startswith("DELTA "):
+                        known[key.data].update(e.split()[1] for e in msg[6:].split(", ") if e.startswith("JOIN "))
+        threading.Thread(target=receive, daemon=True).start()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for i, sock in enumerate(peers):
+                sock.sendto(f"JOIN {handles[i]} {sock.getsockname()[1]}".encode(), ("127.0.0.1", whoisport))
+                time.sleep(1.0 / args.storm)
+        last = -1
+        while totals["datagrams"] != last:  # warten, bis nichts mehr ankommt
+            last, done = totals["datagrams"], time.perf_counter()
+            time.sleep(1.0)
+        drops = sum(metrics.udp_socket_drops(sock.getsockname()[1]) or 0 for sock in peers)
+        relations = sum(len(k - {handles[i]}) for i, k in enumerate(known))
+        report(label, totals["datagrams"], done - start, unit="dgram")
+        print(f"{'':<40} {totals['bytes'] >> 10} KiB, {totals['datagrams'] / args.storm:.0f} pro Peer, "
+              f"bekannt {relations}/{args.storm * (args.storm - 1)}, Kernel verworfen {drops}")
+        discovery.terminate()
+        selector.close()
+        for sock in peers:
+            sock.close()
+
+BENCHMARKS = {
+    "ipc": bench_ipc,
+    "transfer": bench_transfer,
+    "registry": bench_registry,
+    "membership": bench_membership,
+    "fanout": bench_fanout,
+    "fileindex": bench_fileindex,
+    "config": bench_config,
+    "offline": bench_offline,
+    "history": bench_history,
+    "metrics": bench_metrics,
+    "reliable": bench_reliable,
+    "compression": bench_compression,
+    "burst": bench_burst,
+    "peers": bench_peers,
+    "render": bench_render,
+    "joinstorm": bench_joinstorm,
+}
+
+## 18) Einstiegspunkt: Benchmark per Name auswählen.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BYMY Benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--count", type=int, default=20000, help="Anzahl Nachrichten/Operationen")
+    parser.add_argument("--peers", type=int, default=10000, help="Anzahl simulierter Peers")
+    parser.add_argument("--fanout", type=int, default=1000, help="Anzahl Empfänger für 'fanout'")
+    parser.add_argument("--root", default="~", help="Wurzelordner für 'fileindex'")
+    parser.add_argument("--prefix", default="zzz", help="Dateinamen-Präfix für 'fileindex'")
+    parser.add_argument("--loss", type=float, default=0.05, help="Verlustrate für 'reliable' (0..1)")
+    parser.add_argument("--link", type=float, default=100, help="Angenommene Bandbreite in MBit/s für 'compression'")
+    parser.add_argument("--rate", type=float, default=5000, help="Eingehende Meldungen pro Sekunde für 'render'")
+    parser.add_argument("--stall", type=float, default=20, help="Hängen der CLI in ms je 500 Nachrichten für 'burst'")
+    parser.add_argument("--storm", type=int, default=500, help="Gleichzeitig startende Peers für 'joinstorm'")
+    parser.add_argument("--repeat", type=int, default=3, help="JOIN-Runden je Peer für 'joinstorm'")
+    parser.add_argument("--sizes", default="1M,100M,1G", help="Dateigrößen für 'transfer'")
+    args = parser.parse_args(argv)
+    BENCHMARKS[args.name](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+## @file bymy.py
+#  @brief Eingebetteter Modus: Discovery, Netzwerk & CLI in einem Prozess
+#  @details
+#  Aufruf: python3 bymy.py (statt main.sh). Spart zwei Interpreter-Starts samt
+#  toml-Import und das Warten auf Sockets; Netzwerk & CLI tauschen Nachrichten
+#  über einen In-Memory-Kanal (QueueChannel) statt über bymy.sock aus.
+#  Struktur & Ablauf:
+#   1) start_discovery – Discovery-Schleife als Thread; ist der WHOIS-Port schon belegt
+#      (Discovery eines anderen Clients auf diesem Rechner), wird jener mitbenutzt
+#   2) Netzwerkteil als Thread (network_process.start) am einen Ende des Kanals
+#   3) CLI im Hauptthread (cli_process.main) am anderen Ende, sobald beide bereit sind
+#   4) Beenden: network_process.shutdown (LEAVE, Offline-Speicher) statt stop_all.sh
+#  UDP-Protokoll & Ports sind dieselben wie im Mehrprozessbetrieb.
+
+import signal, threading
+from config_handler import get_config, watch_config
+from ipc_channel import QueueChannel
+import discovery_process, network_process, cli_process, profiling
+
+RESET = "\033[0m"; YELLOW = "\033[93m"
+READY_TIMEOUT = 5.0
+
+## 1) Startet die Discovery-Schleife als Daemon-Thread.
+#  @param config Live aktualisiertes Config-Dict.
+#  @param ready threading.Event, wird gesetzt, sobald gebunden (oder Port belegt).
+def start_discovery(config, ready):
+    def run():
+        try:
+            discovery_process.run_discovery_process(config["whoisport"], float(config.get("peer_ttl", 15)),
+                                                    config, ready=ready.set)
+        except OSError as e:
+            print(f"{YELLOW}[DISCOVERY] Port {config['whoisport']} nicht verfügbar ({e}), "
+                  f"nutze vorhandenen Discovery-Dienst.{RESET}")
+            ready.set()
+    threading.Thread(target=run, name="discovery", daemon=True).start()
+
+## 2–4) Einstiegspunkt.
+def main():
+    config = get_config()
+    watch_config(config.update)
+    signal.signal(signal.SIGTERM, network_process.handle_sigterm)
+    profiling.install(config, "bymy")
+    net_end, cli_end = QueueChannel.pair()
+    discovery_ready, network_ready = threading.Event(), threading.Event()
+    start_discovery(config, discovery_ready)
+    threading.Thread(target=network_process.start, args=(config, net_end, network_ready.set),
+                     name="network", daemon=True).start()
+    for name, event in (("Discovery", discovery_ready), ("Netzwerk", network_ready)):
+        if not event.wait(READY_TIMEOUT):
+            print(f"{YELLOW}⚠ {name} nach {READY_TIMEOUT:.0f}s nicht bereit.{RESET}")
+    try:
+        cli_process.main(cli_end, in_process=True)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        network_process.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -5,44 +5,62 @@
 # @brief BYMY CLI-Prozess – steuert das Terminal-Interface für den Nutzer.
 # @details 
 # Ablauf:
-# 1) Farben, Pipes, Flags, globale Variablen
+# 1) Farben, IPC-Kanal, Flags, globale Variablen
 # 2) update_config_value: Speichert Änderungen in der TOML-Konfigurationsdatei
 # 3) show_intro: Zeigt dem Nutzer alle verfügbaren Kommandos an
-# 4) recover_pipe: Erstellt eine Pipe neu, falls sie fehlt oder defekt ist
-# 5) send_pipe_command: Sendet ein Kommando an den Netzwerkprozess über Pipe
-# 6) listen_pipe_loop: Lauscht auf die Netzwerkantwort-Pipe und verarbeitet Daten
-# 7) find_file: Durchsucht das Home-Verzeichnis nach Dateien
-# 8) run_cli: Führt die Haupt-CLI-Steuerung aus (Kommandos, Chat)
-# 9) __main__: Initialisiert Pipes & Threads und startet CLI
-
-import os, time, sys, toml, subprocess, threading
-from prompt_toolkit import PromptSession
-from prompt_toolkit.patch_stdout import patch_stdout
-from config_handler import get_config
+# 4) send_pipe_command: Sendet ein Kommando an den Netzwerkprozess über den IPC-Kanal
+# 5) listen_pipe_loop: Lauscht auf Netzwerkantworten und verarbeitet Daten
+#    (Teilnehmer liest die CLI direkt aus der gemeinsamen Tabelle, peer_table.py;
+#     Ausgabe gebündelt in Frames über renderer.py)
+# 6) find_file: Sucht Dateien im Hintergrund-Dateiindex (file_index.py)
+#    (6c/6d: show_history/show_search – Verlauf & /search aus history_store.py)
+#    (6e: show_stats – /stats, Metriken aus metrics.py)
+#    (6b: show_offline_messages – verpasste Nachrichten seitenweise aus offline_store.py)
+#    (6f: load_prompt_toolkit – prompt_toolkit erst bei Bedarf bzw. im Hintergrund laden)
+#    (6g: group_command – /group: Gruppenchats per Multicast, group_chat.py)
+#    (6h: show_recent – /recent: letzte eingegangene Meldungen aus dem Scrollback)
+# 7) run_cli: Führt die Haupt-CLI-Steuerung aus (Kommandos, Chat)
+# 8) main: Initialisiert Kanal (IPC-Socket oder eingebettet, bymy.py) & Threads und startet CLI
+
+import os, time, sys, subprocess, threading
+from config_handler import get_config, set_config_value
+from ipc_channel import IpcChannel, IPC_SOCKET
+from file_index import FileIndex
+from offline_store import OfflineStore
+from history_store import HistoryStore
+from group_chat import valid_name as valid_group_name
+from peer_table import PeerTableReader, PEER_TABLE
+from renderer import Renderer, RENDER_FPS, FRAME_LINES, SCROLLBACK
+import metrics, profiling
 
 ## 1) Farbdefinitionen & Pfade
 RESET = "\033[0m"; GREEN = "\033[92m"; RED = "\033[91m"
 CYAN = "\033[96m"; YELLOW = "\033[93m"; MAG = "\033[95m"; BOLD = "\033[1m"
 
 AWAY_FLAG = "away.flag"
-CONFIG_FILE = "config.toml"
-PIPE_CLI_TO_NET = "cli_to_network.pipe"
-PIPE_NET_TO_CLI = "network_to_cli.pipe"
-offline_txt = os.path.join("receive", "offline_messages.txt")
+OFFLINE_DIR = os.path.join("receive", "offline")
 
-known_users = {}
+known_users = {}  # in main(): PeerTableReader (schreibt nur der Netzwerkprozess)
+groups = {}  # {gruppe: [mitglieder]} laut GROUP-Meldungen des Netzwerkprozesses
+net_channel = None
+renderer = None   # gebündelte Ausgabe eingehender Meldungen (renderer.py)
+file_index = None
+history = None
 current_chat = None
 received_leave_ack = threading.Event()
+membership_synced = threading.Event()
+offline_ready = threading.Event()
+stats_ready = threading.Event()
+stats_text = ""
+embedded = False  # True in bymy.py: kein stop_all.sh beim Beenden
 
-## 2) Schreibt neuen Wert in config.toml.
+## 2) Schreibt neuen Wert in config.toml und lässt den Netzwerkprozess sofort neu laden.
 # @param key Schlüssel in der Config
 # @param value Neuer Wert
 def update_config_value(key, value):
     try:
-        config = toml.load(CONFIG_FILE)
-        config[key] = value
-        with open(CONFIG_FILE, "w") as f:
-            toml.dump(config, f)
+        set_config_value(key, value)
+        send_pipe_command("RELOAD_CONFIG")
         print(f"{GREEN}✓ {key} erfolgreich geändert auf: {value}{RESET}")
     except Exception as e:
         print(f"{RED}❌ Fehler beim Ändern von {key}: {e}{RESET}")
@@ -52,88 +70,206 @@ def show_intro():
     print(f"{BOLD}{CYAN}Willkommen beim BYMY-CHAT{RESET}\n")
     print(f"""Verfügbare Befehle:{RESET}
   {CYAN}offline{RESET}            – Abwesenheitsmodus aktivieren + Autoreply
-  {CYAN}send <bild>{RESET}        – Bild senden (Dateiname reicht)
+  {CYAN}send <bild>{RESET}        – Bild senden (Dateiname oder Pfad)
   {CYAN}/autoreply <text>{RESET}  – Autoreply-Nachricht ändern
-  {CYAN}/name <nutzer>{RESET}     – Chatpartner wechseln
+  {CYAN}/name <nutzer>{RESET}     – Chatpartner wechseln (zeigt die letzten Nachrichten)
+  {CYAN}/search <text>{RESET}     – Verlauf aller Chats durchsuchen
+  {CYAN}/recent [n]{RESET}        – Letzte n eingegangene Meldungen erneut zeigen
+  {CYAN}/group create <name> [nutzer ...]{RESET} – Gruppe anlegen (und Nutzer einladen)
+  {CYAN}/group join|leave <name>{RESET} – Gruppe beitreten bzw. verlassen
+  {CYAN}/group <name>{RESET}      – In den Gruppenchat wechseln; /group allein listet Gruppen
+  {CYAN}/stats{RESET}             – Laufzeit-Metriken von Netzwerk & Discovery
   {CYAN}hilfe{RESET}              – Diese Hilfe erneut anzeigen
   {CYAN}exit{RESET}               – Beenden\n""")
 
-## 4) Erstellt Pipe neu, falls sie defekt ist.
-# @param pipe_name Dateiname der Pipe
-def recover_pipe(pipe_name):
-    try:
-        if os.path.exists(pipe_name):
-            os.remove(pipe_name)
-        os.mkfifo(pipe_name)
-        print(f"{YELLOW}⚠ Pipe {pipe_name} wurde neu erstellt.{RESET}")
-    except Exception as e:
-        print(f"{RED}❌ Fehler beim Wiederherstellen der Pipe {pipe_name}: {e}{RESET}")
-
-## 5) Sendet Befehl an Netzwerkprozess.
+## 4) Sendet Befehl an Netzwerkprozess (gepuffert, blockiert nicht).
 # @param cmd Befehl als String
 def send_pipe_command(cmd):
     try:
-        with open(PIPE_CLI_TO_NET, "w") as f:
-            f.write(cmd + "\n")
-    except BrokenPipeError:
-        print(f"{RED}❌ Netzwerkprozess ist nicht aktiv – Befehl nicht gesendet: {cmd}{RESET}")
-        recover_pipe(PIPE_CLI_TO_NET)
+        net_channel.send(cmd)
     except Exception as e:
-        print(f"{RED}❌ Fehler beim Senden über Pipe: {e}{RESET}")
-        recover_pipe(PIPE_CLI_TO_NET)
+        print(f"{RED}❌ Fehler beim Senden über IPC-Kanal: {e}{RESET}")
 
-## 6) Lauscht auf NET->CLI Pipe & verarbeitet Nachrichten.
+## 5) Lauscht auf dem IPC-Kanal & verarbeitet Nachrichten.
 def listen_pipe_loop():
-    global known_users
+    global stats_text
     while True:
         try:
-            with open(PIPE_NET_TO_CLI, "r") as pipe:
-                for line in pipe:
-                    if line.startswith("KNOWNUSERS "):
-                        known_users = {}
-                        parts = line.strip().partition(" ")[2].split(", ")
-                        for p in parts:
-                            handle, ip, port = p.split()
-                            known_users[handle] = (ip, int(port))
-                    elif line.startswith("MSG "):
-                        parts = line.strip().split(" ", 2)
-                        if len(parts) == 3:
-                            _, sender, msg = parts
-                            if os.path.exists(AWAY_FLAG):
-                                with open(offline_txt, "a", encoding="utf-8") as f:
-                                    f.write(f"{sender}: {msg}\n")
-                            else:
-                                print(f"\n{sender}: {msg}")
-                    elif line.startswith("JOIN "):
-                        _, sender = line.strip().split()
-                        print(f"{sender} ist dem Chat beigetreten.")
-                    elif line.startswith("LEAVE "):
-                        _, sender = line.strip().split()
-                        if sender in known_users:
-                            known_users.pop(sender)
-                         #   print(f"{sender} hat den Chat verlassen.{RESET}")
-                    elif line.startswith("IMG "):
-                        _, sender, filename = line.strip().split()
-                        print(f"{sender} hat ein Bild gesendet: {filename}")
-                    elif line.startswith("LEAVE_ACK "):
-                        received_leave_ack.set()
+            for line in net_channel.messages():
+                if line.startswith("PEERS"):
+                    membership_synced.set()  # Antwort auf WHO ist in der Tabelle
+                elif line.startswith("MSG "):
+                    parts = line.strip().split(" ", 2)
+                    if len(parts) == 3:
+                        _, sender, msg = parts
+                        renderer.post(f"{sender}: {msg}")
+                        history.record(sender, msg)
+                elif line.startswith("GMSG "):
+                    parts = line.strip().split(" ", 3)
+                    if len(parts) == 4:
+                        _, group, sender, msg = parts
+                        renderer.post(f"{CYAN}[#{group}]{RESET} {sender}: {msg}")
+                        history.record(f"#{group}", f"{sender}: {msg}")
+                elif line.startswith("GROUP "):
+                    fields = line.strip().split()
+                    if len(fields) == 3:
+                        if fields[2] == "-":
+                            groups.pop(fields[1], None)
+                        else:
+                            groups[fields[1]] = fields[2].split(",")
+                elif line.startswith("GINVITE "):
+                    fields = line.strip().split()
+                    if len(fields) == 3:
+                        renderer.post(f"{CYAN}{fields[2]} lädt dich in die Gruppe '{fields[1]}' ein – "
+                                      f"beitreten mit /group join {fields[1]}{RESET}")
+                elif line.startswith("OFFLINE_READY"):
+                    offline_ready.set()
+                elif line.startswith("STATS\n"):
+                    stats_text = line[len("STATS\n"):]
+                    stats_ready.set()
+                elif line.startswith("JOIN "):
+                    _, sender = line.strip().split()
+                    renderer.joined(sender)
+                elif line.startswith("IMG "):
+                    _, sender, filename = line.strip().split()
+                    renderer.post(f"{sender} hat ein Bild gesendet: {filename}")
+                    history.record(sender, f"[Bild: {filename}]")
+                elif line.startswith("LEAVE_ACK "):
+                    received_leave_ack.set()
         except Exception as e:
-            print(f"{RED}❌ Fehler beim Lesen aus Pipe: {e}{RESET}")
+            print(f"{RED}❌ Fehler beim Lesen aus IPC-Kanal: {e}{RESET}")
             time.sleep(1)
-            if not os.path.exists(PIPE_NET_TO_CLI):
-                recover_pipe(PIPE_NET_TO_CLI)
 
-## 7) Sucht Datei im Home-Verzeichnis.
-# @param name Beginn des Dateinamens
-# @return Pfad zur Datei oder None
+## 6) Sucht Dateien im Dateiindex (Wurzelordner laut config.toml: file_roots).
+# @param name Beginn des Dateinamens oder Pfad zu einer Datei (mit "/", wird direkt genommen)
+# @return Liste passender Pfade (exakter Name zuerst), leer wenn nichts gefunden
 def find_file(name):
-    for root, _, files in os.walk(os.path.expanduser("~")):
-        for f in files:
-            if f.lower().startswith(name.lower()):
-                return os.path.join(root, f)
+    if os.sep in name:
+        path = os.path.expanduser(name)
+        return [os.path.abspath(path)] if os.path.isfile(path) else []
+    return file_index.lookup(name)
+
+## 6b) Zeigt verpasste Nachrichten seitenweise und quittiert die gelesenen.
+#  Der Netzwerkprozess schreibt vorher alle gepufferten Nachrichten (OFFLINE_SYNC).
+#  @param page_size Nachrichten pro Seite.
+def show_offline_messages(page_size):
+    offline_ready.clear()
+    send_pipe_command("OFFLINE_SYNC")
+    if not offline_ready.wait(timeout=2):
+        print(f"{YELLOW}⚠ Offline-Speicher antwortet nicht.{RESET}")
+        return
+    store = OfflineStore(OFFLINE_DIR, writer=False)
+    total = store.count()
+    if total == 0:
+        print(f"{CYAN}Keine verpassten Nachrichten.{RESET}")
+        return
+    print(f"{BOLD}{RED} Verpasste Nachrichten ({total}):{RESET}")
+    shown = 0
+    while shown < total:
+        for rec in store.page(shown, page_size):
+            stamp = time.strftime("%d.%m. %H:%M", time.localtime(rec["ts"]))
+            print(f" [{stamp}] {rec['sender']}: {rec['text']}")
+            history.record(rec["sender"], rec["text"], ts=rec["ts"])
+        shown = min(shown + page_size, total)
+        if shown < total and input(f"{MAG}➔ Enter für mehr ({total - shown} übrig), q zum Beenden: {RESET}").strip().lower() == "q":
+            break
+    send_pipe_command(f"OFFLINE_ACK {shown}")
+
+## 6c) Zeigt die letzten Nachrichten eines Chats (Scrollback).
+# @param peer Chatpartner
+# @param n Anzahl Nachrichten
+def show_history(peer, n):
+    for ts, outgoing, text in history.tail(peer, n):
+        stamp = time.strftime("%d.%m. %H:%M", time.localtime(ts))
+        if outgoing:
+            print(f"{'':>40}{GREEN}[{stamp}] Du: {text}{RESET}")
+        else:
+            print(f"[{stamp}] {peer}: {text}")
+
+## 6d) Durchsucht den Verlauf aller Chats (/search <text>).
+# @param text Suchbegriffe (alle müssen vorkommen)
+def show_search(text):
+    if not text:
+        print(f"{YELLOW}⚠ Verwendung: /search <text>{RESET}")
+        return
+    results = history.search(text)
+    if not results:
+        print(f"{RED}❌ Keine Treffer für '{text}'.{RESET}")
+        return
+    print(f"{BOLD}{CYAN}🔎 Treffer für '{text}' (neueste zuerst):{RESET}")
+    for ts, peer, outgoing, msg in results:
+        stamp = time.strftime("%d.%m. %H:%M", time.localtime(ts))
+        print(f"  [{stamp}] {'Du → ' + peer if outgoing else peer}: {msg}")
+
+## 6e) Zeigt die Metriken des Netzwerkprozesses (STATS) und – falls metrics_dir
+#  gesetzt ist – die zuletzt geschriebenen Metriken des Discovery-Dienstes.
+# @param metrics_dir Ordner der .prom-Dateien oder leer
+def show_stats(metrics_dir):
+    stats_ready.clear()
+    send_pipe_command("STATS")
+    if stats_ready.wait(timeout=1):
+        print(f"{BOLD}{CYAN}📊 Netzwerkprozess:{RESET}")
+        [print(f"  {l}") for l in metrics.summarize(stats_text)]
+    else:
+        print(f"{YELLOW}⚠ Netzwerkprozess antwortet nicht auf STATS.{RESET}")
+    path = os.path.join(metrics_dir, "discovery.prom") if metrics_dir else None
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = metrics.summarize(f.read())
+        print(f"{BOLD}{CYAN}📊 Discovery (Stand {time.strftime('%H:%M:%S', time.localtime(os.path.getmtime(path)))}):{RESET}")
+        [print(f"  {l}") for l in lines]
+
+## 6f) Lädt prompt_toolkit (~0,2 s Importzeit) erst, wenn der erste Chat beginnt.
+#  main() stößt den Import im Hintergrund an, damit die erste Eingabe nicht darauf wartet.
+#  @return (PromptSession, patch_stdout)
+def load_prompt_toolkit():
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.patch_stdout import patch_stdout
+    return PromptSession, patch_stdout
+
+## 6g) Führt /group-Befehle aus.
+#  @param args Argumente nach "/group".
+#  @param own_handle Eigener Name (sofort als Mitglied eingetragen).
+#  @return "#<gruppe>", wenn in den Gruppenchat gewechselt werden soll, sonst None.
+def group_command(args, own_handle):
+    if not args:
+        if not groups:
+            print(f"{YELLOW}Keine Gruppen. Anlegen mit /group create <name>.{RESET}")
+        for name, members in sorted(groups.items()):
+            print(f"  • #{name}: {', '.join(members)}")
+        return None
+    action, rest = args[0], args[1:]
+    if action in ("create", "join") and rest:
+        name = rest[0]
+        if not valid_group_name(name):
+            print(f"{RED}⚠ Ungültiger Gruppenname (nur Buchstaben, Ziffern, _ und -, max. 32).{RESET}")
+            return None
+        invite = [h for h in rest[1:] if h in known_users]
+        send_pipe_command(f"GROUP_JOIN {name}" + (f" {','.join(invite)}" if invite else ""))
+        groups.setdefault(name, [own_handle])
+        print(f"{GREEN}✓ Gruppe #{name} {'angelegt' if action == 'create' else 'beigetreten'}"
+              + (f", eingeladen: {', '.join(invite)}" if invite else "") + f"{RESET}")
+        return f"#{name}"
+    if action == "leave" and rest:
+        send_pipe_command(f"GROUP_LEAVE {rest[0]}")
+        groups.pop(rest[0], None)
+        print(f"{YELLOW}Gruppe #{rest[0]} verlassen.{RESET}")
+        return None
+    if action in groups:
+        return f"#{action}"
+    print(f"{RED}⚠ Nicht Mitglied der Gruppe '{action}' (/group join {action}).{RESET}")
     return None
 
-## 8) Haupt-CLI-Loop: steuert alle Befehle.
+## 6h) Zeigt die letzten eingegangenen Meldungen erneut (auch im Frame übersprungene).
+# @param arg Anzahl als Text (leer → 20)
+def show_recent(arg):
+    n = int(arg) if arg.isdigit() else 20
+    lines = renderer.recent(n)
+    if not lines:
+        print(f"{YELLOW}Noch keine Meldungen.{RESET}")
+    [print(f"  {l}") for l in lines]
+
+## 7) Haupt-CLI-Loop: steuert alle Befehle.
 def run_cli():
     global current_chat
     config = get_config()
@@ -144,7 +280,7 @@ def run_cli():
 
     send_pipe_command(f"JOIN {own_handle} {port}")
     show_intro()
-    session = PromptSession()
+    session = None
     current_chat = input(f"{MAG}➔ Gebe zuerst 'who' ein um zu starten! {RESET}")
 
     while True:
@@ -152,11 +288,14 @@ def run_cli():
             send_pipe_command(f"LEAVE {own_handle}")
             if not received_leave_ack.wait(timeout=2):
                 print(f"{YELLOW}⚠ Keine Bestätigung für LEAVE erhalten.{RESET}")
-            for h in known_users:
-                if h != own_handle:
-                    send_pipe_command(f"SEND_MSG {h} hat den Chat verlassen.")
+            send_pipe_command("SEND_MULTI * hat den Chat verlassen.")
+            net_channel.flush(timeout=1)
+            renderer.flush()
+            history.close()
             time.sleep(0.2)
             print(f"{RED}Chat wird beendet... Bis bald{RESET}")
+            if embedded:
+                break  # bymy.py räumt selbst auf
             stop_script = os.path.join(os.path.dirname(__file__), "stop_all.sh")
             if os.path.exists(stop_script) and os.access(stop_script, os.X_OK):
                 try:
@@ -168,8 +307,9 @@ def run_cli():
             break
 
         elif current_chat.lower() == "who":
+            membership_synced.clear()
             send_pipe_command("WHO")
-            time.sleep(1)
+            membership_synced.wait(timeout=1)
             if known_users:
                 print(f"{BOLD}{RED}🌐 Aktive Nutzer:{RESET}")
                 [print(f"  • {h}") for h in known_users]
@@ -184,9 +324,7 @@ def run_cli():
                 open(AWAY_FLAG, "w").close()
                 print(f"{RED}Abwesenheitsmodus aktiviert.{RESET}")
                 auto = config["autoreply"]
-                for h in known_users:
-                    if h != own_handle:
-                        send_pipe_command(f"SEND_MSG {h} {auto}")
+                send_pipe_command(f"SEND_MULTI * {auto}")
             else:
                 print(f"{YELLOW}Bereits im Abwesenheitsmodus.{RESET}")
             current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
@@ -198,15 +336,8 @@ def run_cli():
                 if os.path.exists(AWAY_FLAG):
                     os.remove(AWAY_FLAG)
                 print(f"{GREEN}Du bist wieder online.{RESET}")
-                for h in known_users:
-                    if h != own_handle:
-                        send_pipe_command(f"SEND_MSG {h} Ich bin wieder da.")
-                if os.path.exists(offline_txt):
-                    print(f"{BOLD}{RED} Verpasste Nachrichten:{RESET}")
-                    [print(f" {l.strip()}") for l in open(offline_txt, encoding="utf-8")]
-                    os.remove(offline_txt)
-                else:
-                    print(f"{CYAN}Keine verpassten Nachrichten.{RESET}")
+                send_pipe_command("SEND_MULTI * Ich bin wieder da.")
+                show_offline_messages(config.get("offline_page_size", 20))
             else:
                 print(f"{YELLOW}Du warst nicht offline.{RESET}")
             current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
@@ -224,6 +355,21 @@ def run_cli():
             current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
             continue
 
+        elif current_chat.strip() == "/stats":
+            show_stats(config.get("metrics_dir"))
+            current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
+            continue
+
+        elif current_chat.startswith("/search"):
+            show_search(current_chat[len("/search"):].strip())
+            current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
+            continue
+
+        elif current_chat.startswith("/recent"):
+            show_recent(current_chat[len("/recent"):].strip())
+            current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
+            continue
+
         elif current_chat.startswith("/name"):
             new_chat = current_chat[len("/name"):].strip()
             if new_chat in known_users:
@@ -234,17 +380,31 @@ def run_cli():
                 current_chat = input(f"{MAG}➔ Chatpartner: {RESET}")
             continue
 
+        elif current_chat.split(" ", 1)[0] == "/group":
+            current_chat = group_command(current_chat.split()[1:], own_handle) \
+                or input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
+            continue
+
         elif current_chat.startswith("/"):
             print(f"{YELLOW}⚠ Unbekannter Befehl: {current_chat}{RESET}")
             current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
             continue
 
+        elif current_chat.startswith("#"):
+            if current_chat[1:] not in groups:
+                print(f"{RED}⚠ Nicht Mitglied der Gruppe '{current_chat[1:]}'.{RESET}")
+                current_chat = input(f"{MAG}➔ Chatpartner oder Befehl: {RESET}")
+                continue
+
         elif current_chat not in known_users:
             print(f"{RED}⚠ Nutzer '{current_chat}' nicht bekannt.{RESET}")
             current_chat = input(f"{MAG}➔ Chatpartner: {RESET}")
             continue
 
         print(f"{CYAN}💬 Chat mit {current_chat} gestartet.{RESET}")
+        show_history(current_chat, config.get("history_scrollback", 20))
+        PromptSession, patch_stdout = load_prompt_toolkit()
+        session = session or PromptSession()
         while True:
             try:
                 with patch_stdout():
@@ -263,25 +423,57 @@ def run_cli():
             sys.stdout.write("\033[F\033[K")
             sys.stdout.flush()
 
+            if msg.startswith("send ") and current_chat.startswith("#"):
+                print(f"{YELLOW}⚠ Bilder gehen nur im Einzelchat.{RESET}")
+                continue
             if msg.startswith("send "):
                 name = msg.split(" ", 1)[1].strip()
-                path = find_file(name)
-                if not path:
+                candidates = find_file(name)
+                if not candidates:
                     print(f"{RED}❌ Bild nicht gefunden: {name}{RESET}")
                     continue
-                with open(path, "rb") as f:
-                    data = f.read()
-                send_pipe_command(f"SEND_IMAGE {current_chat} {path} {len(data)}")
+                exact = [c for c in candidates if os.path.basename(c).lower() == name.lower()]
+                if len(exact) > 1:
+                    print(f"{YELLOW}⚠ '{name}' gibt es mehrfach – bitte den Pfad angeben (send <pfad>):{RESET}")
+                    [print(f"  • {c}") for c in exact]
+                    continue
+                if len(candidates) > 1 and not exact:
+                    print(f"{YELLOW}⚠ Mehrere Treffer für '{name}' – bitte genauer angeben:{RESET}")
+                    [print(f"  • {c}") for c in candidates]
+                    continue
+                path = candidates[0]
+                send_pipe_command(f"SEND_IMAGE {current_chat} {path} {os.stat(path).st_size}")
                 print(f"{'':>40}{GREEN}Du: [Bild gesendet: {os.path.basename(path)}]{RESET}")
+                history.record(current_chat, f"[Bild gesendet: {os.path.basename(path)}]", outgoing=True)
                 continue
 
-            send_pipe_command(f"SEND_MSG {current_chat} {msg}")
+            if current_chat.startswith("#"):
+                send_pipe_command(f"SEND_GROUP {current_chat[1:]} {msg}")
+            else:
+                send_pipe_command(f"SEND_MSG {current_chat} {msg}")
             print(f"{'':>40}{GREEN}Du: {msg}{RESET}")
+            history.record(current_chat, msg, outgoing=True)
 
-## 9) Einstiegspunkt: Pipes & Threads starten.
-if __name__ == "__main__":
-    if not os.path.exists(PIPE_CLI_TO_NET): os.mkfifo(PIPE_CLI_TO_NET)
-    if not os.path.exists(PIPE_NET_TO_CLI): os.mkfifo(PIPE_NET_TO_CLI)
-    print(f"{YELLOW}[CLI] gestartet mit Pipes.{RESET}")
+## 8) Einstiegspunkt: Kanal & Threads starten.
+#  @param channel Kanal zum Netzwerk; None → IPC-Socket (eigener Prozess, main.sh).
+#  @param in_process True, wenn Netzwerk & Discovery im selben Prozess laufen (bymy.py).
+def main(channel=None, in_process=False):
+    global net_channel, file_index, history, embedded, known_users, renderer
+    embedded = in_process
+    threading.Thread(target=load_prompt_toolkit, daemon=True).start()
+    net_channel = channel or IpcChannel(IPC_SOCKET, server=False)
+    cli_config = get_config()
+    known_users = PeerTableReader(cli_config.get("peer_table", PEER_TABLE))
+    file_index = FileIndex(cli_config.get("file_roots", ["~"]), cli_config.get("file_index_cache") or None)
+    file_index.start(interval=float(cli_config.get("file_index_refresh", 60)))
+    history = HistoryStore(cli_config.get("history_path", "history.db"))
+    renderer = Renderer(float(cli_config.get("render_fps", RENDER_FPS)),
+                        int(cli_config.get("render_frame_lines", FRAME_LINES)),
+                        int(cli_config.get("render_scrollback", SCROLLBACK)))
+    print(f"{YELLOW}[CLI] gestartet mit {'In-Memory-Kanal' if in_process else 'IPC-Kanal'}.{RESET}")
     threading.Thread(target=listen_pipe_loop, daemon=True).start()
-    run_cli()
\ No newline at end of file
+    run_cli()
+
+if __name__ == "__main__":
+    profiling.install(get_config(), "cli")
+    main()
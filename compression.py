@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+## @file compression.py
+#  @brief Ausgehandelte Kompression für Nachrichten (reliable.py) und Bildblöcke (file_transfer.py)
+#  @details
+#  Beide Seiten nennen ihre Verfahren beim Verbindungsaufbau (RSYN/RSYNACK bzw.
+#  HELLO vor QUERY); komprimiert wird nur, was der Empfänger angekündigt hat.
+#  Alte Clients kündigen nichts an und erhalten weiter Rohdaten.
+#  Struktur & Ablauf:
+#   1) CODECS – verfügbare Verfahren (lzma nur, wenn das Modul vorhanden ist)
+#   2) advertised/choose – eigene Liste laut config.toml (compression), gemeinsames Verfahren wählen
+#   3) compress/decompressor – ein Block bzw. ein Datenstrom (blockweise entpacken)
+#   4) worth_compressing – schnelle Probe (zlib Stufe 1 auf Stichproben): bereits
+#      komprimierte Formate (JPEG, PNG, ZIP …) werden nicht erneut gepackt
+#  Ein Block wird außerdem nur komprimiert übertragen, wenn er dabei spürbar kleiner wird.
+
+import zlib
+import metrics
+
+try:
+    import lzma
+except ImportError:  # z.B. Python ohne liblzma
+    lzma = None
+
+## 1) Verfahren in Vorzugsreihenfolge: (komprimieren, Entpacker-Fabrik).
+CODECS = {"zlib": (lambda data: zlib.compress(data, 1), zlib.decompressobj)}
+if lzma is not None:
+    CODECS["lzma"] = (lambda data: lzma.compress(data, preset=0), lzma.LZMADecompressor)
+
+## @brief Fehler der Entpacker bei defekten Daten (EOFError: Daten nach Stromende).
+ERRORS = (zlib.error, EOFError, ValueError) + ((lzma.LZMAError,) if lzma is not None else ())
+
+## @brief Defekte komprimierte Daten oder entpackt größer als erlaubt.
+class DecompressError(ValueError):
+    pass
+
+MIN_SIZE = 256            # kleinere Nutzdaten lohnen den Aufwand nicht
+MAX_RATIO = 0.9           # nur übertragen, wenn komprimiert höchstens 90 % der Rohgröße
+PROBE_BYTES = 64 * 1024   # je Stichprobe (Anfang, Mitte, Ende)
+
+RAW_BYTES = metrics.counter("bymy_compression_raw_bytes_total", "Rohbytes vor Kompression (nur komprimiert gesendete)")
+WIRE_BYTES = metrics.counter("bymy_compression_wire_bytes_total", "Komprimierte Bytes auf der Leitung")
+
+## 2) Eigene Verfahren für die Ankündigung.
+#  @param config Config (compression = "zlib" | "lzma" | "off"; das genannte zuerst).
+#  @return Liste von Namen (leer bei "off").
+def advertised(config):
+    preferred = config.get("compression", "zlib")
+    if preferred == "off":
+        return []
+    return sorted(CODECS, key=lambda name: name != preferred)
+
+## 2) Wählt das erste eigene Verfahren, das die Gegenseite angekündigt hat.
+#  @param config Config.
+#  @param remote Liste der Gegenseite (z.B. aus parse_list).
+#  @return Name oder None.
+def choose(config, remote):
+    for name in advertised(config):
+        if name in remote:
+            return name
+    return None
+
+## @brief Formatiert eine Verfahrensliste für das Protokoll ("zlib,lzma" bzw. "-").
+def format_list(names):
+    return ",".join(names) or "-"
+
+## @brief Liest eine Verfahrensliste (unbekannte Namen werden ignoriert).
+def parse_list(text):
+    return [name for name in text.split(",") if name in CODECS]
+
+## 3) Komprimiert einen Block, falls es sich lohnt.
+#  @param codec Name oder None.
+#  @param data Rohdaten (bytes).
+#  @return (daten, codec) – codec ist None, wenn roh gesendet werden soll.
+def compress(codec, data):
+    if codec is None or len(data) < MIN_SIZE:
+        return data, None
+    packed = CODECS[codec][0](data)
+    if len(packed) > MAX_RATIO * len(data):
+        return data, None
+    RAW_BYTES.inc(n=len(data))
+    WIRE_BYTES.inc(n=len(packed))
+    return packed, codec
+
+## 3) Entpacker für einen Datenstrom (decompress(teil) liefert Rohdaten).
+#  @param codec Name.
+def decompressor(codec):
+    return CODECS[codec][1]()
+
+## @brief Entpackt einen vollständigen Block.
+#  @param codec Name.
+#  @param data Komprimierte Daten.
+#  @param limit Maximale Rohgröße (schützt vor "Zip-Bomben").
+#  @return Rohdaten.
+#  @throws DecompressError bei defekten Daten oder Überschreiten von limit.
+def decompress(codec, data, limit):
+    d = decompressor(codec)
+    try:
+        raw = d.decompress(data, limit + 1)
+    except ERRORS as e:
+        raise DecompressError(f"{codec}: {e}") from e
+    if len(raw) > limit:
+        raise DecompressError(f"{codec}: entpackt größer als {limit} Bytes")
+    return raw
+
+## 4) Schnelle Probe: lohnt Kompression für diese Datei?
+#  Komprimiert bis zu drei Stichproben mit zlib Stufe 1 (wenige Millisekunden).
+#  @param path Datei.
+#  @param size Dateigröße.
+#  @return True, wenn die Stichproben auf höchstens MAX_RATIO schrumpfen.
+def worth_compressing(path, size):
+    if size < MIN_SIZE:
+        return False
+    offsets = sorted({0, max(0, size // 2 - PROBE_BYTES // 2), max(0, size - PROBE_BYTES)})
+    raw = packed = 0
+    with open(path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            sample = f.read(PROBE_BYTES)
+            raw += len(sample)
+            packed += len(zlib.compress(sample, 1))
+    return packed <= MAX_RATIO * raw
@@ -2,26 +2,50 @@
 
 import toml
 import os
+import threading
+import time
 
 ## @file config_handler.py
 #  @brief Lädt & verwaltet die zentrale Konfigurationsdatei (config.toml)
 #  @details
 #  Zweck:
 #   1) Pfad zur globalen Konfigdatei speichern.
-#   2) Funktion zum vollständigen Laden (Dict).
-#   3) Funktion zum gezielten Lesen einzelner Werte.
+#   2) Funktion zum vollständigen Laden (Dict) – aus dem Cache, solange sich die Datei nicht ändert.
+#   3) Funktion zum gezielten Lesen einzelner Werte (ohne Kopie, für heiße Pfade).
+#   4) Funktion zum Schreiben einzelner Werte (atomar, invalidiert den Cache).
+#   5) Beobachter, der laufende Prozesse über Änderungen informiert (ohne Neustart).
 #  Damit greift jedes andere Modul konsistent auf die Chat-Einstellungen zu.
 
 CONFIG_FILE = "config.toml"
 
+_cache_key = None     # (mtime_ns, size, inode) der zuletzt geparsten Datei
+_cache = None         # zuletzt geparstes Dictionary
+_lock = threading.Lock()
+
+##
+# @brief Liefert das geparste Dictionary; parst nur neu, wenn sich die Datei geändert hat.
+# @return Das gecachte Dictionary (nicht verändern!).
+# @throws FileNotFoundError, wenn Datei nicht existiert.
+def _load():
+    global _cache_key, _cache
+    try:
+        st = os.stat(CONFIG_FILE)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Konfigurationsdatei '{CONFIG_FILE}' nicht gefunden.")
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if key != _cache_key:
+        with _lock:
+            if key != _cache_key:
+                _cache = toml.load(CONFIG_FILE)
+                _cache_key = key
+    return _cache
+
 ##
 # @brief Lädt die gesamte Konfiguration aus der TOML-Datei.
-# @return Ein Dictionary mit allen Konfigwerten.
+# @return Ein Dictionary mit allen Konfigwerten (eigene Kopie, darf verändert werden).
 # @throws FileNotFoundError, wenn Datei nicht existiert.
 def get_config():
-    if not os.path.exists(CONFIG_FILE):
-        raise FileNotFoundError(f"Konfigurationsdatei '{CONFIG_FILE}' nicht gefunden.")
-    return toml.load(CONFIG_FILE)
+    return dict(_load())
 
 ##
 # @brief Gibt gezielt einen einzelnen Wert aus der Konfig zurück.
@@ -29,5 +53,50 @@ def get_config():
 # @param default Optionaler Rückgabewert, falls Key nicht vorhanden.
 # @return Der Wert aus der Datei oder der Default.
 def get_config_value(key, default=None):
-    config = get_config()
-    return config.get(key, default)
\ No newline at end of file
+    return _load().get(key, default)
+
+##
+# @brief Verwirft den Cache und lädt die Datei sofort neu.
+# @return Ein Dictionary mit allen Konfigwerten.
+def reload_config():
+    global _cache_key
+    with _lock:
+        _cache_key = None
+    return get_config()
+
+##
+# @brief Schreibt einen einzelnen Wert atomar in die Konfigdatei.
+# @param key Schlüsselname.
+# @param value Neuer Wert.
+def set_config_value(key, value):
+    global _cache_key
+    with _lock:
+        config = toml.load(CONFIG_FILE)
+        config[key] = value
+        tmp = CONFIG_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            toml.dump(config, f)
+        os.replace(tmp, CONFIG_FILE)
+        _cache_key = None
+
+##
+# @brief Beobachtet die Konfigdatei und ruft bei Änderungen den Callback auf.
+# @param callback Funktion(neue_config) – läuft im Beobachter-Thread.
+# @param interval Prüfintervall in Sekunden (ein os.stat pro Intervall).
+# @return Der gestartete Daemon-Thread.
+def watch_config(callback, interval=1.0):
+    def loop():
+        _load()
+        last = _cache_key
+        while True:
+            time.sleep(interval)
+            try:
+                _load()
+            except (OSError, ValueError, toml.TomlDecodeError):
+                continue
+            if _cache_key != last:
+                last = _cache_key
+                callback(get_config())
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
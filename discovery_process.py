@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
-import socket
-from config_handler import get_config
+import socket, time
+from config_handler import get_config, watch_config
+from peer_registry import PeerRegistry, ExpiryHeap, TokenBuckets, Announcements
+from fanout import send_batch
+from ipc_channel import signal_ready
+import metrics, profiling
 
 ## @file discovery_process.py
 #  @brief Discovery-Modul für BYMY Chat (UDP-Broadcast-Discovery nach SLCP-Art)
@@ -9,9 +13,25 @@ from config_handler import get_config
 #  Ablauf & Zweck:
 #  1) Öffnet einen UDP-Socket am WHOIS-Port für Discovery.
 #  2) Wartet endlos auf JOIN, LEAVE oder WHO Nachrichten.
-#  3) JOIN: Speichert neuen Nutzer, broadcastet an bekannte.
-#  4) LEAVE: Entfernt Nutzer, broadcastet Austritt an bekannte.
-#  5) WHO: Antwortet mit allen bekannten Nutzern, wenn Absender bekannt ist.
+#  3) JOIN/HEARTBEAT: Speichert neuen Nutzer, kündigt ihn den bekannten an;
+#     HEARTBEAT verlängert die Lebensdauer (peer_ttl) des Nutzers.
+#     Wiederholte JOINs desselben Handles begrenzt ein Token-Bucket (join_rate/join_burst).
+#  4) LEAVE: Entfernt Nutzer, kündigt den Austritt den bekannten an.
+#  5) WHO: Antwortet mit allen bekannten Nutzern, wenn Absender bekannt ist
+#     (O(1)-Lookup über den IP-Index, Antwort in Seiten unter MTU-Größe);
+#     "WHO <epoche>" erhält nur die JOIN/LEAVE-Änderungen seit dieser Epoche.
+#  6) Ablauf: Nutzer ohne HEARTBEAT innerhalb von peer_ttl werden entfernt und
+#     per LEAVE an alle gemeldet (Min-Heap, O(log n) statt Vollscan pro Tick).
+#     Clients, die nie einen HEARTBEAT senden (alte Versionen), laufen nie ab.
+#  3/4/6) Ankündigungen: Standard (announce_interval = 0) ist wie bisher je Änderung ein
+#     "JOIN h port" bzw. "LEAVE h" an alle anderen. Mit announce_interval > 0 werden
+#     JOINs & LEAVEs so lange gesammelt und dann als DELTA-Seiten verschickt (ein Datagramm
+#     pro Peer & Takt statt eines pro Änderung – startet ein ganzer Raum, sonst O(N²)).
+#     Nur einschalten, wenn alle Clients im Netz DELTA-Ankündigungen verstehen: ältere
+#     Clients werten nur einzelne JOIN/LEAVE-Zeilen aus und sähen sonst keine Beitritte
+#     und Austritte mehr.
+#  7) Metriken: Nachrichten je Kommando, Verarbeitungszeit, Teilnehmerzahl;
+#     mit metrics_dir in config.toml periodisch nach <metrics_dir>/discovery.prom.
 #  
 #  Damit stellt das Modul sicher, dass jeder Client dynamisch andere Clients im LAN finden kann,
 #  ohne zentralen Server.
@@ -19,43 +39,112 @@ from config_handler import get_config
 RESET = "\033[0m"
 YELLOW = "\033[93m"
 
+MESSAGES = metrics.counter("bymy_discovery_messages_total", "Empfangene Discovery-Nachrichten nach Kommando", label="cmd")
+SENT = metrics.counter("bymy_discovery_datagrams_sent_total", "Gesendete Datagramme (Weiterleitungen & Antworten)")
+EXPIRED = metrics.counter("bymy_discovery_expired_total", "Wegen fehlendem HEARTBEAT entfernte Nutzer")
+SUPPRESSED = metrics.counter("bymy_discovery_joins_suppressed_total", "Per Token-Bucket verworfene JOINs")
+ANNOUNCED = metrics.counter("bymy_discovery_announced_total", "Angekündigte JOIN/LEAVE-Änderungen")
+HANDLE_SECONDS = metrics.histogram("bymy_discovery_handle_seconds", "Verarbeitungszeit pro Discovery-Nachricht")
+
+ANNOUNCE_INTERVAL = 0     # Sekunden, über die JOIN/LEAVE gesammelt werden (0 → einzeln & sofort, kompatibel)
+JOIN_RATE = 0.2           # JOINs pro Sekunde & Handle nach dem Burst (0 → unbegrenzt)
+JOIN_BURST = 2
+PRUNE_INTERVAL = 60       # Sekunden zwischen dem Aufräumen voller Token-Buckets
+
 ##
 # @brief Discovery-Hauptprozess: Verwaltet Teilnehmerliste und antwortet auf Anfragen.
 # @param whoisport UDP-Port für WHO/JOIN/LEAVE-Kommunikation.
-def run_discovery_process(whoisport):
-    known_users = {}  # {handle: (ip, port)}
+# @param peer_ttl Sekunden ohne HEARTBEAT, nach denen ein Nutzer als verschwunden gilt.
+# @param settings Optional live aktualisiertes Config-Dict (peer_ttl, announce_interval,
+#                 join_rate & join_burst werden bei jeder Verwendung gelesen).
+# @param ready Optionaler Callback, sobald der WHOIS-Port gebunden ist.
+def run_discovery_process(whoisport, peer_ttl=15.0, settings=None, ready=None):
+    known_users = PeerRegistry()  # handle → (ip, port), indiziert nach IP und (ip, port)
+    liveness = ExpiryHeap()       # handle → Ablaufzeit (nur Nutzer mit HEARTBEAT)
+    join_buckets = TokenBuckets() # handle → Tokens für wiederholte JOINs
+    announcements = Announcements(known_users.epoch)
+    next_prune = time.monotonic() + PRUNE_INTERVAL
+
+    def setting(key, default):
+        return float(settings.get(key, default)) if settings is not None else default
+
+    ## 3/4/6) Kündigt eine Änderung an: gesammelt für den Takt oder (Intervall 0) sofort.
+    def announce(handle, entry, legacy, exclude=None):
+        ANNOUNCED.inc()
+        interval = setting("announce_interval", ANNOUNCE_INTERVAL)
+        if interval > 0:
+            announcements.add(handle, entry, time.monotonic() + interval)
+        else:
+            SENT.inc(n=send_batch(legacy, [a for h, a in known_users.items() if h != exclude], sock))
 
     # 1) UDP-Socket vorbereiten & binden
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
     sock.bind(("", whoisport))
+    idle_timeout = min(1.0, peer_ttl / 4)
+    metrics.gauge("bymy_discovery_peers", "Bekannte Nutzer", fn=lambda: len(known_users))
+    metrics.gauge("bymy_discovery_udp_receive_drops", "Vom Kernel verworfene Datagramme am WHOIS-Port",
+                  fn=lambda: metrics.udp_socket_drops(whoisport))
 
     print(f"{YELLOW}[DISCOVERY] gestartet auf Port {whoisport}{RESET}\n")
+    if ready is not None:
+        ready()
 
     # 2) Endlosschleife für eingehende Nachrichten
     while True:
-        data, addr = sock.recvfrom(1024)
-        msg = data.decode("utf-8").strip()
+        now = time.monotonic()
+        ## 6) Abgelaufene Nutzer entfernen & LEAVE in ihrem Namen ankündigen.
+        for handle in liveness.pop_expired(now):
+            known_users.remove(handle)
+            EXPIRED.inc()
+            announce(handle, f"LEAVE {handle}", f"LEAVE {handle}")
+            print(f"{YELLOW}[DISCOVERY] {handle} ohne Heartbeat entfernt{RESET}")
+
+        ## 3/4) Gesammelte Ankündigungen des Takts an alle bekannten Nutzer senden.
+        if announcements.due is not None and now >= announcements.due:
+            addrs = list(known_users.by_handle.values())
+            for page in announcements.flush(known_users.epoch):
+                SENT.inc(n=send_batch(page, addrs, sock))
+        if now >= next_prune:
+            join_buckets.prune(setting("join_rate", JOIN_RATE), setting("join_burst", JOIN_BURST), now)
+            next_prune = now + PRUNE_INTERVAL
 
-        ## 3) JOIN verarbeiten:
-        # - JOIN <handle> <port>
-        # - speichere Absender & broadcaste an andere bekannte Nutzer.
-        if msg.startswith("JOIN"):
+        # höchstens bis zum nächsten Takt warten
+        sock.settimeout(idle_timeout if announcements.due is None
+                        else min(idle_timeout, max(announcements.due - now, 0.001)))
+        try:
+            data, addr = sock.recvfrom(65535)
+        except socket.timeout:
+            continue
+        start = time.perf_counter()
+        msg = data.decode("utf-8", errors="ignore").strip()
+        cmd = msg.split(" ", 1)[0]
+        MESSAGES.inc(cmd if cmd in ("JOIN", "HEARTBEAT", "LEAVE", "WHO") else "other")
+
+        ## 3) JOIN/HEARTBEAT verarbeiten:
+        # - JOIN <handle> <port> bzw. HEARTBEAT <handle> <port>
+        # - speichere Absender & kündige ihn den anderen bekannten Nutzern an.
+        # - Ein HEARTBEAT eines unveränderten Nutzers verlängert nur dessen TTL.
+        # - JOINs über dem Token-Bucket des Handles werden verworfen (JOIN-Sturm,
+        #   Neustart-Schleife); ein späterer HEARTBEAT trägt eine neue Adresse nach.
+        if msg.startswith("JOIN") or msg.startswith("HEARTBEAT"):
             parts = msg.split()
             if len(parts) == 3:
                 handle = parts[1]
                 port = int(parts[2])
                 ip = addr[0]
-                known_users[handle] = (ip, port)
-
-                for h, (ip_other, port_other) in known_users.items():
-                    if h != handle:
-                        try:
-                            join_msg = f"JOIN {handle} {port}"
-                            sock.sendto(join_msg.encode("utf-8"), (ip_other, port_other))
-                        except Exception:
-                            pass  # Ignoriere Fehler beim Weiterleiten
+                is_heartbeat = parts[0] == "HEARTBEAT"
+                now = time.monotonic()
+                if not is_heartbeat and not join_buckets.allow(
+                        handle, setting("join_rate", JOIN_RATE), setting("join_burst", JOIN_BURST), now):
+                    SUPPRESSED.inc()
+                else:
+                    if is_heartbeat or handle in liveness:
+                        liveness.touch(handle, now + setting("peer_ttl", peer_ttl))
+                    if not (is_heartbeat and handle in known_users and known_users[handle] == (ip, port)):
+                        known_users.add(handle, ip, port)
+                        announce(handle, f"JOIN {handle} {ip} {port}", f"JOIN {handle} {port}", exclude=handle)
 
         ## 4) LEAVE verarbeiten:
         # - LEAVE <handle>
@@ -64,32 +153,35 @@ def run_discovery_process(whoisport):
             parts = msg.split()
             if len(parts) == 2:
                 handle = parts[1]
-                known_users.pop(handle, None)
-
-                for h, (ip_other, port_other) in known_users.items():
-                    try:
-                        sock.sendto(msg.encode("utf-8"), (ip_other, port_other))
-                    except Exception:
-                        pass
+                if known_users.remove(handle) is not None:
+                    announce(handle, f"LEAVE {handle}", msg)
+                liveness.discard(handle)
 
         ## 5) WHO beantworten:
-        # - Nur wenn Absender-IP schon in known_users.
-        # - Sende KNOWNUSERS <handle1 ip1 port1>, ...
-        elif msg == "WHO":
+        # - Nur wenn Absender-IP schon in known_users (O(1) über IP-Index).
+        # - WHO: Sende KNOWNUSERS <handle1 ip1 port1>, ..., EPOCH e, PAGE n/gesamt
+        # - WHO <e>: Sende nur die Änderungen seit Epoche e (DELTA, siehe peer_registry.py)
+        elif msg == "WHO" or msg.startswith("WHO "):
             sender_ip = addr[0]
-            sender_port = None
-            for h, (ip, p) in known_users.items():
-                if ip == sender_ip:
-                    sender_port = p
-                    break
+            sender_port = known_users.port_for_ip(sender_ip)
 
             if sender_port:
-                user_list = ", ".join(f"{h} {ip} {p}" for h, (ip, p) in known_users.items())
-                response = f"KNOWNUSERS {user_list}"
-                sock.sendto(response.encode("utf-8"), (sender_ip, sender_port))
+                since = msg[len("WHO"):].strip()
+                pages = known_users.delta_pages(int(since)) if since.isdigit() else known_users.pages()
+                for page in pages:
+                    sock.sendto(page, (sender_ip, sender_port))
+                SENT.inc(n=len(pages))
+
+        HANDLE_SECONDS.observe(time.perf_counter() - start)
 
 
-## @brief Standalone-Startpunkt: Liest Konfig & ruft Hauptprozess auf.
+## @brief Standalone-Startpunkt: Liest Konfig, beobachtet sie auf Änderungen & ruft Hauptprozess auf.
 if __name__ == "__main__":
     config = get_config()
-    run_discovery_process(config["whoisport"])
\ No newline at end of file
+    watch_config(config.update)
+    metrics.set_enabled(config.get("metrics", True))
+    if config.get("metrics_dir"):
+        metrics.start_dump(config["metrics_dir"], "discovery", float(config.get("metrics_interval", 10)))
+    profiling.install(config, "discovery")
+    run_discovery_process(config["whoisport"], float(config.get("peer_ttl", 15)), config,
+                          ready=lambda: signal_ready("discovery"))
\ No newline at end of file
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+## @file fanout.py
+#  @brief Gebündelter UDP-Versand an viele Empfänger über einen langlebigen Socket
+#  @details
+#  Bisher erzeugte jeder Aufruf von send_msg/send_who/send_join/send_leave einen
+#  eigenen UDP-Socket. Dieses Modul hält pro Prozess genau einen Sende-Socket
+#  (mit SO_BROADCAST) und verschickt ein einmal kodiertes Datagramm in einem
+#  Durchlauf an beliebig viele Ziele.
+#  Struktur & Ablauf:
+#   1) sender_socket – prozessweiter Sende-Socket (lazy, thread-sicher)
+#   2) send_to – ein Datagramm an ein Ziel
+#   3) send_batch – dasselbe Datagramm an viele Ziele
+
+import socket, threading
+
+_sock = None
+_sock_lock = threading.Lock()
+
+## 1) Liefert den prozessweiten UDP-Sende-Socket (wird beim ersten Aufruf angelegt).
+#  sendto auf einem UDP-Socket ist aus mehreren Threads gleichzeitig zulässig.
+#  @return socket.socket
+def sender_socket():
+    global _sock
+    if _sock is None:
+        with _sock_lock:
+            if _sock is None:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                _sock = sock
+    return _sock
+
+## 2) Sendet ein Datagramm an ein Ziel.
+#  @param payload Bytes oder String.
+#  @param addr (ip, port).
+def send_to(payload, addr):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    sender_socket().sendto(payload, addr)
+
+## 3) Sendet dasselbe Datagramm an viele Ziele in einem Durchlauf.
+#  Fehler einzelner Ziele brechen den Durchlauf nicht ab.
+#  @param payload Bytes oder String (wird nur einmal kodiert).
+#  @param addrs Iterable von (ip, port).
+#  @param sock Optional eigener Socket (z.B. der gebundene Discovery-Socket).
+#  @return Anzahl erfolgreich gesendeter Datagramme.
+def send_batch(payload, addrs, sock=None):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    sendto = (sock or sender_socket()).sendto
+    sent = 0
+    for addr in addrs:
+        try:
+            sendto(payload, addr)
+            sent += 1
+        except OSError:
+            pass
+    return sent
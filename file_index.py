@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+## @file file_index.py
+#  @brief Dateinamen-Index für das CLI-Kommando "send <bild>"
+#  @details
+#  Ersetzt den vollständigen os.walk über $HOME bei jedem "send".
+#  Struktur & Ablauf:
+#   1) FileIndex – sortiertes Array (name, pfad) für Präfixsuche per bisect
+#   2) refresh – inkrementell: nur Ordner mit geänderter mtime werden neu gelesen
+#   3) start – Aufbau & periodische Aktualisierung im Hintergrund-Thread
+#   4) lookup – Kandidaten zu einem Präfix (Groß-/Kleinschreibung egal)
+#   5) save/load – optionale Persistenz zwischen zwei Starts
+#  Speicher bleibt begrenzt: höchstens max_entries Dateien, versteckte Ordner
+#  (".git", ".cache", ...) werden übersprungen.
+
+import os, json, time, bisect, threading
+
+## 1) Präfix-Index über Dateinamen unter konfigurierbaren Wurzelordnern.
+class FileIndex:
+    ## @brief Legt den Index an (noch ohne Aufbau).
+    #  @param roots Liste von Wurzelordnern ("~" wird expandiert).
+    #  @param cache_path Pfad der Cache-Datei oder None (keine Persistenz).
+    #  @param max_entries Maximale Anzahl indizierter Dateien.
+    def __init__(self, roots, cache_path=None, max_entries=200000):
+        self.roots = [os.path.abspath(os.path.expanduser(r)) for r in roots]
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.dirs = {}      # {ordner: (mtime, [dateien], [unterordner])}
+        self.entries = []   # sortiert: [(name_klein, pfad), ...]
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+
+    ## 2) Aktualisiert den Index; unveränderte Ordner werden nicht neu gelesen.
+    #  @return Anzahl neu eingelesener Ordner.
+    def refresh(self):
+        dirs, rescanned, count = {}, 0, 0
+        stack = list(reversed(self.roots))
+        while stack and count < self.max_entries:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = self.dirs.get(path)
+            if cached is None or cached[0] != mtime:
+                files, subdirs = [], []
+                try:
+                    with os.scandir(path) as it:
+                        for entry in it:
+                            if entry.name.startswith("."):
+                                continue
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.path)
+                                elif entry.is_file():
+                                    files.append(entry.name)
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+                cached = (mtime, files, subdirs)
+                rescanned += 1
+            dirs[path] = cached
+            count += len(cached[1])
+            stack.extend(reversed(cached[2]))
+        if rescanned == 0 and len(dirs) == len(self.dirs):
+            self.ready.set()
+            return 0
+        entries = [(f.lower(), os.path.join(d, f)) for d, (_, files, _) in dirs.items() for f in files]
+        entries = entries[:self.max_entries]
+        entries.sort()
+        with self.lock:
+            self.dirs = dirs
+            self.entries = entries
+        self.ready.set()
+        return rescanned
+
+    ## 3) Baut den Index im Hintergrund auf und aktualisiert ihn periodisch.
+    #  @param interval Sekunden zwischen zwei Aktualisierungen.
+    def start(self, interval=60):
+        def loop():
+            while True:
+                try:
+                    if self.refresh():
+                        self.save()
+                except Exception as e:
+                    print(f"Fehler beim Dateiindex: {e}")
+                time.sleep(interval)
+        self.load()
+        threading.Thread(target=loop, daemon=True).start()
+
+    ## 4) Sucht Dateien, deren Name mit `prefix` beginnt.
+    #  @param prefix Beginn des Dateinamens.
+    #  @param limit Maximale Anzahl Kandidaten.
+    #  @param timeout Wartezeit auf den ersten Aufbau in Sekunden.
+    #  @return Liste von Pfaden (exakte Treffer zuerst).
+    def lookup(self, prefix, limit=10, timeout=5.0):
+        self.ready.wait(timeout)
+        prefix = prefix.lower()
+        with self.lock:
+            entries = self.entries
+        i = bisect.bisect_left(entries, (prefix, ""))
+        result = []
+        while i < len(entries) and entries[i][0].startswith(prefix) and len(result) < limit:
+            result.append(entries[i])
+            i += 1
+        result.sort(key=lambda e: e[0] != prefix)
+        return [path for _, path in result]
+
+    ## 5a) Speichert die Ordnerliste (nur mit cache_path).
+    def save(self):
+        if not self.cache_path:
+            return
+        with self.lock:
+            data = {"roots": self.roots, "dirs": self.dirs}
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.cache_path)
+
+    ## 5b) Lädt eine gespeicherte Ordnerliste; der Index ist danach sofort nutzbar.
+    def load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("roots") != self.roots:
+            return
+        dirs = {d: tuple(v) for d, v in data.get("dirs", {}).items()}
+        entries = sorted((f.lower(), os.path.join(d, f)) for d, (_, files, _) in dirs.items() for f in files)
+        with self.lock:
+            self.dirs = dirs
+            self.entries = entries
+        self.ready.set()
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+
+## @file file_transfer.py
+#  @brief Wiederaufnehmbare, parallele Dateiübertragung in geprüften Blöcken
+#  @details
+#  Die Datei wird in Blöcke (chunk_size) zerlegt, die über mehrere parallele
+#  TCP-Verbindungen an port + 1 gehen. Jeder Block trägt eine SHA-256-Prüfsumme.
+#  Der Empfänger führt ein Manifest (.<id>.json) mit den fertigen Blöcken; nach
+#  einem Abbruch fragt der Sender per QUERY nur die fehlenden Blöcke ab.
+#  Protokoll (Zeilen mit \n, Antworten vom Empfänger):
+#   HAVE <sender> <sha256> <dateiname>                    →  HAVE 1 <gespeicherter name> | HAVE 0
+#   HELLO <verfahren|->                                   →  HELLO <verfahren|->   (optional, vor QUERY)
+#   QUERY <sender> <id> <dateiname> <größe> <chunk_size>  →  MISSING <i,j,...|-> | ERROR <grund>
+#   CHUNK <id> <index> <länge> <sha256> + <länge> Bytes     →  OK <index> | BAD <index>
+#   CHUNK <id> <index> <länge> <sha256> <verfahren> <n> + n komprimierte Bytes (Prüfsumme über Rohdaten)
+#  Der Empfänger nimmt nur IDs aus 16 Hex-Zeichen (transfer_id), 0 < chunk_size ≤ MAX_CHUNK
+#  und Größen bis max_file_size an; eine laufende ID mit anderer Größe/Blockgröße wird
+#  mit ERROR abgelehnt. Transfers ohne Aktivität seit TRANSFER_IDLE Sekunden werden
+#  geschlossen (Teil-Datei & Manifest bleiben für die Wiederaufnahme liegen).
+#  Alte Empfänger kennen QUERY nicht und schließen die Verbindung; dann fällt
+#  der Sender auf das klassische IMG-Format zurück. Empfänger ohne HELLO
+#  schließen ebenso – dann folgt QUERY ohne HELLO und alle Blöcke gehen roh.
+#  Komprimiert wird nur, wenn die Probe (compression.worth_compressing) anschlägt,
+#  und je Block nur, wenn er dabei kleiner wird; entpackt wird beim Empfang blockweise.
+#  Fertige Dateien landen im inhaltsadressierten Speicher (image_store.py); mit
+#  HAVE (offer) entfällt der Versand, wenn der Empfänger den Inhalt schon hat.
+#  Struktur & Ablauf:
+#   1) Konstanten & transfer_id
+#   2) Transfer – Empfängerzustand (Teil-Datei, Manifest)
+#   3) get_transfer – Transfers über mehrere Verbindungen teilen
+#   4) _ChunkSink – Blockdaten (roh oder komprimiert) prüfen & schreiben
+#      serve_connection – Empfang (Thread-Engine)
+#   5) serve_stream – Empfang (asyncio-Engine)
+#   6) send_file – Sender: fehlende Blöcke parallel übertragen
+#   7) offer – Sender: vor dem Versand per HAVE nachfragen
+
+import os, re, json, time, socket, hashlib, threading
+import compression, metrics
+from image_store import ImageStore, file_digest, hash_file, DEDUP, DEDUP_BYTES
+
+## 1) Standardwerte (überschreibbar per config.toml: chunk_size, transfer_streams, transfer_retries).
+CHUNK_SIZE = 4 * 1024 * 1024
+STREAMS = 4
+RETRIES = 3
+RECV_BUFSIZE = 256 * 1024
+MAX_CHUNK = 64 * 1024 * 1024
+MAX_FILE_SIZE = 4 * 1024 ** 3    # config.toml: max_file_size
+TRANSFER_IDLE = 300              # Sekunden ohne Aktivität, bis ein Transfer geschlossen wird
+TID = re.compile(r"[0-9a-f]{16}")
+DIGEST = re.compile(r"[0-9a-f]{64}")
+PROTOCOL_CMDS = (b"QUERY", b"CHUNK", b"HELLO", b"HAVE ")
+
+IMAGE_BYTES = metrics.counter("bymy_image_bytes_received_total", "Empfangene (geprüfte) Bildbytes")
+IMAGES = metrics.counter("bymy_images_received_total", "Vollständig empfangene Bilder")
+CHUNKS_BAD = metrics.counter("bymy_chunks_rejected_total", "Blöcke mit falscher Prüfsumme")
+
+## @brief Bildet eine stabile ID für (Absender, Datei, Größe, Änderungszeit).
+#  Ein erneuter Versand derselben Datei landet so im selben Manifest.
+#  @return Hex-String mit 16 Zeichen.
+def transfer_id(sender, filename, size, mtime):
+    key = f"{sender}\0{filename}\0{size}\0{mtime}".encode("utf-8")
+    return hashlib.sha1(key).hexdigest()[:16]
+
+## 2) Empfängerseitiger Zustand eines Transfers.
+class Transfer:
+    ## @brief Öffnet bzw. setzt einen Transfer fort.
+    #  @param image_dir Zielordner.
+    #  @param sender Absender-Handle.
+    #  @param tid Transfer-ID.
+    #  @param filename Zieldateiname.
+    #  @param size Dateigröße in Bytes.
+    #  @param chunk_size Blockgröße in Bytes.
+    def __init__(self, image_dir, sender, tid, filename, size, chunk_size):
+        self.sender = sender
+        self.tid = tid
+        self.image_dir = image_dir
+        self.filename = os.path.basename(filename)
+        self.size = size
+        self.chunk_size = chunk_size
+        self.total = max(1, -(-size // chunk_size))
+        self.part_path = os.path.join(image_dir, f".{tid}.part")
+        self.manifest_path = os.path.join(image_dir, f".{tid}.json")
+        self.lock = threading.Lock()
+        self.completed = False
+        self.done = set()
+        if os.path.exists(self.manifest_path) and os.path.exists(self.part_path):
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest.get("size") == size and manifest.get("chunk_size") == chunk_size:
+                    self.done = set(manifest.get("done", []))
+            except (OSError, ValueError):
+                self.done = set()
+        self.fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        os.ftruncate(self.fd, size)
+        self.last_active = time.monotonic()
+
+    ## @brief Byte-Bereich eines Blocks.
+    #  @param index Blocknummer.
+    #  @return (offset, länge).
+    def chunk_range(self, index):
+        offset = index * self.chunk_size
+        return offset, max(0, min(self.chunk_size, self.size - offset))
+
+    ## @brief Liste der noch fehlenden Blöcke.
+    def missing(self):
+        with self.lock:
+            self.last_active = time.monotonic()
+            return [i for i in range(self.total) if i not in self.done]
+
+    ## @brief Schreibt Daten an eine Position der Teil-Datei.
+    #  Unter dem Lock, damit close() den Deskriptor nicht während des Schreibens freigibt.
+    #  @exception OSError Transfer wurde wegen Inaktivität geschlossen.
+    def write(self, offset, data):
+        with self.lock:
+            if self.fd is None:
+                raise OSError(f"Transfer {self.tid} geschlossen")
+            os.pwrite(self.fd, data, offset)
+            self.last_active = time.monotonic()
+
+    ## @brief Schließt die Teil-Datei eines nicht abgeschlossenen Transfers
+    #  (Teil-Datei & Manifest bleiben für eine spätere QUERY erhalten).
+    def close(self):
+        with self.lock:
+            if self.fd is not None and not self.completed:
+                os.close(self.fd)
+                self.fd = None
+
+    ## @brief Markiert einen Block als fertig und schließt den Transfer ggf. ab.
+    #  Die fertige Datei geht in den ImageStore; filename ist danach der dort vergebene Name.
+    #  Die Prüfsumme der ganzen Datei entsteht außerhalb des Locks (liest bis max_file_size);
+    #  die asyncio-Engine ruft mark_done deshalb im Executor auf.
+    #  @param index Blocknummer.
+    #  @return True, wenn mit diesem Block die Datei vollständig wurde.
+    def mark_done(self, index):
+        with self.lock:
+            if self.completed:
+                return False
+            if self.fd is None:
+                raise OSError(f"Transfer {self.tid} geschlossen")
+            self.last_active = time.monotonic()
+            self.done.add(index)
+            if len(self.done) < self.total:
+                tmp = self.manifest_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"sender": self.sender, "filename": self.filename, "size": self.size,
+                               "chunk_size": self.chunk_size, "done": sorted(self.done)}, f)
+                os.replace(tmp, self.manifest_path)
+                return False
+            self.completed = True
+            os.fsync(self.fd)
+            os.close(self.fd)
+            self.fd = None
+        # ab hier schreibt niemand mehr in die Teil-Datei
+        self.filename = ImageStore(self.image_dir).add(self.part_path, hash_file(self.part_path), self.filename)
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+        with _transfers_lock:
+            _transfers.pop(self.tid, None)
+        return True
+
+## 3) Laufende Transfers, geteilt von allen parallelen Verbindungen.
+_transfers = {}
+_transfers_lock = threading.Lock()
+
+## @brief Liefert den Transfer zu einer ID (legt ihn bei Bedarf an) und schließt
+#  dabei Transfers, die seit TRANSFER_IDLE Sekunden ruhen.
+#  @return Transfer oder None, wenn die ID mit anderer Größe/Blockgröße läuft.
+def get_transfer(image_dir, sender, tid, filename, size, chunk_size):
+    with _transfers_lock:
+        now = time.monotonic()
+        for idle in [t for t in _transfers.values() if now - t.last_active > TRANSFER_IDLE]:
+            idle.close()
+            del _transfers[idle.tid]
+        transfer = _transfers.get(tid)
+        if transfer is not None:  # auch ein gerade abschließender (alle Blöcke da, Prüfsumme läuft)
+            if (transfer.size, transfer.chunk_size) != (size, chunk_size):
+                return None
+            return transfer
+        transfer = Transfer(image_dir, sender, tid, filename, size, chunk_size)
+        _transfers[tid] = transfer
+        return transfer
+
+## @brief Beantwortet eine QUERY-Zeile.
+#  @param max_size Größte angenommene Datei in Bytes (config.toml: max_file_size).
+#  @return Antwortzeile als Bytes.
+def _answer_query(line, image_dir, max_size=MAX_FILE_SIZE):
+    fields = line.split()
+    if len(fields) != 6 or not fields[4].isdigit() or not fields[5].isdigit():
+        return b"ERROR query\n"
+    _, sender, tid, filename, size, chunk_size = fields
+    size, chunk_size = int(size), int(chunk_size)
+    if not TID.fullmatch(tid):
+        return b"ERROR id\n"
+    if not 0 < chunk_size <= MAX_CHUNK or size > max_size:
+        return b"ERROR size\n"
+    transfer = get_transfer(image_dir, sender, tid, filename, size, chunk_size)
+    if transfer is None:
+        return b"ERROR mismatch\n"
+    missing = transfer.missing()
+    return f"MISSING {','.join(map(str, missing)) or '-'}\n".encode()
+
+## @brief Beantwortet eine HAVE-Zeile; ist der Inhalt da, gilt das Bild als empfangen.
+#  Der Dateiname ist das letzte Feld und darf Leerzeichen enthalten; defekte Zeilen → HAVE 0.
+#  @return Antwortzeile als Bytes.
+def _answer_have(line, image_dir, on_complete):
+    fields = line.rstrip("\n").split(" ", 3)
+    if len(fields) != 4 or not DIGEST.fullmatch(fields[2]) or not fields[3].strip():
+        return b"HAVE 0\n"
+    _, sender, digest, filename = fields
+    store = ImageStore(image_dir)
+    name = store.link(digest, filename)
+    if name is None:
+        return b"HAVE 0\n"
+    DEDUP.inc("have")
+    DEDUP_BYTES.inc(n=os.path.getsize(os.path.join(image_dir, name)))
+    on_complete(sender, name)
+    return f"HAVE 1 {name}\n".encode()
+
+## @brief Beantwortet eine HELLO-Zeile mit den eigenen Kompressionsverfahren.
+def _answer_hello(codecs):
+    return f"HELLO {compression.format_list(codecs)}\n".encode()
+
+## @brief Prüft einen CHUNK-Kopf gegen den Transfer.
+#  @param codecs Eigene Verfahren (andere werden abgelehnt).
+#  @return (transfer, index, länge auf der Leitung, _ChunkSink) oder None.
+def _parse_chunk(line, codecs):
+    fields = line.split()
+    if len(fields) == 5:
+        (_, tid, index, length, digest), codec, wire = fields, None, fields[3]
+    elif len(fields) == 7 and fields[5] in codecs:
+        _, tid, index, length, digest, codec, wire = fields
+    else:
+        return None
+    if not (index.isdigit() and length.isdigit() and wire.isdigit()):
+        return None
+    index, length, wire = int(index), int(length), int(wire)
+    transfer = _transfers.get(tid)
+    if transfer is None or index >= transfer.total:
+        return None
+    offset, expected = transfer.chunk_range(index)
+    if length != expected:
+        return None
+    return transfer, index, wire, _ChunkSink(transfer, offset, length, digest, codec)
+
+## @brief BAD-Antwort auf einen unbrauchbaren CHUNK-Kopf (Blocknummer, sofern vorhanden).
+def _bad_reply(line):
+    fields = line.split()
+    return f"BAD {fields[2] if len(fields) > 2 else '-'}\n".encode()
+
+## 4) Nimmt die Bytes eines Blocks entgegen, entpackt sie ggf. und schreibt sie an ihre Stelle.
+class _ChunkSink:
+    def __init__(self, transfer, offset, length, digest, codec):
+        self.transfer = transfer
+        self.offset = offset
+        self.length = length
+        self.digest = digest
+        self.pos = 0
+        self.hash = hashlib.sha256()
+        self.decompressor = compression.decompressor(codec) if codec else None
+
+    ## @brief Verarbeitet empfangene Bytes.
+    #  @return False, wenn die Rohdaten länger als angekündigt werden (Verbindung abbrechen).
+    def feed(self, data):
+        if self.decompressor is not None:
+            try:
+                data = self.decompressor.decompress(data, self.length - self.pos + 1)
+            except compression.ERRORS:
+                return False
+        if self.pos + len(data) > self.length:
+            return False
+        self.hash.update(data)
+        self.transfer.write(self.offset + self.pos, data)
+        self.pos += len(data)
+        return True
+
+    ## @brief True, wenn der Block vollständig ist und die Prüfsumme stimmt.
+    def verify(self):
+        return self.pos == self.length and self.hash.hexdigest() == self.digest
+
+## 4) Empfängt QUERY/CHUNK-Anfragen auf einer Verbindung (Thread-Engine).
+#  @param conn TCP-Verbindung.
+#  @param image_dir Zielordner.
+#  @param on_complete Callback(sender, filename) nach vollständigem Empfang.
+#  @param codecs Eigene Kompressionsverfahren (Antwort auf HELLO).
+#  @param max_size Größte angenommene Datei in Bytes.
+def serve_connection(conn, image_dir, on_complete, codecs=(), max_size=MAX_FILE_SIZE):
+    reader = conn.makefile("rb")
+    buf = bytearray(RECV_BUFSIZE)
+    view = memoryview(buf)
+    try:
+        while True:
+            line = reader.readline(1024).decode("utf-8", errors="ignore").strip()
+            if not line:
+                return
+            if line.startswith("HELLO"):
+                conn.sendall(_answer_hello(codecs))
+                continue
+            if line.startswith("HAVE "):
+                conn.sendall(_answer_have(line, image_dir, on_complete))
+                continue
+            if line.startswith("QUERY "):
+                conn.sendall(_answer_query(line, image_dir, max_size))
+                continue
+            if not line.startswith("CHUNK "):
+                return
+            chunk = _parse_chunk(line, codecs)
+            if chunk is None:
+                conn.sendall(_bad_reply(line))
+                return
+            transfer, index, wire, sink = chunk
+            pos = 0
+            while pos < wire:
+                n = reader.readinto(view[:min(len(buf), wire - pos)])
+                if not n:
+                    return
+                if not sink.feed(view[:n]):
+                    CHUNKS_BAD.inc()
+                    conn.sendall(f"BAD {index}\n".encode())
+                    return
+                pos += n
+            if not sink.verify():
+                CHUNKS_BAD.inc()
+                conn.sendall(f"BAD {index}\n".encode())
+                continue
+            IMAGE_BYTES.inc(n=sink.length)
+            if transfer.mark_done(index):
+                IMAGES.inc()
+                on_complete(transfer.sender, transfer.filename)
+            conn.sendall(f"OK {index}\n".encode())
+    finally:
+        reader.close()
+
+## 5) Empfängt QUERY/CHUNK-Anfragen (asyncio-Engine).
+#  HAVE und mark_done lesen ggf. die ganze Datei (SHA-256) und laufen daher im Executor.
+#  @param reader StreamReader der Verbindung.
+#  @param writer StreamWriter der Verbindung.
+#  @param first_line Bereits gelesene erste Kopfzeile.
+#  @param image_dir Zielordner.
+#  @param on_complete Callback(sender, filename) nach vollständigem Empfang.
+#  @param codecs Eigene Kompressionsverfahren (Antwort auf HELLO).
+#  @param max_size Größte angenommene Datei in Bytes.
+async def serve_stream(reader, writer, first_line, image_dir, on_complete, codecs=(), max_size=MAX_FILE_SIZE):
+    import asyncio  # erst hier: die Thread-Engine braucht es nicht
+    loop = asyncio.get_running_loop()
+    line = first_line
+    while line:
+        line = line.decode("utf-8", errors="ignore").strip()
+        if line.startswith("HELLO"):
+            writer.write(_answer_hello(codecs))
+        elif line.startswith("HAVE "):
+            writer.write(await loop.run_in_executor(None, _answer_have, line, image_dir, on_complete))
+        elif line.startswith("QUERY "):
+            writer.write(_answer_query(line, image_dir, max_size))
+        elif line.startswith("CHUNK "):
+            chunk = _parse_chunk(line, codecs)
+            if chunk is None:
+                writer.write(_bad_reply(line))
+                return
+            transfer, index, wire, sink = chunk
+            pos = 0
+            while pos < wire:
+                data = await reader.read(min(RECV_BUFSIZE, wire - pos))
+                if not data:
+                    return
+                if not sink.feed(data):
+                    CHUNKS_BAD.inc()
+                    writer.write(f"BAD {index}\n".encode())
+                    return
+                pos += len(data)
+            if not sink.verify():
+                CHUNKS_BAD.inc()
+                writer.write(f"BAD {index}\n".encode())
+            else:
+                IMAGE_BYTES.inc(n=sink.length)
+                if await loop.run_in_executor(None, transfer.mark_done, index):
+                    IMAGES.inc()
+                    on_complete(transfer.sender, transfer.filename)
+                writer.write(f"OK {index}\n".encode())
+        else:
+            return
+        await writer.drain()
+        line = await reader.readline()
+
+## @brief Fragt beim Empfänger die fehlenden Blöcke (und ggf. seine Kompressionsverfahren) ab.
+#  @param hello HELLO-Zeile oder None.
+#  @return (Liste der Blocknummern, None, wenn der Empfänger das Protokoll nicht kennt, oder
+#           False, wenn er den Transfer ablehnt (ERROR); Verfahren des Empfängers oder None,
+#           wenn er HELLO nicht kennt).
+def _query_missing(addr, query, hello=None):
+    codecs = None
+    with socket.create_connection(addr, timeout=10) as sock:
+        try:
+            sock.sendall((hello or b"") + query)
+            replies = sock.makefile("rb")
+            reply = replies.readline(1 << 20).decode("utf-8", errors="ignore").split()
+            if hello and len(reply) == 2 and reply[0] == "HELLO":
+                codecs = compression.parse_list(reply[1])
+                reply = replies.readline(1 << 20).decode("utf-8", errors="ignore").split()
+        except ConnectionResetError:
+            if not hello:
+                raise
+    if hello and codecs is None:
+        return _query_missing(addr, query)[0], None  # Empfänger ohne HELLO hat geschlossen
+    if reply[:1] == ["ERROR"]:
+        return False, codecs
+    if len(reply) != 2 or reply[0] != "MISSING":
+        return None, codecs
+    return ([] if reply[1] == "-" else [int(i) for i in reply[1].split(",")]), codecs
+
+## @brief Arbeitet Blöcke aus der gemeinsamen Liste über eine Verbindung ab.
+#  @param codec Kompressionsverfahren oder None (Blöcke, die nicht schrumpfen, gehen roh).
+def _send_worker(addr, filepath, tid, size, chunk_size, pending, lock, failed, codec=None):
+    try:
+        with socket.create_connection(addr, timeout=30) as sock, open(filepath, "rb") as f:
+            replies = sock.makefile("rb")
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    index = pending.pop()
+                offset = index * chunk_size
+                length = max(0, min(chunk_size, size - offset))
+                data = os.pread(f.fileno(), length, offset)
+                digest = hashlib.sha256(data).hexdigest()
+                payload, used = compression.compress(codec, data)
+                if used:
+                    head = f"CHUNK {tid} {index} {length} {digest} {used} {len(payload)}\n"
+                else:
+                    head = f"CHUNK {tid} {index} {length} {digest}\n"
+                sock.sendall(head.encode() + payload)
+                if replies.readline(64).split()[:1] != [b"OK"]:
+                    with lock:
+                        failed.append(index)
+    except OSError:
+        with lock:
+            failed.append(-1)
+
+## 6) Sendet eine Datei blockweise über mehrere parallele Verbindungen.
+#  Bei Abbrüchen wird erneut abgefragt und nur Fehlendes nachgesendet.
+#  @param to_handle Empfänger.
+#  @param filepath Datei.
+#  @param known_users Bekannte Nutzer.
+#  @param config Config (handle, chunk_size, transfer_streams, transfer_retries, compression).
+#  @return True bei Erfolg, False bei Fehlschlag, None wenn der Empfänger das Protokoll nicht kennt.
+def send_file(to_handle, filepath, known_users, config):
+    ip, port = known_users[to_handle]
+    addr = (ip, port + 1)
+    st = os.stat(filepath)
+    size = st.st_size
+    filename = os.path.basename(filepath)
+    chunk_size = int(config.get("chunk_size", CHUNK_SIZE))
+    streams = max(1, int(config.get("transfer_streams", STREAMS)))
+    tid = transfer_id(config["handle"], filename, size, st.st_mtime_ns)
+    query = f"QUERY {config['handle']} {tid} {filename} {size} {chunk_size}\n".encode()
+    offered = compression.advertised(config)
+    hello = f"HELLO {compression.format_list(offered)}\n".encode() if offered else None
+    codec = None
+    for _ in range(int(config.get("transfer_retries", RETRIES))):
+        try:
+            pending, codecs = _query_missing(addr, query, hello)
+        except OSError:
+            continue
+        if pending is None:
+            return None
+        if pending is False:
+            return False
+        if hello:  # einmal pro Versand aushandeln & proben
+            hello = None
+            codec = compression.choose(config, codecs or ())
+            if codec and not compression.worth_compressing(filepath, size):
+                codec = None
+        if not pending:
+            return True
+        pending.reverse()
+        lock = threading.Lock()
+        failed = []
+        workers = [threading.Thread(target=_send_worker,
+                                    args=(addr, filepath, tid, size, chunk_size, pending, lock, failed, codec))
+                   for _ in range(min(streams, len(pending)))]
+        for w in workers: w.start()
+        for w in workers: w.join()
+        if not failed and not pending:
+            return True
+    return False
+
+## 7) Fragt vor dem Versand, ob der Empfänger den Inhalt schon hat (HAVE).
+#  Alte Empfänger kennen HAVE nicht und schließen die Verbindung → normal senden.
+#  @param to_handle Empfänger.
+#  @param filepath Datei.
+#  @param known_users Bekannte Nutzer.
+#  @param config Config (handle).
+#  @return True, wenn der Empfänger das Bild schon hat (Versand entfällt).
+def offer(to_handle, filepath, known_users, config):
+    ip, port = known_users[to_handle]
+    line = f"HAVE {config['handle']} {file_digest(filepath)} {os.path.basename(filepath)}\n"
+    try:
+        with socket.create_connection((ip, port + 1), timeout=10) as sock:
+            sock.sendall(line.encode())
+            reply = sock.makefile("rb").readline(1024).split()
+    except OSError:
+        return False
+    return reply[:2] == [b"HAVE", b"1"]
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+## @file group_chat.py
+#  @brief Gruppenchats per IP-Multicast (ein Datagramm für alle Mitglieder)
+#  @details
+#  Jede Gruppe hat eine feste Multicast-Adresse 239.255.x.y (aus dem Namen
+#  abgeleitet, organisationslokal) am gemeinsamen Port group_port. Mitglieder
+#  treten der Adresse bei und erhalten so jede Gruppennachricht mit einem
+#  einzigen Datagramm des Senders – unabhängig von der Gruppengröße.
+#
+#  Protokoll (per Multicast an die Gruppe und/oder per Unicast an den Chat-Port):
+#   GJOIN <gruppe> <handle> hello <id>  – Beitritt (Mitglieder antworten je <id> einmal)
+#   GJOIN <gruppe> <handle> ack         – Antwort eines Mitglieds
+#   GLEAVE <gruppe> <handle>            – Austritt
+#   GMSG <gruppe> <absender> <id> <text>
+#   GINVITE <gruppe> <absender>         – Einladung (nur Unicast)
+#  Wessen GJOIN/GMSG einmal per Multicast ankam, gilt als per Multicast erreichbar.
+#  Alle übrigen Mitglieder (z.B. in Netzen ohne Multicast-Routing) erhalten eine
+#  Unicast-Kopie; doppelt Ankommendes wird über (absender, id) verworfen.
+#  Zustellung wie MSG ohne Bestätigung.
+#
+#  Struktur & Ablauf:
+#   1) Konstanten & group_address – Name → (Multicast-Adresse, Port)
+#   2) Groups.join/leave/invite – Mitgliedschaft ankündigen
+#   3) Groups.send – einmal Multicast + Unicast-Fallback
+#   4) Groups.handle_datagram – GJOIN/GLEAVE/GMSG/GINVITE verarbeiten
+#   5) _recv_loop – eigener Multicast-Socket (beide Engines)
+
+import re, sys, os, socket, struct, hashlib, threading
+from collections import deque
+import fanout, metrics
+
+RESET = "\033[0m"; YELLOW = "\033[93m"
+
+## 1) Standardwerte.
+GROUP_PORT = 4100
+MULTICAST_TTL = 1          # nur das lokale Netz
+NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+SEEN_LIMIT = 1024          # gemerkte (absender, id) zum Verwerfen von Duplikaten
+IP_MULTICAST_ALL = getattr(socket, "IP_MULTICAST_ALL", 49)  # Linux: nur beigetretene Gruppen empfangen
+
+GROUP_SENT = metrics.counter("bymy_group_datagrams_sent_total", "Gesendete Gruppen-Datagramme", label="via")
+GROUP_RECEIVED = metrics.counter("bymy_group_messages_received_total", "Empfangene Gruppennachrichten", label="via")
+
+## 1) Multicast-Adresse & Port einer Gruppe.
+#  @param name Gruppenname.
+#  @param port group_port.
+#  @return (ip, port).
+def group_address(name, port=GROUP_PORT):
+    digest = hashlib.sha1(name.encode("utf-8")).digest()
+    return f"239.255.{digest[0]}.{digest[1] or 1}", port
+
+## @brief Gültiger Gruppenname (keine Leerzeichen, da Teil des Protokolls)?
+def valid_name(name):
+    return bool(NAME_RE.match(name))
+
+## 2–5) Gruppen eines Netzwerkprozesses.
+class Groups:
+    ## @brief Bindet den Multicast-Socket und startet den Empfangsthread.
+    #  @param config Config (handle, group_port, multicast).
+    #  @param known_users Bekannte Nutzer {handle: (ip, port)} (für den Unicast-Fallback).
+    #  @param deliver Callback(gruppe, absender, text, id) – id wie auf dem Draht (je Absender eindeutig).
+    #  @param notify Callback(zeile) für Änderungen an die CLI (GROUP/GINVITE).
+    def __init__(self, config, known_users, deliver, notify):
+        self.config = config
+        self.known_users = known_users
+        self.deliver = deliver
+        self.notify = notify
+        self.port = int(config.get("group_port", GROUP_PORT))
+        self.lock = threading.Lock()
+        self.members = {}    # {gruppe: {handle: per_multicast}}
+        self.seen = set()
+        self.seen_order = deque()
+        self.session = os.urandom(3).hex()  # Präfix der Nachrichten-IDs (neu nach Neustart)
+        self.msg_ids = 0
+        self.sock = None
+        if config.get("multicast", True):
+            try:
+                self.sock = self._bind()
+            except OSError as e:
+                print(f"{YELLOW}[GRUPPEN] Multicast nicht verfügbar ({e}), nur Unicast.{RESET}")
+        if self.sock is not None:
+            threading.Thread(target=self._recv_loop, daemon=True).start()
+
+    def _bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)  # mehrere Clients pro Rechner
+        if sys.platform.startswith("linux"):
+            sock.setsockopt(socket.IPPROTO_IP, IP_MULTICAST_ALL, 0)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, MULTICAST_TTL)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)  # andere Clients auf diesem Rechner
+        sock.bind(("", self.port))
+        return sock
+
+    def _membership(self, name, option):
+        mreq = struct.pack("4s4s", socket.inet_aton(group_address(name, self.port)[0]), socket.inet_aton("0.0.0.0"))
+        self.sock.setsockopt(socket.IPPROTO_IP, option, mreq)
+
+    ## @brief Gruppen, denen dieser Client angehört.
+    def joined(self):
+        with self.lock:
+            return list(self.members)
+
+    ## @brief Teilt der CLI die Mitglieder einer Gruppe mit ("GROUP <name> <a,b|->").
+    def _announce(self, name):
+        with self.lock:
+            members = sorted(self.members.get(name, ()))
+        self.notify(f"GROUP {name} {','.join(members) or '-'}")
+
+    ## @brief Sendet ein Steuer-/Text-Datagramm an die Gruppe: Multicast + Unicast an die übrigen.
+    #  @param unicast_all True → Unicast an alle bekannten Nutzer (Beitritt: Mitglieder sind noch unbekannt).
+    def _send(self, name, payload, unicast_all=False):
+        me = self.config["handle"]
+        data = payload.encode("utf-8")
+        multicast_ok = False
+        if self.sock is not None:
+            try:
+                self.sock.sendto(data, group_address(name, self.port))
+                GROUP_SENT.inc("multicast")
+                multicast_ok = True
+            except OSError:
+                pass
+        with self.lock:
+            members = dict(self.members.get(name, {}))
+        if unicast_all:
+            handles = [h for h in list(self.known_users) if h != me]
+        else:
+            handles = [h for h, via_multicast in members.items()
+                       if h != me and not (multicast_ok and via_multicast)]
+        addrs = [self.known_users[h] for h in handles if h in self.known_users]
+        GROUP_SENT.inc("unicast", n=fanout.send_batch(data, addrs))
+
+    ## 2) Tritt einer Gruppe bei (legt sie an, falls noch niemand Mitglied ist).
+    #  @param name Gruppenname.
+    #  @return False bei ungültigem Namen.
+    def join(self, name):
+        if not valid_name(name):
+            return False
+        with self.lock:
+            new = name not in self.members
+            self.members.setdefault(name, {})[self.config["handle"]] = True
+        if new and self.sock is not None:
+            try:
+                self._membership(name, socket.IP_ADD_MEMBERSHIP)
+            except OSError as e:
+                print(f"{YELLOW}[GRUPPEN] Beitritt zu {group_address(name, self.port)[0]} fehlgeschlagen ({e}).{RESET}")
+        self._send(name, f"GJOIN {name} {self.config['handle']} hello {self._next_id()}", unicast_all=True)
+        self._announce(name)
+        return True
+
+    ## 2) Verlässt eine Gruppe.
+    def leave(self, name):
+        with self.lock:
+            if name not in self.members:
+                return
+        self._send(name, f"GLEAVE {name} {self.config['handle']}")
+        with self.lock:
+            del self.members[name]
+        if self.sock is not None:
+            try:
+                self._membership(name, socket.IP_DROP_MEMBERSHIP)
+            except OSError:
+                pass
+        self._announce(name)
+
+    ## 2) Verlässt alle Gruppen (beim Beenden).
+    def leave_all(self):
+        for name in self.joined():
+            self.leave(name)
+
+    ## 2) Lädt Nutzer per Unicast in eine Gruppe ein.
+    #  @param name Gruppenname.
+    #  @param handles Eingeladene.
+    def invite(self, name, handles):
+        addrs = [self.known_users[h] for h in handles if h in self.known_users]
+        fanout.send_batch(f"GINVITE {name} {self.config['handle']}", addrs)
+
+    ## 3) Sendet eine Gruppennachricht.
+    #  @param name Gruppenname (muss beigetreten sein).
+    #  @param text Nachricht.
+    #  @return False, wenn dieser Client nicht Mitglied ist.
+    def send(self, name, text):
+        with self.lock:
+            if name not in self.members:
+                return False
+        self._send(name, f"GMSG {name} {self.config['handle']} {self._next_id()} {text}")
+        return True
+
+    def _next_id(self):
+        with self.lock:
+            self.msg_ids += 1
+            return f"{self.session}.{self.msg_ids}"
+
+    ## @brief Ein Mitglied hat den Chat verlassen (LEAVE): aus allen Gruppen entfernen.
+    def member_left(self, handle):
+        changed = []
+        with self.lock:
+            for name, members in self.members.items():
+                if members.pop(handle, None) is not None:
+                    changed.append(name)
+        for name in changed:
+            self._announce(name)
+
+    def _first_seen(self, key):
+        with self.lock:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+            self.seen_order.append(key)
+            if len(self.seen_order) > SEEN_LIMIT:
+                self.seen.discard(self.seen_order.popleft())
+            return True
+
+    ## 4) Verarbeitet ein Gruppen-Datagramm.
+    #  @param data Datagramm (Bytes).
+    #  @param multicast True, wenn es über den Multicast-Socket kam.
+    #  @return True, wenn das Datagramm zu diesem Protokoll gehört.
+    def handle_datagram(self, data, multicast=False):
+        msg = data.decode("utf-8", errors="ignore")
+        parts = msg.split(" ", 4)
+        cmd = parts[0]
+        if cmd not in ("GJOIN", "GLEAVE", "GMSG", "GINVITE") or len(parts) < 3:
+            return cmd in ("GJOIN", "GLEAVE", "GMSG", "GINVITE")
+        name, handle = parts[1], parts[2]
+        me = self.config["handle"]
+        if handle == me:
+            return True
+        if cmd == "GINVITE":
+            self.notify(f"GINVITE {name} {handle}")
+            return True
+        with self.lock:
+            members = self.members.get(name)
+            if members is None:
+                return True  # nicht beigetreten (ohne IP_MULTICAST_ALL z.B. fremde Gruppen)
+            known = handle in members
+            if cmd == "GLEAVE":
+                members.pop(handle, None)
+            else:
+                members[handle] = members.get(handle, False) or multicast
+        if cmd == "GJOIN":
+            if not known:
+                self._announce(name)
+            if len(parts) == 5 and parts[3] == "hello" and self._first_seen((handle, parts[4])):
+                # Beitritt (kommt per Multicast & Unicast): eigene Mitgliedschaft einmal bestätigen
+                self._send(name, f"GJOIN {name} {me} ack")
+        elif cmd == "GLEAVE":
+            if known:
+                self._announce(name)
+        elif cmd == "GMSG" and len(parts) == 5:
+            if not known:
+                self._announce(name)
+            if self._first_seen((handle, parts[3])):
+                GROUP_RECEIVED.inc("multicast" if multicast else "unicast")
+                self.deliver(name, handle, parts[4], parts[3])
+        return True
+
+    ## 5) Liest Datagramme am Multicast-Socket.
+    def _recv_loop(self):
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(65535)
+            except OSError:
+                return
+            self.handle_datagram(data, multicast=True)
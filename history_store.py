@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+## @file history_store.py
+#  @brief Lokaler Nachrichtenverlauf pro Chatpartner mit Volltextsuche
+#  @details
+#  Bisher ging alles verloren, was die CLI ausgibt, sobald das Terminal scrollt.
+#  Struktur & Ablauf:
+#   1) HistoryStore – SQLite-Datei (WAL): Tabelle messages mit Index (peer, id)
+#      für schnelles Zurückblättern, FTS5-Tabelle als invertierter Index für /search
+#   2) record – nimmt Nachrichten gepuffert an (nur ein append unter Lock)
+#   3) _commit_loop/flush – ein Hintergrund-Thread schreibt gesammelt in einer Transaktion
+#   4) tail – die letzten n Nachrichten eines Chats (nur Indexzugriff, unabhängig von der Gesamtgröße)
+#   5) search – Volltextsuche, neueste Treffer zuerst
+#  Ohne FTS5 in der SQLite-Version fällt search auf LIKE zurück (langsamer, aber korrekt).
+
+import sqlite3, threading, time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    peer TEXT NOT NULL,
+    ts REAL NOT NULL,
+    outgoing INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_peer ON messages (peer, id);
+"""
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(text, content='messages', content_rowid='id')"
+
+## @brief Wandelt Suchtext in eine FTS5-Anfrage um (alle Wörter müssen vorkommen).
+#  Jedes Wort wird als String zitiert, damit Zeichen wie " - * : nicht als Syntax gelten.
+#  @param text Eingabe des Nutzers.
+#  @return FTS5-Ausdruck oder "" bei leerer Eingabe.
+def fts_query(text):
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+## 1) Verlauf aller Chats in einer SQLite-Datei.
+class HistoryStore:
+    ## @brief Öffnet (bzw. legt an) den Verlauf.
+    #  @param path Pfad der Datenbankdatei.
+    #  @param commit_interval Max. Wartezeit in Sekunden bis zum gesammelten Schreiben.
+    def __init__(self, path, commit_interval=0.5):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.write_lock = threading.Lock()
+        self.pending = []  # [(peer, ts, outgoing, text), ...]
+        self.db_lock = threading.Lock()  # eine Verbindung für Schreib-Thread & CLI
+        self.db = self._connect()
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.execute(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.db.commit()
+        threading.Thread(target=self._commit_loop, daemon=True).start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    ## 2) Merkt eine Nachricht vor (blockiert nicht auf die Platte).
+    #  @param peer Handle des Chatpartners.
+    #  @param text Nachricht.
+    #  @param outgoing True für eigene Nachrichten.
+    #  @param ts Zeitpunkt (Standard: jetzt).
+    def record(self, peer, text, outgoing=False, ts=None):
+        with self.cond:
+            self.pending.append((peer, ts or time.time(), int(outgoing), text))
+            self.cond.notify()
+
+    def _commit_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+            time.sleep(self.commit_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Fehler beim Schreiben des Verlaufs: {e}")
+
+    ## 3) Schreibt alle gepufferten Nachrichten in einer Transaktion.
+    def flush(self):
+        with self.write_lock:
+            with self.cond:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return
+            with self.db_lock, self.db:
+                cur = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM messages")
+                first = cur.fetchone()[0] + 1
+                rows = [(first + i,) + row for i, row in enumerate(batch)]
+                self.db.executemany("INSERT INTO messages (id, peer, ts, outgoing, text) VALUES (?, ?, ?, ?, ?)", rows)
+                if self.fts:
+                    self.db.executemany("INSERT INTO messages_fts (rowid, text) VALUES (?, ?)",
+                                        [(row[0], row[4]) for row in rows])
+
+    ## 4) Die letzten n Nachrichten eines Chats (älteste zuerst).
+    #  @param peer Handle des Chatpartners.
+    #  @param n Anzahl Nachrichten.
+    #  @return Liste von (zeit, ausgehend, text).
+    def tail(self, peer, n=20):
+        self.flush()
+        with self.db_lock:
+            rows = self.db.execute("SELECT ts, outgoing, text FROM messages WHERE peer = ? ORDER BY id DESC LIMIT ?",
+                                   (peer, n)).fetchall()
+        return [(ts, bool(out), text) for ts, out, text in reversed(rows)]
+
+    ## 5) Sucht Nachrichten, die alle Wörter von `text` enthalten.
+    #  @param text Suchtext.
+    #  @param limit Maximale Anzahl Treffer.
+    #  @return Liste von (zeit, peer, ausgehend, text), neueste zuerst.
+    def search(self, text, limit=20):
+        self.flush()
+        query = fts_query(text)
+        if not query:
+            return []
+        with self.db_lock:
+            if self.fts:
+                rows = self.db.execute(
+                    "SELECT m.ts, m.peer, m.outgoing, m.text FROM messages m WHERE m.id IN "
+                    "(SELECT rowid FROM messages_fts WHERE messages_fts MATCH ? ORDER BY rowid DESC LIMIT ?) "
+                    "ORDER BY m.id DESC", (query, limit)).fetchall()
+            else:
+                where = " AND ".join("text LIKE ?" for _ in text.split())
+                rows = self.db.execute(f"SELECT ts, peer, outgoing, text FROM messages WHERE {where} ORDER BY id DESC LIMIT ?",
+                                       [f"%{w}%" for w in text.split()] + [limit]).fetchall()
+        return [(ts, peer, bool(out), msg) for ts, peer, out, msg in rows]
+
+    ## @brief Schreibt Ausstehendes und schließt die Datenbank.
+    def close(self):
+        self.flush()
+        with self.db_lock:
+            self.db.close()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+## @file image_store.py
+#  @brief Inhaltsadressierter Bildspeicher unter imagepath
+#  @details
+#  Jedes empfangene Bild liegt genau einmal unter imagepath/.store/<sha256>; die
+#  sichtbaren Dateien in imagepath sind harte Links darauf (ohne Link-Unterstützung:
+#  Kopie). Gleicher Inhalt unter neuem Namen kostet so keinen Platz, und ein
+#  gleichnamiges Bild mit anderem Inhalt überschreibt nichts, sondern heißt "name_2.ext".
+#  Vor dem Versand fragt der Sender per HAVE (file_transfer.offer), ob der Inhalt
+#  schon da ist; dann entfällt die Übertragung ganz.
+#  Struktur & Ablauf:
+#   1) file_digest/hash_file – SHA-256 einer Datei (Senderseite mit Cache nach Größe & mtime)
+#   2) ImageStore.has/link – Inhalt vorhanden? Unter einem Namen sichtbar machen
+#   3) ImageStore.add – fertig empfangene Temp-Datei übernehmen (Duplikat → verwerfen)
+
+import os, shutil, hashlib, threading
+import metrics
+
+STORE_DIR = ".store"
+HASH_BUFSIZE = 1024 * 1024
+
+DEDUP = metrics.counter("bymy_image_dedup_total", "Bilder, deren Inhalt schon vorhanden war", label="via")
+DEDUP_BYTES = metrics.counter("bymy_image_dedup_bytes_total", "Nicht übertragene bzw. nicht erneut gespeicherte Bildbytes")
+
+## 1) Bereits berechnete Prüfsummen: {(pfad, größe, mtime_ns): sha256}.
+_digests = {}
+_digests_lock = threading.Lock()
+
+## 1) SHA-256 einer Datei als Hex-String (erneuter Versand derselben Datei liest sie nicht noch einmal).
+#  @param path Datei.
+#  @return Hex-String.
+def file_digest(path):
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(key)
+    if digest is None:
+        digest = hash_file(path)
+        with _digests_lock:
+            _digests[key] = digest
+    return digest
+
+## @brief SHA-256 einer Datei ohne Cache (z.B. eine fertig empfangene Teil-Datei).
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BUFSIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _valid(digest):
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+## @brief Ersetzt target atomar durch einen harten Link auf source.
+#  Der Link entsteht zuerst unter einem eindeutigen Temp-Namen (Prozess, Thread, Zähler),
+#  damit Reste eines Absturzes oder ein gleichzeitiges HAVE für denselben Namen nicht stören.
+#  @exception OSError Link oder Umbenennen gescheitert (der Temp-Link ist dann entfernt).
+def _replace_with_link(source, target):
+    folder, name = os.path.split(target)
+    n = 0
+    while True:
+        n += 1
+        tmp = os.path.join(folder, f".{name}.{os.getpid()}.{threading.get_ident()}.{n}.link")
+        try:
+            os.link(source, tmp)
+            break
+        except FileExistsError:
+            continue
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        os.remove(tmp)
+        raise
+
+## 2–3) Speicher eines Bildordners.
+class ImageStore:
+    ## @brief Legt bei Bedarf imagepath/.store an.
+    #  @param image_dir Bildordner (imagepath).
+    def __init__(self, image_dir):
+        self.image_dir = image_dir
+        self.store_dir = os.path.join(image_dir, STORE_DIR)
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _object(self, digest):
+        return os.path.join(self.store_dir, digest)
+
+    ## 2) Ist ein Inhalt bereits gespeichert?
+    #  @param digest SHA-256 (hex).
+    def has(self, digest):
+        return _valid(digest) and os.path.exists(self._object(digest))
+
+    ## 2) Macht einen gespeicherten Inhalt unter einem Dateinamen sichtbar.
+    #  Liegt unter dem Namen schon genau dieser Inhalt, bleibt alles, wie es ist;
+    #  liegt dort anderer Inhalt, wird "name_2.ext", "name_3.ext" … verwendet (ohne Leerzeichen,
+    #  da Dateinamen in IMG/QUERY/HAVE durch Leerzeichen getrennt sind).
+    #  @param digest SHA-256 (hex).
+    #  @param filename Gewünschter Dateiname (nur der Basisname zählt).
+    #  @return Tatsächlicher Dateiname oder None, wenn der Inhalt fehlt.
+    def link(self, digest, filename):
+        if not self.has(digest):
+            return None
+        source = self._object(digest)
+        stem, ext = os.path.splitext(os.path.basename(filename))
+        name, n = stem + ext, 1
+        while True:
+            target = os.path.join(self.image_dir, name)
+            try:
+                os.link(source, target)
+                return name
+            except FileExistsError:
+                if os.path.samefile(source, target):
+                    return name
+                if os.path.getsize(target) == os.path.getsize(source) and hash_file(target) == digest:
+                    # gleicher Inhalt aus der Zeit vor dem Speicher: durch den Link ersetzen
+                    try:
+                        _replace_with_link(source, target)
+                    except OSError:
+                        pass  # Inhalt stimmt ohnehin, nur der Platzgewinn entfällt
+                    return name
+            except OSError:  # Dateisystem ohne harte Links
+                if not os.path.exists(target):
+                    shutil.copyfile(source, target)
+                    return name
+                if file_digest(target) == digest:
+                    return name
+            n += 1
+            name = f"{stem}_{n}{ext}"
+
+    ## 3) Übernimmt eine vollständig empfangene Datei in den Speicher.
+    #  @param path Temp-Datei im Bildordner (wird verschoben oder gelöscht).
+    #  @param digest SHA-256 des Inhalts (hex).
+    #  @param filename Gewünschter Dateiname.
+    #  @return Tatsächlicher Dateiname.
+    def add(self, path, digest, filename):
+        source = self._object(digest)
+        if os.path.exists(source):
+            DEDUP.inc("store")
+            DEDUP_BYTES.inc(n=os.path.getsize(path))
+            os.remove(path)
+        else:
+            os.replace(path, source)
+        return self.link(digest, filename)
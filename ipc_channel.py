@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+## @file ipc_channel.py
+#  @brief Dauerhafter, gerahmter Duplex-Kanal zwischen CLI- und Netzwerkprozess
+#  @details
+#  Ersetzt die beiden Named Pipes (cli_to_network.pipe / network_to_cli.pipe),
+#  die bisher pro Nachricht geöffnet und wieder geschlossen wurden.
+#  Struktur & Ablauf:
+#   1) Rahmenformat: 4 Byte Länge (Big Endian) + UTF-8-Nutzdaten
+#   2) IpcChannel – Unix-Domain-Socket, Server (Netzwerk) oder Client (CLI)
+#   3) send – legt Nachricht in den Ausgangspuffer, blockiert nie
+#   4) _write_loop – schreibt alle gepufferten Rahmen gesammelt mit einem sendall
+#   5) messages – Generator über eingehende Nachrichten, verbindet automatisch neu
+#   6) flush / close – Puffer leeren, Kanal schließen
+#   7) QueueChannel – gleiche Schnittstelle im Speicher (eingebetteter Modus, bymy.py)
+#   8) signal_ready – meldet main.sh, dass ein Prozess bereit ist (statt "sleep 1")
+
+import os, socket, struct, threading, time, queue
+import metrics
+
+IPC_SOCKET = "bymy.sock"
+READY_ENV = "BYMY_READY"  # Pfad einer FIFO, die main.sh zum Warten auf die Prozesse nutzt
+
+IPC_FRAMES = metrics.counter("bymy_ipc_frames_sent_total", "Gesendete IPC-Rahmen")
+IPC_WRITE_SECONDS = metrics.histogram("bymy_ipc_write_seconds", "Dauer eines gesammelten Schreibvorgangs (Stau beim Leser)")
+
+## 1) Rahmenkopf: Länge der Nutzdaten als unsigned int (Big Endian).
+FRAME_HEADER = struct.Struct("!I")
+
+## @brief Kodiert eine Nachricht als Rahmen.
+#  @param msg Nachricht als String.
+#  @return Rahmen als Bytes.
+def encode_frame(msg):
+    payload = msg.encode("utf-8")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+## 2) Langlebiger Duplex-Kanal über einen Unix-Domain-Socket.
+#  Der Netzwerkprozess ist Server, die CLI verbindet sich als Client.
+#  Bricht die Verbindung ab, wird sie beim nächsten Lesen/Schreiben neu aufgebaut.
+class IpcChannel:
+    ## @brief Legt den Kanal an und startet den Schreib-Thread.
+    #  @param path Pfad der Socket-Datei.
+    #  @param server True für die Serverseite (bindet & akzeptiert).
+    #  @param reconnect_delay Wartezeit zwischen Verbindungsversuchen in Sekunden.
+    def __init__(self, path=IPC_SOCKET, server=False, reconnect_delay=0.2):
+        self.path = path
+        self.server = server
+        self.reconnect_delay = reconnect_delay
+        self._sock = None
+        self._listener = None
+        self._closed = False
+        self._connect_lock = threading.Lock()
+        self._out_cond = threading.Condition()
+        self._outbox = []
+        self._queued = 0    # Rahmen im _outbox (ein Eintrag kann mehrere enthalten)
+        self._pending = 0
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    ## @brief Serverseite: bindet die Socket-Datei sofort (CLI kann sich danach verbinden).
+    def listen(self):
+        with self._connect_lock:
+            self._bind()
+
+    def _bind(self):
+        if self._listener is None:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._listener.bind(self.path)
+            self._listener.listen(1)
+
+    ## @brief Stellt sicher, dass eine Verbindung besteht (blockiert bis dahin).
+    #  @return Der verbundene Socket.
+    def _ensure_connected(self):
+        with self._connect_lock:
+            while self._sock is None and not self._closed:
+                try:
+                    if self.server:
+                        self._bind()
+                        conn, _ = self._listener.accept()
+                    else:
+                        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                        try:
+                            conn.connect(self.path)
+                        except OSError:
+                            conn.close()
+                            raise
+                    self._sock = conn
+                except OSError:
+                    if self._closed:
+                        break
+                    time.sleep(self.reconnect_delay)
+            return self._sock
+
+    ## @brief Verwirft eine defekte Verbindung, damit neu verbunden wird.
+    #  @param sock Der Socket, bei dem der Fehler auftrat.
+    def _drop(self, sock):
+        with self._connect_lock:
+            if self._sock is sock:
+                self._sock = None
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    ## 3) Puffert eine Nachricht zum Senden.
+    #  @param msg Nachricht als String (ohne Zeilenumbruch).
+    def send(self, msg):
+        frame = encode_frame(msg)
+        with self._out_cond:
+            self._outbox.append(frame)
+            self._queued += 1
+            self._pending += 1
+            self._out_cond.notify()
+
+    ## @brief Puffert bereits kodierte Rahmen (z.B. von receive_worker.py) unverändert.
+    #  @param frames Hintereinanderliegende Rahmen als Bytes.
+    #  @param count Anzahl Rahmen in `frames`.
+    def send_frames(self, frames, count):
+        with self._out_cond:
+            self._outbox.append(frames)
+            self._queued += count
+            self._pending += count
+            self._out_cond.notify()
+
+    ## 4) Schreibt gesammelte Rahmen in einem Rutsch (Batch-Write).
+    def _write_loop(self):
+        while not self._closed:
+            with self._out_cond:
+                while not self._outbox and not self._closed:
+                    self._out_cond.wait()
+                if self._closed:
+                    return
+                batch, self._outbox = self._outbox, []
+                written, self._queued = self._queued, 0
+            sock = self._ensure_connected()
+            if sock is None:
+                return
+            try:
+                start = time.perf_counter()
+                sock.sendall(b"".join(batch))
+                IPC_WRITE_SECONDS.observe(time.perf_counter() - start)
+            except OSError:
+                self._drop(sock)
+                with self._out_cond:
+                    self._outbox[:0] = batch
+                    self._queued += written
+                continue
+            with self._out_cond:
+                IPC_FRAMES.inc(n=written)
+                self._pending -= written
+                self._out_cond.notify_all()
+
+    ## 5) Liefert eingehende Nachrichten, verbindet bei Abbruch automatisch neu.
+    #  @return Generator über Nachrichten als Strings.
+    def messages(self):
+        while not self._closed:
+            sock = self._ensure_connected()
+            if sock is None:
+                return
+            reader = sock.makefile("rb")
+            try:
+                while True:
+                    header = reader.read(FRAME_HEADER.size)
+                    if len(header) < FRAME_HEADER.size:
+                        break
+                    (length,) = FRAME_HEADER.unpack(header)
+                    payload = reader.read(length)
+                    if len(payload) < length:
+                        break
+                    yield payload.decode("utf-8", errors="ignore")
+            except OSError:
+                pass
+            finally:
+                reader.close()
+            self._drop(sock)
+
+    ## @brief Anzahl noch nicht geschriebener Rahmen.
+    def pending_frames(self):
+        return self._pending
+
+    ## 6) Wartet, bis alle gepufferten Nachrichten geschrieben sind.
+    #  @param timeout Maximale Wartezeit in Sekunden.
+    #  @return True, wenn der Puffer leer ist.
+    def flush(self, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        with self._out_cond:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._out_cond.wait(remaining)
+        return True
+
+    ## @brief Schließt den Kanal und gibt die Socket-Datei frei.
+    def close(self):
+        self._closed = True
+        with self._out_cond:
+            self._out_cond.notify_all()
+        for s in (self._sock, self._listener):
+            if s is not None:
+                try:
+                    s.close()
+                except OSError:
+                    pass
+        if self.server and os.path.exists(self.path):
+            os.remove(self.path)
+
+## 7) Kanal im Speicher mit der Schnittstelle von IpcChannel (ein Ende pro Richtung).
+#  Für den eingebetteten Modus: Netzwerk & CLI laufen als Threads eines Prozesses.
+class QueueChannel:
+    def __init__(self):
+        self._inbox = queue.SimpleQueue()
+        self.peer = None
+        self._closed = False
+
+    ## @brief Zwei verbundene Enden (was a sendet, liefert b.messages() und umgekehrt).
+    #  @return (a, b)
+    @staticmethod
+    def pair():
+        a, b = QueueChannel(), QueueChannel()
+        a.peer, b.peer = b, a
+        return a, b
+
+    ## @brief Übergibt eine Nachricht an das andere Ende (blockiert nie).
+    def send(self, msg):
+        self.peer._inbox.put(msg)
+        IPC_FRAMES.inc()
+
+    ## @brief Übergibt bereits kodierte Rahmen (receive_worker.py) als einzelne Nachrichten.
+    def send_frames(self, frames, count):
+        pos = 0
+        for _ in range(count):
+            (length,) = FRAME_HEADER.unpack_from(frames, pos)
+            pos += FRAME_HEADER.size
+            self.send(frames[pos:pos + length].decode("utf-8", errors="ignore"))
+            pos += length
+
+    ## @brief Liefert eingehende Nachrichten, bis close() aufgerufen wird.
+    def messages(self):
+        while not self._closed:
+            msg = self._inbox.get()
+            if msg is None:
+                return
+            yield msg
+
+    ## @brief Vom anderen Ende noch nicht abgeholte Nachrichten.
+    def pending_frames(self):
+        return self.peer._inbox.qsize()
+
+    ## @brief Wartet, bis das andere Ende alle Nachrichten abgeholt hat.
+    #  @param timeout Maximale Wartezeit in Sekunden.
+    #  @return True, wenn nichts mehr aussteht.
+    def flush(self, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        while self.pending_frames():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        self._closed = True
+        self._inbox.put(None)
+
+## 8) Meldet Bereitschaft: schreibt "<name>\n" in die FIFO aus $BYMY_READY (gesetzt von main.sh).
+#  Ohne Variable oder ohne wartenden Leser passiert nichts (blockiert nie).
+#  @param name Prozessname (z.B. "discovery", "network").
+def signal_ready(name):
+    path = os.environ.get(READY_ENV)
+    if not path:
+        return
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        return
+    try:
+        os.write(fd, f"{name}\n".encode())
+    finally:
+        os.close(fd)
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+
+## @file loadgen.py
+#  @brief Lastgenerator: Discovery + N Netzwerkprozesse auf Loopback, gemessen von außen
+#  @details
+#  Aufruf: python3 loadgen.py --peers 8 --duration 10 --msg-rate 500 --img-rate 2
+#  Jeder simulierte Peer ist ein echter network_process.py in einem eigenen
+#  Arbeitsordner (eigene config.toml, eigener IPC-Socket, eigene Ports). Der
+#  Lastgenerator übernimmt für alle Peers die Rolle der CLI.
+#  Struktur & Ablauf:
+#   1) Hilfsfunktionen: Prozesswerte aus /proc (CPU-Zeit, RSS), UDP-Fehlerzähler, Perzentile
+#   2) Peer – Arbeitsordner, Prozess & IPC-Kanal eines simulierten Nutzers
+#   3) LoadRun – startet Discovery & Peers, verbindet alle (JOIN), erzeugt Last, misst
+#      (mit --group-rate treten alle Peers der Gruppe "load" bei; jede GMSG muss
+#       bei allen N-1 anderen ankommen)
+#   4) drive – Taktgeber: ruft eine Aktion mit fester Rate auf
+#      (4b: flood – eigener Prozess, schickt MSG-Datagramme direkt an Peer 0;
+#       misst die Empfangsleistung eines Peers, z.B. mit --receive-workers)
+#   5) main – Parameter, Ausgabe & Anhängen des Ergebnisses an eine JSON-Lines-Datei
+#
+#  Hinweis: Discovery beantwortet WHO an den zuerst registrierten Nutzer einer IP.
+#  Auf einem Host erreicht die Antwort daher nur Peer 0; die Teilnehmerliste der
+#  übrigen entsteht über die JOIN-Ankündigungen der Discovery (JOIN wird wiederholt, bis
+#  alle sich kennen; Discovery begrenzt Wiederholungen per Token-Bucket, join_burst ≥ 2).
+
+import os, sys, json, time, random, shutil, signal, socket, argparse, tempfile, threading, subprocess, multiprocessing
+import toml
+from ipc_channel import IpcChannel
+
+RESET = "\033[0m"; CYAN = "\033[96m"; GREEN = "\033[92m"; YELLOW = "\033[93m"; RED = "\033[91m"
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+## 1a) CPU-Sekunden (user + system) eines Prozesses.
+#  @param pid Prozess-ID.
+#  @return Sekunden oder None (Prozess beendet / kein /proc).
+def cpu_seconds(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLK_TCK
+    except (OSError, IndexError, ValueError):
+        return None
+
+## 1b) Aktueller & maximaler Speicherbedarf eines Prozesses.
+#  @param pid Prozess-ID.
+#  @return {"rss_kb": ..., "peak_rss_kb": ...} (leer ohne /proc).
+def memory_kb(pid):
+    out = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    out["rss_kb"] = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    out["peak_rss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return out
+
+## 1c) Systemweite UDP-Zähler (verworfene Datagramme wegen vollem Empfangspuffer).
+#  @return {"RcvbufErrors": n, "InErrors": n} oder {} ohne /proc.
+def udp_counters():
+    try:
+        with open("/proc/net/snmp") as f:
+            lines = [l.split() for l in f if l.startswith("Udp:")]
+        return {k: int(v) for k, v in zip(lines[0][1:], lines[1][1:]) if k in ("RcvbufErrors", "InErrors")}
+    except (OSError, IndexError, ValueError):
+        return {}
+
+## 1d) Perzentil einer sortierten Liste (nächster Rang).
+#  @param values Sortierte Messwerte.
+#  @param p Perzentil 0..100.
+def percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+## 2) Ein simulierter Nutzer: network_process.py in eigenem Ordner, gesteuert über den IPC-Kanal.
+class Peer:
+    ## @brief Legt Arbeitsordner & config.toml an (Prozess startet erst mit start()).
+    #  @param run_dir Gemeinsamer Ordner des Laufs.
+    #  @param index Nummer des Peers.
+    #  @param port UDP-Port (TCP-Bildport ist port + 1).
+    #  @param base_config Vorlage (config.toml des Projekts).
+    #  @param args Kommandozeilenargumente (whoisport, engine).
+    def __init__(self, run_dir, index, port, base_config, args):
+        self.handle = f"peer{index}"
+        self.port = port
+        self.dir = os.path.join(run_dir, self.handle)
+        os.makedirs(self.dir)
+        config = dict(base_config, handle=self.handle, port=[port], whoisport=args.whoisport,
+                      imagepath="receive", engine=args.engine, reliable_delivery=args.reliable == "on",
+                      receive_workers=args.receive_workers, compression=args.compression,
+                      multicast=args.multicast == "on", group_port=args.base_port - 2,
+                      udp_rcvbuf=args.udp_rcvbuf, receive_queue=args.receive_queue)
+        with open(os.path.join(self.dir, "config.toml"), "w") as f:
+            toml.dump(config, f)
+        self.proc = None
+        self.channel = None
+        self.joined = set()  # Handles, die dieser Peer per JOIN kennt
+        self.group_members = set()  # Mitglieder der Gruppe "load" laut GROUP-Meldung
+
+    ## @brief Startet den Netzwerkprozess & verbindet den IPC-Kanal.
+    def start(self, log):
+        self.proc = subprocess.Popen([sys.executable, os.path.join(HERE, "network_process.py")],
+                                     cwd=self.dir, stdout=log, stderr=subprocess.STDOUT)
+        self.channel = IpcChannel(os.path.join(self.dir, "bymy.sock"))
+
+    ## @brief Beendet den Prozess (SIGTERM → LEAVE), notfalls hart.
+    def stop(self):
+        if self.channel is not None:
+            self.channel.close()
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+## 3) Ein vollständiger Lastlauf.
+class LoadRun:
+    def __init__(self, args):
+        self.args = args
+        self.run_dir = tempfile.mkdtemp(prefix="bymy-load-")
+        self.log = open(os.path.join(self.run_dir, "processes.log"), "w")
+        self.lock = threading.Lock()
+        self.sent = {"MSG": {}, "IMG": {}, "GROUP": {}}      # {art: {seq: sendezeit}}, GROUP: [zeit, offen]
+        self.latency = {"MSG": [], "IMG": [], "GROUP": []}   # Sekunden
+        self.counts = {"MSG": 0, "IMG": 0, "GROUP": 0, "WHO": 0, "KNOWNUSERS": 0, "JOIN": 0, "FLOOD": 0}
+        self.seq = 0
+        self.discovery = None
+        self.peers = []
+
+    ## @brief Nächste laufende Nummer (für Zuordnung von Empfang zu Versand).
+    def next_seq(self):
+        with self.lock:
+            self.seq += 1
+            return self.seq
+
+    ## @brief Startet Discovery & alle Peers, wartet bis alle sich gegenseitig kennen.
+    def setup(self):
+        args = self.args
+        base_config = toml.load(os.path.join(HERE, "config.toml"))
+        disc_dir = os.path.join(self.run_dir, "discovery")
+        os.makedirs(disc_dir)
+        with open(os.path.join(disc_dir, "config.toml"), "w") as f:
+            toml.dump(dict(base_config, whoisport=args.whoisport, announce_interval=args.announce_interval), f)
+        self.discovery = subprocess.Popen([sys.executable, os.path.join(HERE, "discovery_process.py")],
+                                          cwd=disc_dir, stdout=self.log, stderr=subprocess.STDOUT)
+        self.peers = [Peer(self.run_dir, i, args.base_port + 2 * i, base_config, args) for i in range(args.peers)]
+        for peer in self.peers:
+            peer.start(self.log)
+            threading.Thread(target=self.receive_loop, args=(peer,), daemon=True).start()
+        image_dir = os.path.join(self.run_dir, "images")
+        os.makedirs(image_dir)
+        self.image_dir = image_dir
+        self.image_src = os.path.join(image_dir, "payload.bin")
+        with open(self.image_src, "wb") as f:
+            if args.img_content == "text":  # gut komprimierbar (Kompressionspfad von file_transfer)
+                line = b"Zeile mit wiederkehrendem Inhalt fuer den Lasttest\n"
+                f.write((line * (args.img_size // len(line) + 1))[:args.img_size])
+            else:
+                f.write(os.urandom(args.img_size))
+        # JOIN wiederholen, bis jeder Peer alle anderen kennt: Discovery kündigt jeden
+        # JOIN (einzeln oder, mit announce_interval, je Takt gesammelt) allen registrierten Peers an.
+        deadline = time.monotonic() + args.setup_timeout
+        while time.monotonic() < deadline:
+            unknown = [p for p in self.peers if any(p.handle not in q.joined for q in self.peers if q is not p)]
+            if not unknown:
+                return self.join_group() if args.group_rate > 0 else True
+            for peer in unknown:
+                peer.channel.send(f"JOIN {peer.handle} {peer.port}")
+            time.sleep(0.5)
+        missing = sum(len(self.peers) - 1 - len(p.joined) for p in self.peers)
+        print(f"{YELLOW}⚠ Nach {args.setup_timeout}s fehlen noch {missing} Teilnehmerbeziehungen.{RESET}")
+        return False
+
+    ## @brief Alle Peers treten der Gruppe "load" bei; wartet, bis jeder alle Mitglieder kennt.
+    def join_group(self):
+        handles = {p.handle for p in self.peers}
+        deadline = time.monotonic() + self.args.setup_timeout
+        for peer in self.peers:
+            peer.channel.send("GROUP_JOIN load")
+        while time.monotonic() < deadline:
+            if all(p.group_members == handles for p in self.peers):
+                return True
+            time.sleep(0.1)
+        missing = sum(len(handles - p.group_members) for p in self.peers)
+        print(f"{YELLOW}⚠ Gruppe 'load': nach {self.args.setup_timeout}s fehlen {missing} Mitgliedschaften.{RESET}")
+        return False
+
+    ## @brief Liest Meldungen eines Peers an seine "CLI" & misst Zustellzeiten.
+    def receive_loop(self, peer):
+        for line in peer.channel.messages():
+            now = time.perf_counter()
+            kind, _, rest = line.partition(" ")
+            if kind == "MSG":
+                text = rest.split(" ", 1)[1] if " " in rest else ""
+                if text.startswith("lg "):
+                    self.delivered("MSG", text[3:], now)
+                elif text.startswith("fl "):
+                    with self.lock:
+                        self.counts["FLOOD"] += 1
+            elif kind == "GMSG":
+                text = rest.split(" ", 2)[2] if rest.count(" ") >= 2 else ""
+                if text.startswith("lg "):
+                    self.group_delivered(text[3:], now)
+            elif kind == "GROUP":
+                fields = rest.split()
+                if len(fields) == 2 and fields[0] == "load":
+                    peer.group_members = set(fields[1].split(",")) if fields[1] != "-" else set()
+            elif kind == "IMG":
+                filename = rest.rsplit(" ", 1)[-1]
+                if filename.startswith("img_") and filename.endswith(".bin"):
+                    self.delivered("IMG", filename[4:-4], now)
+            elif kind == "JOIN":
+                peer.joined.add(rest.strip())
+                with self.lock:
+                    self.counts["JOIN"] += 1
+            elif kind in ("PEERS", "KNOWNUSERS", "DELTA"):
+                with self.lock:
+                    self.counts["KNOWNUSERS"] += 1
+
+    def delivered(self, kind, seq, now):
+        with self.lock:
+            start = self.sent[kind].pop(int(seq), None) if seq.isdigit() else None
+            if start is not None:
+                self.latency[kind].append(now - start)
+
+    ## @brief Eine Gruppennachricht kam bei einem Mitglied an (erwartet: N-1 Mal).
+    def group_delivered(self, seq, now):
+        with self.lock:
+            entry = self.sent["GROUP"].get(int(seq)) if seq.isdigit() else None
+            if entry is not None:
+                self.latency["GROUP"].append(now - entry[0])
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.sent["GROUP"][int(seq)]
+
+    ## @brief Zufälliges Paar (Absender, Empfänger) mit Absender != Empfänger.
+    def pair(self):
+        a, b = random.sample(self.peers, 2)
+        return a, b
+
+    def send_msg(self):
+        a, b = self.pair()
+        seq = self.next_seq()
+        with self.lock:
+            self.sent["MSG"][seq] = time.perf_counter()
+            self.counts["MSG"] += 1
+        a.channel.send(f"SEND_MSG {b.handle} lg {seq}")
+
+    def send_img(self):
+        a, b = self.pair()
+        seq = self.next_seq()
+        path = os.path.join(self.image_dir, f"img_{seq}.bin")
+        if random.random() < self.args.img_repeat:
+            os.link(self.image_src, path)  # gleicher Inhalt → Empfänger antwortet auf HAVE mit "vorhanden"
+        else:
+            with open(self.image_src, "rb") as src, open(path, "wb") as f:
+                f.write(src.read()[:-8] + seq.to_bytes(8, "big"))
+        with self.lock:
+            self.sent["IMG"][seq] = time.perf_counter()
+            self.counts["IMG"] += 1
+        a.channel.send(f"SEND_IMAGE {b.handle} {path} {self.args.img_size}")
+
+    def send_group(self):
+        a = random.choice(self.peers)
+        seq = self.next_seq()
+        with self.lock:
+            self.sent["GROUP"][seq] = [time.perf_counter(), len(self.peers) - 1]
+            self.counts["GROUP"] += 1
+        a.channel.send(f"SEND_GROUP load lg {seq}")
+
+    def send_who(self):
+        peer = random.choice(self.peers)
+        with self.lock:
+            self.counts["WHO"] += 1
+        peer.channel.send("WHO")
+
+    ## @brief Prozesse, deren Werte gemessen werden: {name: pid}.
+    def processes(self):
+        procs = {"discovery": self.discovery.pid}
+        procs.update({p.handle: p.proc.pid for p in self.peers})
+        procs["loadgen"] = os.getpid()
+        return procs
+
+    ## @brief Erzeugt Last für args.duration Sekunden, wartet auf Nachzügler & fasst zusammen.
+    #  @return Ergebnis-Dictionary.
+    def run(self):
+        args = self.args
+        procs = self.processes()
+        cpu_start = {name: cpu_seconds(pid) for name, pid in procs.items()}
+        udp_start = udp_counters()
+        stop = threading.Event()
+        drivers = [threading.Thread(target=drive, args=(fn, rate, stop), daemon=True)
+                   for fn, rate in ((self.send_msg, args.msg_rate), (self.send_img, args.img_rate),
+                                    (self.send_group, args.group_rate), (self.send_who, args.who_rate)) if rate > 0]
+        ctx = multiprocessing.get_context("spawn")
+        flood_sent = ctx.Queue()
+        flooders = [ctx.Process(target=flood, args=(("127.0.0.1", self.peers[0].port), args.duration, i, flood_sent))
+                    for i in range(args.flood_senders)]
+        start = time.perf_counter()
+        for t in drivers + flooders:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in drivers + flooders:
+            t.join()
+        elapsed = time.perf_counter() - start
+        flooded = sum(flood_sent.get() for _ in flooders)
+        drain_end = time.monotonic() + args.drain
+        while time.monotonic() < drain_end and (self.sent["MSG"] or self.sent["IMG"] or self.sent["GROUP"]):
+            time.sleep(0.05)
+        cpu_end = {name: cpu_seconds(pid) for name, pid in procs.items()}
+        udp_end = udp_counters()
+
+        result = {"elapsed_s": round(elapsed, 3), "traffic": {}, "processes": {},
+                  "udp": {k: udp_end[k] - udp_start.get(k, 0) for k in udp_end}}
+        with self.lock:
+            for kind in ("MSG", "IMG"):
+                lat = sorted(self.latency[kind])
+                result["traffic"][kind] = {
+                    "sent": self.counts[kind],
+                    "delivered": len(lat),
+                    "dropped": len(self.sent[kind]),
+                    "throughput_per_s": round(len(lat) / elapsed, 1),
+                    "p50_ms": None if not lat else round(percentile(lat, 50) * 1000, 3),
+                    "p99_ms": None if not lat else round(percentile(lat, 99) * 1000, 3),
+                }
+            if args.group_rate > 0:
+                lat = sorted(self.latency["GROUP"])
+                result["traffic"]["GROUP"] = {
+                    "sent": self.counts["GROUP"],
+                    "expected": self.counts["GROUP"] * (len(self.peers) - 1),
+                    "delivered": len(lat),
+                    "dropped": sum(entry[1] for entry in self.sent["GROUP"].values()),
+                    "throughput_per_s": round(len(lat) / elapsed, 1),
+                    "p50_ms": None if not lat else round(percentile(lat, 50) * 1000, 3),
+                    "p99_ms": None if not lat else round(percentile(lat, 99) * 1000, 3),
+                }
+            result["traffic"]["WHO"] = {"sent": self.counts["WHO"], "replies": self.counts["KNOWNUSERS"]}
+            if flooders:
+                result["traffic"]["FLOOD"] = {"sent": flooded, "delivered": self.counts["FLOOD"],
+                                              "throughput_per_s": round(self.counts["FLOOD"] / elapsed, 1)}
+        for name, pid in procs.items():
+            entry = memory_kb(pid)
+            if cpu_start[name] is not None and cpu_end[name] is not None:
+                cpu = cpu_end[name] - cpu_start[name]
+                entry["cpu_s"] = round(cpu, 3)
+                entry["cpu_percent"] = round(100 * cpu / elapsed, 1)
+            result["processes"][name] = entry
+        return result
+
+    ## @brief Beendet alle Prozesse & löscht den Arbeitsordner (außer mit --keep).
+    def teardown(self):
+        for peer in self.peers:
+            peer.stop()
+        if self.discovery is not None and self.discovery.poll() is None:
+            self.discovery.terminate()
+            self.discovery.wait(timeout=3)
+        self.log.close()
+        if self.args.keep:
+            print(f"{CYAN}Arbeitsordner: {self.run_dir}{RESET}")
+        else:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+
+## 4) Ruft fn mit fester Rate auf, bis stop gesetzt ist (holt Verspätungen nicht nach).
+#  @param fn Aktion.
+#  @param rate Aufrufe pro Sekunde.
+#  @param stop threading.Event.
+def drive(fn, rate, stop):
+    interval = 1.0 / rate
+    next_t = time.perf_counter()
+    while not stop.is_set():
+        try:
+            fn()
+        except Exception as e:
+            print(f"{RED}Fehler im Lastgenerator: {e}{RESET}")
+        next_t += interval
+        delay = next_t - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_t = time.perf_counter()
+
+## 4b) Schickt so schnell wie möglich MSG-Datagramme an einen Peer (eigener Prozess & Socket,
+#  damit SO_REUSEPORT die Absender auf mehrere Empfangsprozesse verteilen kann).
+#  @param addr Ziel (ip, port).
+#  @param duration Dauer in Sekunden.
+#  @param index Nummer des Senders (Absendername flood<index>).
+#  @param result multiprocessing.Queue für die Anzahl gesendeter Datagramme.
+def flood(addr, duration, index, result):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    prefix = f"MSG flood{index} fl ".encode()
+    sent, end = 0, time.perf_counter() + duration
+    while time.perf_counter() < end:
+        for _ in range(100):
+            try:
+                sock.sendto(prefix + str(sent).encode(), addr)
+            except OSError:
+                pass
+            sent += 1
+    result.put(sent)
+
+## @brief Aktueller Git-Commit (für den Vergleich über die Zeit), falls verfügbar.
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+## @brief Gibt die Zusammenfassung lesbar aus.
+def print_summary(result):
+    for kind in ("MSG", "IMG"):
+        t = result["traffic"][kind]
+        print(f"{CYAN}{kind:<4}{RESET} gesendet {t['sent']:>7}  zugestellt {t['delivered']:>7}  verloren {t['dropped']:>5}"
+              f"  → {GREEN}{t['throughput_per_s']:>9}/s{RESET}  p50 {t['p50_ms']} ms  p99 {t['p99_ms']} ms")
+    if "GROUP" in result["traffic"]:
+        t = result["traffic"]["GROUP"]
+        print(f"{CYAN}GROUP{RESET} gesendet {t['sent']:>6}  zugestellt {t['delivered']:>7}/{t['expected']}  verloren {t['dropped']:>5}"
+              f"  → {GREEN}{t['throughput_per_s']:>9}/s{RESET}  p50 {t['p50_ms']} ms  p99 {t['p99_ms']} ms")
+    who = result["traffic"]["WHO"]
+    print(f"{CYAN}WHO {RESET} gesendet {who['sent']:>7}  Antworten {who['replies']:>7}")
+    if "FLOOD" in result["traffic"]:
+        t = result["traffic"]["FLOOD"]
+        print(f"{CYAN}FLOOD{RESET} gesendet {t['sent']:>7}  zugestellt {t['delivered']:>7}"
+              f"  → {GREEN}{t['throughput_per_s']:>9}/s{RESET} (Empfang Peer 0)")
+    print(f"{CYAN}UDP {RESET} {result['udp']}")
+    for name, p in result["processes"].items():
+        print(f"  {name:<12} CPU {p.get('cpu_s', '?'):>7}s ({p.get('cpu_percent', '?'):>5}%)"
+              f"  RSS {p.get('rss_kb', '?'):>7} KB  Spitze {p.get('peak_rss_kb', '?'):>7} KB")
+
+## 5) Einstiegspunkt.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BYMY Lastgenerator (Loopback)")
+    parser.add_argument("--peers", type=int, default=4, help="Anzahl simulierter Peers (≥ 2)")
+    parser.add_argument("--duration", type=float, default=10, help="Lastdauer in Sekunden")
+    parser.add_argument("--msg-rate", type=float, default=200, help="MSG pro Sekunde (gesamt)")
+    parser.add_argument("--img-rate", type=float, default=1, help="Bilder pro Sekunde (gesamt)")
+    parser.add_argument("--img-size", type=int, default=256 * 1024, help="Bildgröße in Bytes")
+    parser.add_argument("--group-rate", type=float, default=0, help="Gruppennachrichten pro Sekunde (gesamt, Gruppe aller Peers)")
+    parser.add_argument("--multicast", default="on", choices=["on", "off"], help="Gruppen per Multicast oder nur Unicast")
+    parser.add_argument("--who-rate", type=float, default=2, help="WHO pro Sekunde (gesamt)")
+    parser.add_argument("--engine", default="threads", choices=["threads", "asyncio"], help="Engine der Peers")
+    parser.add_argument("--reliable", default="on", choices=["on", "off"], help="Zuverlässige Zustellung (RMSG) statt MSG")
+    parser.add_argument("--compression", default="zlib", choices=["zlib", "lzma", "off"], help="Bevorzugte Kompression der Peers")
+    parser.add_argument("--img-repeat", type=float, default=0, help="Anteil der Bilder mit bereits gesendetem Inhalt (0..1)")
+    parser.add_argument("--img-content", default="random", choices=["random", "text"], help="Inhalt der Testbilder")
+    parser.add_argument("--receive-workers", type=int, default=0, help="Empfangsprozesse pro Peer (SO_REUSEPORT)")
+    parser.add_argument("--udp-rcvbuf", type=int, default=4 * 1024 * 1024, help="SO_RCVBUF der Peers in Bytes (0 → Systemvorgabe)")
+    parser.add_argument("--receive-queue", type=int, default=8192, help="Ring zwischen Empfang & Verarbeitung (Datagramme)")
+    parser.add_argument("--flood-senders", type=int, default=0, help="Prozesse, die ungebremst MSG an Peer 0 schicken")
+    parser.add_argument("--base-port", type=int, default=6200, help="UDP-Port von Peer 0 (je Peer +2)")
+    parser.add_argument("--whoisport", type=int, default=6199, help="Discovery-Port")
+    parser.add_argument("--announce-interval", type=float, default=0, help="JOIN/LEAVE der Discovery je Takt sammeln (Sekunden, 0 → einzeln)")
+    parser.add_argument("--setup-timeout", type=float, default=10, help="Wartezeit bis alle verbunden sind")
+    parser.add_argument("--drain", type=float, default=3, help="Wartezeit auf Nachzügler nach der Last")
+    parser.add_argument("--out", default="load_results.jsonl", help="Ergebnisdatei (eine JSON-Zeile pro Lauf)")
+    parser.add_argument("--label", default="", help="Freitext zur Einordnung des Laufs")
+    parser.add_argument("--keep", action="store_true", help="Arbeitsordner & Logs nicht löschen")
+    args = parser.parse_args(argv)
+    if args.peers < 2:
+        parser.error("--peers muss mindestens 2 sein")
+
+    load = LoadRun(args)
+    try:
+        print(f"{YELLOW}Starte Discovery + {args.peers} Peers (Engine: {args.engine}) ...{RESET}")
+        connected = load.setup()
+        result = load.run()
+    finally:
+        load.teardown()
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": git_revision(), "label": args.label,
+              "connected": connected,
+              "params": {k: v for k, v in vars(args).items() if k not in ("out", "label", "keep")}}
+    record.update(result)
+    print_summary(result)
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"{GREEN}✓ Ergebnis angehängt an {args.out}{RESET}")
+
+if __name__ == "__main__":
+    sys.exit(main())
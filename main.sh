@@ -2,30 +2,51 @@
 
 ##
 # @file main.sh
-# @brief Startet den BYMY Chat-Prozess: Pipes anlegen, Discovery, Netzwerk, CLI.
+# @brief Startet den BYMY Chat-Prozess: IPC-Socket vorbereiten, Discovery, Netzwerk, CLI.
 #
 # @details
 # Ablauf:
 # 1) Wechselt ins Skriptverzeichnis.
-# 2) Erstellt die Named Pipes falls nötig.
-# 3) Startet den Discovery-Prozess (UDP-Broadcast).
-# 4) Startet den Netzwerk-Prozess (Nachrichten, Bilder, TCP-Receiver).
+# 2) Entfernt eine verwaiste IPC-Socket-Datei (bymy.sock).
+# 3) Startet Discovery (UDP-Broadcast) und Netzwerk (Nachrichten, Bilder, TCP-Receiver) parallel.
+# 4) Wartet, bis beide ihre Ports gebunden haben: jeder schreibt seinen Namen in eine
+#    FIFO ($BYMY_READY, siehe ipc_channel.signal_ready) – statt fester "sleep 1".
+#    Beendet sich ein Prozess vorher (z.B. WHOIS-Port schon belegt), wird nicht weiter gewartet.
 # 5) Startet den CLI-Prozess im Vordergrund.
 #
 # @note Das Skript blockiert, solange CLI läuft. 
 # Beenden der CLI beendet i.d.R. alle Sub-Prozesse.
+# Alles in einem Prozess (schnellster Start): python3 bymy.py
 ##
 
 DIR="$(cd "$(dirname "$0")" && pwd)"
 cd "$DIR"
 
-[[ -p cli_to_network.pipe ]] || mkfifo cli_to_network.pipe
-[[ -p network_to_cli.pipe ]] || mkfifo network_to_cli.pipe
+rm -f bymy.sock
 
-python3 discovery_process.py &
-sleep 1
+READY_FIFO="$(mktemp -u "${TMPDIR:-/tmp}/bymy-ready.XXXXXX")"
+mkfifo "$READY_FIFO"
+exec 3<>"$READY_FIFO"   # lesend & schreibend öffnen: blockiert nie, auch ohne Schreiber
+export BYMY_READY="$READY_FIFO"
 
+python3 discovery_process.py &
+DISC_PID=$!
 python3 network_process.py &
-sleep 1
+NET_PID=$!
+
+disc=1; net=1; end=$((SECONDS + 5))
+while [ $((disc + net)) -gt 0 ] && [ $SECONDS -lt $end ]; do
+    if read -t 0.05 -u 3 name; then
+        [ "$name" = discovery ] && disc=0
+        [ "$name" = network ] && net=0
+    fi
+    kill -0 $DISC_PID 2>/dev/null || disc=0
+    kill -0 $NET_PID 2>/dev/null || net=0
+done
+[ $((disc + net)) -gt 0 ] && echo "⚠ Discovery/Netzwerk nach 5s nicht bereit – starte CLI trotzdem."
+
+exec 3<&-
+rm -f "$READY_FIFO"
+unset BYMY_READY
 
 exec python3 cli_process.py
\ No newline at end of file
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+## @file metrics.py
+#  @brief Leichtgewichtige Laufzeit-Metriken (Zähler, Messwerte, Histogramme)
+#  @details
+#  Struktur & Ablauf:
+#   1) Counter – monoton steigende Zähler, optional mit einem Label (z.B. cmd)
+#   2) Gauge – aktueller Wert, gesetzt oder beim Auslesen per Funktion ermittelt
+#   3) Histogram – feste Buckets (Standard: Latenzen in Sekunden), Summe & Anzahl
+#   4) render – alle Metriken des Prozesses im Prometheus-Textformat
+#   5) start_dump – schreibt render() periodisch atomar in <ordner>/<name>.prom
+#      (passt zum Textfile-Collector des node_exporter)
+#   6) summarize – macht render()-Text für die CLI lesbar (/stats)
+#  udp_socket_drops liefert die Kernel-Verluste eines UDP-Ports für einen Gauge.
+#  Kosten auf dem heißen Pfad: ein Dictionary-Zugriff bzw. ein bisect, kein Lock;
+#  set_enabled(False) schaltet das Erfassen prozessweit ab.
+#  Gleichzeitige Threads können in seltenen Fällen ein Inkrement verlieren; für
+#  Betriebsmetriken ist das hinnehmbar, für Abrechnungen nicht.
+
+import os, time, bisect, threading
+
+## Standard-Buckets für Latenzen in Sekunden (10 µs … 5 s).
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_registry = {}  # {name: Metrik} in Registrierungsreihenfolge
+_registry_lock = threading.Lock()
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        return metric
+
+def _labels(label, key):
+    return f'{{{label}="{key}"}}' if label and key is not None else ""
+
+## 1) Monoton steigender Zähler.
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.values = {None: 0} if label is None else {}
+
+    ## @brief Erhöht den Zähler.
+    #  @param key Labelwert (nur bei Zählern mit Label).
+    #  @param n Schrittweite.
+    def inc(self, key=None, n=1):
+        values = self.values
+        values[key] = values.get(key, 0) + n
+    _inc = inc
+
+    def samples(self):
+        return [(self.name + _labels(self.label, k), v) for k, v in list(self.values.items())]
+
+## 2) Aktueller Wert (gesetzt oder beim Auslesen berechnet).
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn=None):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        if self.fn is not None:
+            try:
+                self.value = self.fn()
+            except Exception:
+                return []
+        return [] if self.value is None else [(self.name, self.value)]
+
+## 3) Histogramm mit festen Buckets.
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # letzter Eintrag: +Inf
+        self.sum = 0.0
+
+    ## @brief Nimmt einen Messwert auf.
+    #  @param value Messwert (z.B. Sekunden).
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+    _observe = observe
+
+    def samples(self):
+        out, total = [], 0
+        for bound, count in zip(self.bounds + ("+Inf",), list(self.counts)):
+            total += count
+            out.append((f'{self.name}_bucket{{le="{bound}"}}', total))
+        out.append((f"{self.name}_sum", round(self.sum, 9)))
+        out.append((f"{self.name}_count", total))
+        return out
+
+## @brief Liefert (bzw. registriert) einen Zähler.
+#  @param name Metrikname (Prometheus-Konvention: ..._total).
+#  @param help_text Beschreibung.
+#  @param label Optionaler Labelname.
+def counter(name, help_text, label=None):
+    return _register(Counter, name, help_text, label)
+
+## @brief Liefert (bzw. registriert) einen Messwert.
+#  @param fn Optionale Funktion, die den Wert beim Auslesen liefert.
+def gauge(name, help_text, fn=None):
+    metric = _register(Gauge, name, help_text)
+    if fn is not None:
+        metric.fn = fn
+    return metric
+
+## @brief Liefert (bzw. registriert) ein Histogramm.
+#  @param buckets Obergrenzen der Buckets (aufsteigend).
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    return _register(Histogram, name, help_text, buckets)
+
+def _noop(self, *args, **kwargs):
+    pass
+
+## @brief Schaltet das Erfassen ein oder aus (config.toml: metrics = true/false).
+#  Ausgeschaltet bleibt von inc/observe nur ein leerer Methodenaufruf.
+#  @param flag True zum Erfassen.
+def set_enabled(flag):
+    Counter.inc = Counter._inc if flag else _noop
+    Histogram.observe = Histogram._observe if flag else _noop
+
+gauge("bymy_process_start_time_seconds", "Startzeit des Prozesses (Unix-Zeit)").set(round(time.time(), 3))
+
+## 4) Alle Metriken im Prometheus-Textformat.
+#  @return Text (eine Zeile pro Messwert).
+def render():
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        samples = metric.samples()
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {value}" for name, value in samples)
+    return "\n".join(lines) + "\n"
+
+## @brief Schreibt render() atomar in eine Datei.
+#  @param path Zieldatei.
+def dump(path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+## 5) Schreibt die Metriken periodisch nach <directory>/<name>.prom.
+#  @param directory Zielordner (wird angelegt).
+#  @param name Prozessname (z.B. "network", "discovery").
+#  @param interval Sekunden zwischen zwei Dumps.
+#  @return Der gestartete Daemon-Thread.
+def start_dump(directory, name, interval=10.0):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.prom")
+    def loop():
+        while True:
+            try:
+                dump(path)
+            except OSError as e:
+                print(f"Fehler beim Schreiben der Metriken: {e}")
+            time.sleep(interval)
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
+
+## @brief Vom Kernel verworfene Datagramme eines UDP-Sockets (voller Empfangspuffer).
+#  Liest /proc/net/udp (Linux); gedacht als fn für gauge().
+#  @param port Lokaler UDP-Port.
+#  @return Anzahl oder None (kein /proc bzw. Socket nicht gefunden).
+def udp_socket_drops(port):
+    suffix = f":{port:04X}"
+    try:
+        with open("/proc/net/udp") as f:
+            next(f)
+            drops = [int(line.split()[-1]) for line in f if line.split()[1].endswith(suffix)]
+    except (OSError, StopIteration, ValueError, IndexError):
+        return None
+    return sum(drops) if drops else None
+
+## @brief Schätzt ein Quantil aus kumulativen Buckets (Obergrenze des Buckets).
+def _quantile(buckets, q):
+    total = buckets[-1][1] if buckets else 0
+    if total == 0:
+        return None
+    for bound, count in buckets:
+        if count >= q * total:
+            return bound
+    return buckets[-1][0]
+
+def _format_seconds(value):
+    if value == float("inf"):
+        return "> max"
+    return f"{value * 1000:.3f} ms" if value < 1 else f"{value:.2f} s"
+
+## 6) Macht Prometheus-Text lesbar: Zähler mit Rate seit Start, Histogramme als n/avg/p50/p99.
+#  @param text Ausgabe von render().
+#  @return Liste von Zeilen.
+def summarize(text):
+    values, hists, order, kinds = {}, {}, [], {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, family, kind = line.split(" ", 3)
+            kinds[family] = kind
+            continue
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        family, _, part = name.split("{", 1)[0].rpartition("_")
+        if kinds.get(family) == "histogram":
+            h = hists.get(family)
+            if h is None:
+                h = hists[family] = {"buckets": [], "sum": 0.0, "count": 0}
+                order.append(family)
+            if part == "bucket":
+                h["buckets"].append((float(name.split('le="', 1)[1].split('"', 1)[0]), value))
+            else:
+                h[part] = value
+            continue
+        values[name] = value
+        order.append(name)
+    start = values.get("bymy_process_start_time_seconds")
+    uptime = max(0.0, time.time() - start) if start is not None else None
+    out = []
+    for name in order:
+        if name in hists:
+            h = hists[name]
+            n = int(h["count"])
+            if n == 0:
+                out.append(f"{name}: n=0")
+                continue
+            p50, p99 = _quantile(h["buckets"], 0.5), _quantile(h["buckets"], 0.99)
+            out.append(f"{name}: n={n} avg={_format_seconds(h['sum'] / n)} "
+                       f"p50≤{_format_seconds(p50)} p99≤{_format_seconds(p99)}")
+        elif name == "bymy_process_start_time_seconds":
+            out.append(f"uptime: {uptime:.0f} s")
+        else:
+            value = values[name]
+            rate = f" ({value / uptime:.1f}/s)" if uptime and uptime >= 1 and name.split("{", 1)[0].endswith("_total") else ""
+            out.append(f"{name}: {value:g}{rate}")
+    return out
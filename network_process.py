@@ -4,47 +4,86 @@
 #  @brief BYMY Netzwerkprozess für Nachrichten- und Bildübertragung
 #  @details
 #  Struktur & Ablauf:
-#   1) Farben & Pipes
-#   2) write_to_cli – Nachricht an CLI zurückschreiben
+#   1) Farben & IPC-Kanal
+#   2) write_to_cli – Nachricht an CLI zurückschreiben (gepuffert, gerahmt)
 #   3) send_who – WHO an Broadcast
 #   4) send_join – JOIN an Broadcast
-#   5) send_leave – LEAVE an Broadcast
-#   6) send_msg – Textnachricht an User
-#   7) send_image – Bild über TCP senden
+#   5) send_leave – LEAVE an Broadcast (5b/5c: send_heartbeat, heartbeat_loop)
+#   6) send_msg – Textnachricht an User (6b: send_multi – an viele User, SEND_MULTI;
+#      6c: on_reliable_fail – Fallback auf MSG, wenn zuverlässige Zustellung aufgibt)
+#   7) send_image – Bild über TCP senden (vorher HAVE: schon vorhanden → nichts senden)
 #   8) tcp_image_receiver – TCP-Server für Bilder
-#   9) handle_tcp_connection – TCP-Bild speichern
-#  10) read_cli_pipe – CLI-Kommandos lesen
-#  11) listen_on_port – UDP-Nachrichten empfangen
-#  12) handle_sigterm – Sauberer Shutdown
-#  13) start() – Startet alles
+#   9) handle_tcp_connection – TCP-Bild speichern (inhaltsadressiert, image_store.py)
+#  10) handle_cli_command – einzelnes CLI-Kommando ausführen
+#  11) read_cli_pipe – CLI-Kommandos vom IPC-Kanal lesen
+#  12) handle_datagram – einzelnes UDP-Datagramm verarbeiten; Teilnehmer landen in der
+#      gemeinsamen Tabelle (peer_table.py), die CLI erhält nur "PEERS <anzahl>"
+#      (12b: deliver_msg – MSG/RMSG annehmen; 12c: deliver_group_msg – Gruppennachrichten)
+#  13) bind_udp/listen_on_port – UDP-Nachrichten empfangen (Thread-Engine; pro Port ein Lese-
+#      und ein Verarbeitungsthread, dazwischen ein begrenzter Ring aus receive_ring.py)
+#      13b: start_receive_workers/relay_worker – Empfangsprozesse per SO_REUSEPORT
+#  14) AsyncCliChannel – CLI-Kanal der asyncio-Engine
+#  15) DatagramHandler – UDP-Empfang beider Engines (asyncio: als DatagramProtocol)
+#  16) handle_tcp_stream – Bildempfang der asyncio-Engine (begrenzt parallel)
+#  17) serve_cli – CLI-Kommandos der asyncio-Engine (dispatch_cli_command auch für den eingebetteten Kanal)
+#  18) run_asyncio – alles auf einem Event-Loop (engine = "asyncio"; asyncio wird erst hier geladen)
+#  19) shutdown/handle_sigterm – Sauberer Shutdown (19b: import_legacy_offline)
+#  20) start() – Startet alles (Threads oder asyncio laut config.toml); als eigener
+#      Prozess mit IPC-Socket oder eingebettet (bymy.py) mit In-Memory-Kanal
 
-import os, socket, threading, signal, sys
-from config_handler import get_config
+import os, socket, threading, signal, sys, tempfile, time, subprocess, hashlib
+from config_handler import get_config, watch_config, reload_config
+from ipc_channel import IpcChannel, IPC_SOCKET, FRAME_HEADER, IPC_FRAMES, encode_frame, signal_ready
+import compression, file_transfer, fanout, metrics, profiling, receive_ring
+from peer_registry import PageAssembler, parse_page
+from offline_store import OfflineStore, wire_id
+from image_store import ImageStore
+from peer_table import PeerTableWriter, PEER_TABLE
+from reliable import Endpoint
+from group_chat import Groups
+from receive_worker import RECORD_HEADER, KIND_CLI, bind_reuseport
 
-## 1) Farben & Pipes
+## 1) Farben & IPC-Kanal
 RESET = "\033[0m"; BLUE = "\033[94m"; CYAN = "\033[96m"
 YELLOW = "\033[93m"; RED = "\033[91m"; GREEN = "\033[92m"
-PIPE_CLI_TO_NET = "cli_to_network.pipe"
-PIPE_NET_TO_CLI = "network_to_cli.pipe"
+cli_channel = None
 AWAY_FLAG = "away.flag"
+RECV_BUFSIZE = 256 * 1024
 autoreplied_to = set()
-known_users = {}
+known_users = {}         # in start(): PeerTableWriter (dict + mmap-Datei für die CLI)
+knownusers_pages = PageAssembler()
+membership_epoch = None  # Epoche der Teilnehmerliste; None → Discovery kennt keine Deltas
+OFFLINE_DIR = os.path.join("receive", "offline")
+LEGACY_OFFLINE_TXT = os.path.join("receive", "offline_messages.txt")
+offline_store = None     # einziger Schreiber des Offline-Speichers (offline_store.py)
+reliable_endpoint = None # zuverlässige Zustellung (reliable.py), None → nur MSG
+groups = None            # Gruppenchats per Multicast (group_chat.py)
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "receive_worker.py")
+worker_procs = []        # Empfangsprozesse (receive_worker.py)
+receive_rings = []       # Ringe zwischen Lese- & Verarbeitungsthread (Thread-Engine)
 
-## 2) Nachricht in CLI-Pipe schreiben.
+# Laufzeit-Metriken (STATS-Kommando, optional periodisch nach metrics_dir/network.prom)
+DATAGRAM_CMDS = {"KNOWNUSERS", "DELTA", "MSG", "JOIN", "LEAVE", "RMSG", "RSYN", "GMSG", "GJOIN", "GLEAVE", "GINVITE"}
+DATAGRAMS = metrics.counter("bymy_datagrams_received_total", "Empfangene UDP-Datagramme nach Kommando", label="cmd")
+DATAGRAMS_DROPPED = metrics.counter("bymy_datagrams_dropped_total", "Verworfene UDP-Datagramme nach Grund", label="reason")
+DATAGRAM_SECONDS = metrics.histogram("bymy_datagram_handle_seconds", "Verarbeitungszeit pro UDP-Datagramm (Stichprobe)")
+TIMING_SAMPLE = 8  # nur jedes 8. Datagramm wird zeitlich gemessen (spart zwei Uhrabfragen)
+IMAGE_SECONDS = metrics.histogram("bymy_image_connection_seconds", "Dauer einer eingehenden Bildverbindung")
+
+## 2) Nachricht an die CLI schreiben (blockiert nicht, wird gesammelt gesendet).
 #  @param msg Die Nachricht
 def write_to_cli(msg):
     try:
-        with open(PIPE_NET_TO_CLI, "w") as pipe:
-            pipe.write(msg + "\n")
+        cli_channel.send(msg)
     except Exception as e:
-        print(f"{RED}Fehler beim Schreiben in CLI-Pipe: {e}{RESET}")
+        print(f"{RED}Fehler beim Schreiben in CLI-Kanal: {e}{RESET}")
 
 ## 3) Sende WHO Broadcast.
 #  @param whoisport Discovery-Port.
-def send_who(whoisport):
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.sendto(b"WHO", ('255.255.255.255', whoisport))
+#  @param epoch Bekannte Epoche (nur Änderungen seither erfragen) oder None für die volle Liste.
+def send_who(whoisport, epoch=None):
+    msg = "WHO" if epoch is None else f"WHO {epoch}"
+    fanout.send_to(msg, ('255.255.255.255', whoisport))
 
 ## 4) Sende JOIN Broadcast.
 #  @param handle Eigenes Handle.
@@ -52,21 +91,38 @@ def send_who(whoisport):
 #  @param whoisport Discovery-Port.
 def send_join(handle, port, whoisport):
     msg = f"JOIN {handle} {port}"
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.sendto(msg.encode(), ('255.255.255.255', whoisport))
+    fanout.send_to(msg, ('255.255.255.255', whoisport))
 
 ## 5) Sende LEAVE Broadcast.
 #  @param handle Eigenes Handle.
 #  @param whoisport Discovery-Port.
 def send_leave(handle, whoisport):
     msg = f"LEAVE {handle}"
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.sendto(msg.encode(), ('255.255.255.255', whoisport))
-        sock.sendto(msg.encode(), ('127.0.0.1', whoisport))
+    fanout.send_batch(msg, [('255.255.255.255', whoisport), ('127.0.0.1', whoisport)])
+
+## 5b) Sende HEARTBEAT Broadcast (hält den Eintrag beim Discovery-Dienst am Leben).
+#  @param handle Eigenes Handle.
+#  @param port Eigener UDP-Port.
+#  @param whoisport Discovery-Port.
+def send_heartbeat(handle, port, whoisport):
+    msg = f"HEARTBEAT {handle} {port}"
+    fanout.send_to(msg, ('255.255.255.255', whoisport))
+
+## 5c) Sendet periodisch HEARTBEATs (Thread-Engine).
+#  @param port Eigener UDP-Port.
+#  @param config Config (handle, whoisport, heartbeat_interval).
+def heartbeat_loop(port, config):
+    interval = float(config.get("heartbeat_interval", 5))
+    while True:
+        time.sleep(interval)
+        try:
+            send_heartbeat(config["handle"], port, config["whoisport"])
+        except OSError as e:
+            print(f"{RED}Fehler beim Heartbeat: {e}{RESET}")
 
 ## 6) Sende Textnachricht.
+#  Mit reliable_delivery nummeriert & bestätigt (reliable.py), sonst bzw. an alte
+#  Clients als einzelnes MSG-Datagramm.
 #  @param to_handle Empfänger.
 #  @param text Nachricht.
 #  @param known_users Bekannte Nutzer.
@@ -75,34 +131,78 @@ def send_msg(to_handle, text, known_users, my_handle):
     if to_handle not in known_users:
         print(f"{RED}Empfänger {to_handle} nicht bekannt{RESET}")
         return
-    ip, port = known_users[to_handle]
-    msg = f"MSG {my_handle} {text}"
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        sock.sendto(msg.encode(), (ip, port))
+    addr = known_users[to_handle]
+    if reliable_endpoint is not None and reliable_endpoint.send(to_handle, addr, text):
+        return
+    fanout.send_to(f"MSG {my_handle} {text}", addr)
+
+## 6b) Sende dieselbe Textnachricht an mehrere Nutzer in einem Durchlauf.
+#  @param to_handles Liste von Empfängern; "*" steht für alle bekannten Nutzer.
+#  @param text Nachricht.
+#  @param known_users Bekannte Nutzer.
+#  @param my_handle Eigener Name (wird bei "*" übersprungen).
+#  @return Anzahl gesendeter Datagramme.
+def send_multi(to_handles, text, known_users, my_handle):
+    if to_handles == ["*"]:
+        to_handles = [h for h in list(known_users) if h != my_handle]
+    targets = [(h, known_users[h]) for h in to_handles if h in known_users]
+    if reliable_endpoint is not None:
+        targets = [(h, addr) for h, addr in targets if not reliable_endpoint.send(h, addr, text)]
+    return fanout.send_batch(f"MSG {my_handle} {text}", [addr for _, addr in targets])
+
+## 6c) Zuverlässige Zustellung an einen Peer aufgegeben: unbestätigte Nachrichten als MSG senden.
+#  @param handle Empfänger.
+#  @param texts Nicht bestätigte Nachrichten.
+def on_reliable_fail(handle, texts):
+    print(f"{YELLOW}Keine Bestätigung von {handle}, sende {len(texts)} Nachricht(en) als MSG{RESET}")
+    addr = known_users.get(handle)
+    if addr is None:
+        return
+    config = get_config()
+    for text in texts:
+        fanout.send_to(f"MSG {config['handle']} {text}", addr)
 
 ## 7) Sende Bild über TCP.
+#  Zuerst HAVE: hat der Empfänger den Inhalt schon (image_store.py), entfällt der Versand.
+#  Mit transfer_streams > 0 blockweise, parallel & wiederaufnehmbar (file_transfer.py);
+#  kennt der Empfänger das nicht, klassisch als IMG per sendfile (Größe aus os.stat).
 #  @param to_handle Empfänger.
 #  @param filepath Datei.
-#  @param filesize Größe.
+#  @param filesize Größe (None → os.stat).
 #  @param known_users Bekannte Nutzer.
 #  @param config Config.
 def send_image(to_handle, filepath, filesize, known_users, config):
     if to_handle not in known_users:
         print(f"{RED}Empfänger {to_handle} nicht bekannt{RESET}")
         return
+    try:
+        if file_transfer.offer(to_handle, filepath, known_users, config):
+            return
+    except OSError as e:
+        print(f"{RED}Fehler beim Bildversand (HAVE): {e}{RESET}")
+        return
+    if int(config.get("transfer_streams", 0)) > 0:
+        try:
+            result = file_transfer.send_file(to_handle, filepath, known_users, config)
+        except Exception as e:
+            result = False
+            print(f"{RED}Fehler beim Bildversand (Blöcke): {e}{RESET}")
+        if result is False:
+            print(f"{RED}Bildversand an {to_handle} unvollständig – erneut senden setzt fort.{RESET}")
+        if result is not None:
+            return
     ip, port = known_users[to_handle]
     tcp_port = port + 1
     try:
+        if filesize is None:
+            filesize = os.stat(filepath).st_size
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             sock.connect((ip, tcp_port))
             filename = os.path.basename(filepath)
             header = f"IMG {config['handle']} {filename} {filesize}\n".encode()
             sock.sendall(header)
             with open(filepath, "rb") as f:
-                while True:
-                    chunk = f.read(4096)
-                    if not chunk: break
-                    sock.sendall(chunk)
+                sock.sendfile(f, 0, filesize)
     except Exception as e:
         print(f"{RED}Fehler beim Bildversand (TCP): {e}{RESET}")
 
@@ -118,138 +218,594 @@ def tcp_image_receiver(port, config):
         server.listen()
         while True:
             conn, addr = server.accept()
-            threading.Thread(target=handle_tcp_connection, args=(conn, addr, image_dir), daemon=True).start()
+            threading.Thread(target=handle_tcp_connection,
+                             args=(conn, addr, image_dir, compression.advertised(config),
+                                   int(config.get("max_file_size", file_transfer.MAX_FILE_SIZE))),
+                             name="tcp-image-conn", daemon=True).start()
 
-## 9) Speichert empfangenes TCP-Bild.
+## 9) Speichert empfangenes TCP-Bild (QUERY/CHUNK/HAVE gehen an file_transfer).
+#  Header und Daten landen per recv_into in einem wiederverwendeten Puffer; die
+#  Daten werden direkt in eine Temp-Datei gestreamt (SHA-256 nebenbei) und erst
+#  vollständig in den ImageStore unter imagepath übernommen. Der Speicherbedarf bleibt konstant.
 #  @param conn TCP-Verbindung.
 #  @param addr Absenderadresse.
 #  @param image_dir Zielordner.
-def handle_tcp_connection(conn, addr, image_dir):
+#  @param codecs Eigene Kompressionsverfahren (für file_transfer).
+#  @param max_size Größte angenommene Datei (für file_transfer).
+def handle_tcp_connection(conn, addr, image_dir, codecs=(), max_size=file_transfer.MAX_FILE_SIZE):
+    started = time.perf_counter()
+    buf = bytearray(RECV_BUFSIZE)
+    view = memoryview(buf)
+    part_path = None
     try:
-        header = b''
-        while not header.endswith(b'\n'):
-            data = conn.recv(1)
-            if not data: break
-            header += data
+        if conn.recv(5, socket.MSG_PEEK | socket.MSG_WAITALL) in file_transfer.PROTOCOL_CMDS:
+            file_transfer.serve_connection(conn, image_dir, lambda sender, filename: write_to_cli(f"IMG {sender} {filename}"),
+                                           codecs, max_size)
+            return
+        filled = 0
+        end = -1
+        while end < 0:
+            if filled == len(buf): return
+            n = conn.recv_into(view[filled:])
+            if not n: return
+            filled += n
+            end = buf.find(b"\n", 0, filled)
+        header = bytes(buf[:end])
         if not header.startswith(b"IMG"): return
         _, sender, filename, size_str = header.decode().strip().split()
-        size = int(size_str)
-        remaining = size
-        chunks = []
-        while remaining > 0:
-            chunk = conn.recv(min(4096, remaining))
-            if not chunk: break
-            chunks.append(chunk)
-            remaining -= len(chunk)
+        filename = os.path.basename(filename)
+        remaining = int(size_str)
+        fd, part_path = tempfile.mkstemp(dir=image_dir, prefix=".", suffix=".part")
+        h = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f:
+            body = min(filled - end - 1, remaining)
+            f.write(view[end + 1:end + 1 + body])
+            h.update(view[end + 1:end + 1 + body])
+            remaining -= body
+            while remaining > 0:
+                n = conn.recv_into(view[:min(len(buf), remaining)])
+                if not n: break
+                f.write(view[:n])
+                h.update(view[:n])
+                remaining -= n
+        file_transfer.IMAGE_BYTES.inc(n=int(size_str) - remaining)
         if remaining == 0:
-            save_path = os.path.join(image_dir, filename)
-            with open(save_path, "wb") as f:
-                for c in chunks:
-                    f.write(c)
+            filename = ImageStore(image_dir).add(part_path, h.hexdigest(), filename)
+            part_path = None
+            file_transfer.IMAGES.inc()
             write_to_cli(f"IMG {sender} {filename}")
     except Exception as e:
         print(f"{RED}[TCP] Fehler bei Bildempfang: {e}{RESET}")
     finally:
+        IMAGE_SECONDS.observe(time.perf_counter() - started)
+        view.release()
+        if part_path is not None and os.path.exists(part_path):
+            os.remove(part_path)
         conn.close()
 
-## 10) Liest CLI-Kommandos.
+## 10) Führt ein einzelnes CLI-Kommando aus (von beiden Engines genutzt).
+#  @param line Kommandozeile vom IPC-Kanal.
+#  @param config Globale Config.
+def handle_cli_command(line, config):
+    parts = line.strip().split(" ", 3)
+    if not parts:
+        return
+    cmd = parts[0]
+    if cmd == "SEND_MSG" and len(parts) >= 3:
+        to = parts[1]
+        msg = line.strip().split(" ", 2)[2]
+        send_msg(to, msg, known_users, config["handle"])
+    elif cmd == "SEND_MULTI" and len(parts) >= 3:
+        msg = line.strip().split(" ", 2)[2]
+        send_multi(parts[1].split(","), msg, known_users, config["handle"])
+    elif cmd == "SEND_GROUP" and len(parts) >= 3:
+        if not groups.send(parts[1], line.strip().split(" ", 2)[2]):
+            write_to_cli(f"GROUP {parts[1]} -")
+    elif cmd == "GROUP_JOIN" and len(parts) in (2, 3):
+        if groups.join(parts[1]) and len(parts) == 3:
+            groups.invite(parts[1], parts[2].split(","))
+    elif cmd == "GROUP_LEAVE" and len(parts) == 2:
+        groups.leave(parts[1])
+    elif cmd == "SEND_IMAGE" and len(parts) == 4:
+        to, filepath, filesize_str = parts[1], parts[2], parts[3]
+        try:
+            filesize = int(filesize_str)
+        except ValueError:
+            filesize = None
+        send_image(to, filepath, filesize, known_users, config)
+    elif cmd == "WHO":
+        send_who(config["whoisport"], membership_epoch)
+    elif cmd == "STATS":
+        write_to_cli("STATS\n" + metrics.render())
+    elif cmd == "RELOAD_CONFIG":
+        config.update(reload_config())
+    elif cmd == "OFFLINE_SYNC":
+        offline_store.flush()
+        write_to_cli(f"OFFLINE_READY {offline_store.count()}")
+    elif cmd == "OFFLINE_ACK" and len(parts) == 2 and parts[1].isdigit():
+        offline_store.ack(int(parts[1]))
+    elif cmd == "JOIN" and len(parts) == 3:
+        _, handle, port = parts
+        send_join(handle, int(port), config["whoisport"])
+    elif cmd == "LEAVE" and len(parts) == 2:
+        handle = parts[1]
+        send_leave(handle, config["whoisport"])
+        write_to_cli(f"LEAVE_ACK {handle}")
+
+## 11) Liest CLI-Kommandos vom IPC-Kanal (Neuverbindung übernimmt der Kanal).
 #  @param config Globale Config.
 def read_cli_pipe(config):
-    while True:
-        with open(PIPE_CLI_TO_NET, "r") as pipe:
-            for line in pipe:
-                parts = line.strip().split(" ", 3)
-                if not parts:
-                    continue
-                cmd = parts[0]
-                if cmd == "SEND_MSG" and len(parts) >= 3:
-                    to = parts[1]
-                    msg = line.strip().split(" ", 2)[2]
-                    send_msg(to, msg, known_users, config["handle"])
-                elif cmd == "SEND_IMAGE" and len(parts) == 4:
-                    to, filepath, filesize_str = parts[1], parts[2], parts[3]
-                    try:
-                        filesize = int(filesize_str)
-                    except ValueError:
-                        filesize = os.path.getsize(filepath)
-                    send_image(to, filepath, filesize, known_users, config)
-                elif cmd == "WHO":
-                    send_who(config["whoisport"])
-                elif cmd == "JOIN" and len(parts) == 3:
-                    _, handle, port = parts
-                    send_join(handle, int(port), config["whoisport"])
-                elif cmd == "LEAVE" and len(parts) == 2:
-                    handle = parts[1]
-                    send_leave(handle, config["whoisport"])
-                    write_to_cli(f"LEAVE_ACK {handle}")
-
-## 11) Lauscht auf Port & verarbeitet.
-#  @param port UDP-Port.
+    threading.current_thread().name = "cli-pipe"  # Zuordnung in profiling.py
+    for line in cli_channel.messages():
+        handle_cli_command(line, config)
+
+## 12) Verarbeitet ein einzelnes UDP-Datagramm (von beiden Engines genutzt).
+#  @param data Empfangene Bytes.
+#  @param addr Absenderadresse (ip, port).
+#  @param config Config.
+def handle_datagram(data, addr, config):
+    global membership_epoch
+    msg = data.decode("utf-8", errors="ignore").strip()
+    parts = msg.split(" ", 2)
+    if not parts:
+        return
+    cmd = parts[0]
+    DATAGRAMS.inc(cmd if cmd in DATAGRAM_CMDS else "other")
+    if cmd == "KNOWNUSERS":
+        entries, meta = parse_page(msg)
+        users = [(p[0], p[1], int(p[2])) for p in entries if len(p) == 3 and p[2].isdigit()]
+        for h, ip, port in users:
+            known_users[h] = (ip, port)
+        if knownusers_pages.add((addr, cmd), users, meta.get("page")) is None:
+            return
+        membership_epoch = meta.get("epoch")
+        write_to_cli(f"PEERS {len(known_users)}")
+    elif cmd == "DELTA":
+        # Antwort auf "WHO <e>" (BASE = e) oder gesammelte Ankündigung des Discovery-Dienstes
+        # (BASE = Epoche der vorigen Ankündigung ≤ e). Die Einträge sind der jeweils letzte
+        # Stand eines Handles, daher auch ohne passende Epoche gültig; bei einer Lücke
+        # (verpasste Ankündigung) folgt zusätzlich eine volle Liste per WHO.
+        entries, meta = parse_page(msg)
+        changes = knownusers_pages.add((addr, cmd), entries, meta.get("page"))
+        if changes is None:
+            return
+        base, epoch = meta.get("base"), meta.get("epoch")
+        if membership_epoch is not None and epoch is not None and epoch < membership_epoch:
+            return  # überholt von einer neueren Liste
+        for p in changes:
+            if len(p) > 1 and p[1] == config["handle"]:
+                continue  # eigener Eintrag (gesammelte Ankündigungen gehen an alle)
+            if p[0] == "JOIN" and len(p) == 4 and p[3].isdigit():
+                if p[1] not in known_users:
+                    write_to_cli(f"JOIN {p[1]}")
+                known_users[p[1]] = (p[2], int(p[3]))
+            elif p[0] == "LEAVE" and len(p) == 2:
+                known_users.pop(p[1], None)
+                if groups is not None:
+                    groups.member_left(p[1])
+        if membership_epoch is not None and base is not None and base <= membership_epoch:
+            membership_epoch = epoch
+        elif membership_epoch is not None:
+            membership_epoch = None
+            send_who(config["whoisport"])
+        write_to_cli(f"PEERS {len(known_users)}")
+    elif cmd == "MSG" and len(parts) == 3:
+        deliver_msg(parts[1], parts[2], config)
+    elif cmd in ("RMSG", "RSYN") and reliable_endpoint is not None:
+        # roh & ungekürzt weitergeben: Fragmente dürfen auf Leerzeichen enden oder komprimiert sein
+        reliable_endpoint.handle_datagram(data, addr)
+    elif cmd in ("GMSG", "GJOIN", "GLEAVE", "GINVITE") and groups is not None:
+        groups.handle_datagram(data)  # Unicast-Kopie (Multicast liest group_chat selbst)
+    elif cmd == "JOIN" and len(parts) == 3:
+        join_handle, join_port = parts[1], int(parts[2])
+        if join_handle != config["handle"]:
+            known_users[join_handle] = (addr[0], join_port)
+            write_to_cli(f"JOIN {join_handle}")
+    elif cmd == "LEAVE" and len(parts) == 2:
+        leave_handle = parts[1]
+        if leave_handle == config["handle"]:
+            return
+        if leave_handle in known_users:
+            del known_users[leave_handle]
+        if groups is not None:
+            groups.member_left(leave_handle)
+    else:
+        DATAGRAMS_DROPPED.inc("malformed")
+
+## 12b) Nimmt eine Textnachricht an (MSG oder vollständig empfangenes RMSG).
+#  @param sender Absender.
+#  @param text Nachricht.
 #  @param config Config.
-def listen_on_port(port, config):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("", port))
+#  @param msg_id ID auf dem Draht (nur RMSG; Duplikate landen nicht doppelt im Offline-Speicher).
+def deliver_msg(sender, text, config, msg_id=None):
+    if sender == config["handle"]:
+        return
+    if os.path.exists(AWAY_FLAG):
+        offline_store.append(sender, text, wire_id(sender, msg_id) if msg_id is not None else None)
+        if sender not in autoreplied_to:
+            send_msg(sender, config["autoreply"], known_users, config["handle"])
+            autoreplied_to.add(sender)
+    else:
+        write_to_cli(f"MSG {sender} {text}")
+
+## 12c) Nimmt eine Gruppennachricht an (ohne Autoreply: sie ginge an die ganze Gruppe).
+#  @param group Gruppenname.
+#  @param sender Absender.
+#  @param text Nachricht.
+#  @param msg_id GMSG-ID (je Absender eindeutig).
+def deliver_group_msg(group, sender, text, msg_id):
+    if os.path.exists(AWAY_FLAG):
+        offline_store.append(sender, f"[#{group}] {text}", wire_id(sender, msg_id))
+    else:
+        write_to_cli(f"GMSG {group} {sender} {text}")
+
+## 13) Bindet einen UDP-Port (vor dem Start der Threads, damit die Bereitschaft stimmt).
+#  @param port UDP-Port.
+#  @param shared True, wenn receive_worker-Prozesse denselben Port teilen (SO_REUSEPORT).
+#  @param rcvbuf Gewünschter Kernel-Empfangspuffer (config.toml: udp_rcvbuf; 0 → Systemvorgabe).
+#  @return Gebundener Socket.
+def bind_udp(port, shared=False, rcvbuf=receive_ring.UDP_RCVBUF):
+    if shared:
+        sock = bind_reuseport(port, rcvbuf)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receive_ring.set_rcvbuf(sock, rcvbuf)
+        sock.bind(("", port))
+    actual = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    if 0 < actual < rcvbuf:
+        print(f"{YELLOW}UDP-Port {port}: Empfangspuffer nur {actual // 1024} KiB "
+              f"(net.core.rmem_max erhöhen für {rcvbuf // 1024} KiB){RESET}")
+    return sock
+
+## 13) Lauscht auf einem gebundenen UDP-Socket (Thread-Engine).
+#  Dieser Thread liest nur: stoßweise in einen begrenzten Ring (receive_ring.py), damit der
+#  Kernel-Puffer auch dann geleert wird, wenn die Verarbeitung (Offline-Speicher, Autoreply,
+#  CLI) gerade hängt. Ist der Ring voll, werden neue Datagramme verworfen & gezählt.
+#  @param sock Socket aus bind_udp.
+#  @param config Config (receive_queue: Größe des Rings).
+def listen_on_port(sock, config):
+    ring = receive_ring.DatagramRing(int(config.get("receive_queue", receive_ring.RING_SIZE)))
+    receive_rings.append(ring)
+    threading.Thread(target=process_ring, args=(ring, config), name=f"udp-process-{sock.getsockname()[1]}",
+                     daemon=True).start()
     while True:
         try:
-            data, addr = sock.recvfrom(65535)
+            batch = receive_ring.drain(sock)
         except OSError as e:
+            DATAGRAMS_DROPPED.inc("socket")
             print(f"{RED}Socket Error: {e}{RESET}")
             break
-        msg = data.decode("utf-8", errors="ignore").strip()
-        parts = msg.split(" ", 2)
-        if not parts:
-            continue
-        cmd = parts[0]
-        if cmd == "KNOWNUSERS":
-            entries = msg[len("KNOWNUSERS "):].split(", ")
-            for entry in entries:
-                p = entry.split()
-                if len(p) == 3:
-                    h, ip, port_str = p
-                    known_users[h] = (ip, int(port_str))
-            users_str = ", ".join(f"{h} {ip} {p}" for h, (ip, p) in known_users.items())
-            write_to_cli(f"KNOWNUSERS {users_str}")
-        elif cmd == "MSG" and len(parts) == 3:
-            sender, text = parts[1], parts[2]
-            if sender != config["handle"]:
-                if os.path.exists(AWAY_FLAG):
-                    with open(os.path.join("receive", "offline_messages.txt"), "a", encoding="utf-8") as f:
-                        f.write(f"{sender}: {text}\n")
-                    if sender not in autoreplied_to:
-                        send_msg(sender, config["autoreply"], known_users, config["handle"])
-                        autoreplied_to.add(sender)
-                else:
-                    write_to_cli(f"MSG {sender} {text}")
-        elif cmd == "JOIN" and len(parts) == 3:
-            join_handle, join_port = parts[1], int(parts[2])
-            if join_handle != config["handle"]:
-                known_users[join_handle] = (addr[0], join_port)
-                write_to_cli(f"JOIN {join_handle}")
-        elif cmd == "LEAVE" and len(parts) == 2:
-            leave_handle = parts[1]
-            if leave_handle == config["handle"]:
-                continue
-            if leave_handle in known_users:
-                del known_users[leave_handle]
-            write_to_cli(f"LEAVE {leave_handle}")
-
-## 12) SIGTERM-Handler.
+        dropped = ring.put_batch(batch)
+        if dropped:
+            DATAGRAMS_DROPPED.inc("queue_full", n=dropped)
+
+## 13) Verarbeitet die Datagramme eines Rings in Empfangsreihenfolge (Thread-Engine).
+#  @param ring DatagramRing aus listen_on_port.
+#  @param config Config.
+def process_ring(ring, config):
+    handler = DatagramHandler(config)
+    while True:
+        for data, addr in ring.get_batch():
+            handler.datagram_received(data, addr)
+
+## 13b) Startet `count` Empfangsprozesse pro Port (SO_REUSEPORT-Gruppe mit dem eigenen Socket).
+#  Die Peer-Tabelle & der CLI-Kanal bleiben hier; die Prozesse liefern über je ein Socketpaar.
+#  @param ports UDP-Ports.
+#  @param count Prozesse pro Port.
+#  @param dispatch Callback(daten, addr) für weitergereichte Datagramme.
+def start_receive_workers(ports, count, dispatch):
+    for port in ports:
+        for _ in range(count):
+            ours, theirs = socket.socketpair()
+            proc = subprocess.Popen([sys.executable, WORKER_SCRIPT, str(port), str(theirs.fileno())],
+                                    pass_fds=(theirs.fileno(),))
+            theirs.close()
+            worker_procs.append(proc)
+            threading.Thread(target=relay_worker, args=(ours, dispatch), daemon=True).start()
+
+## 13b) Übernimmt die Ergebnisse eines Empfangsprozesses.
+#  CLI-Rahmen gehen unverändert (ein Eintrag pro Stoß) in den CLI-Kanal, alles andere an dispatch.
+#  @param sock Socket zum Empfangsprozess.
+#  @param dispatch Callback(daten, addr).
+def relay_worker(sock, dispatch):
+    reader = sock.makefile("rb")
+    while True:
+        header = reader.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            print(f"{YELLOW}Empfangsprozess beendet{RESET}")
+            return
+        kind, count, length = RECORD_HEADER.unpack(header)
+        payload = reader.read(length)
+        if kind == KIND_CLI:
+            DATAGRAMS.inc("MSG", n=count)
+            cli_channel.send_frames(payload, count)
+        else:
+            ip, port, data = payload.split(b" ", 2)
+            dispatch(data, (ip.decode(), int(port)))
+
+## 14) asyncio-Engine: CLI-Kanal auf dem Event-Loop.
+#  Gleiche Schnittstelle wie IpcChannel.send, damit write_to_cli unverändert bleibt.
+class AsyncCliChannel:
+    ## @brief Legt den Kanal für einen laufenden Event-Loop an.
+    #  @param loop Der asyncio-Loop.
+    def __init__(self, loop):
+        self.loop = loop
+        self.writer = None
+        self.backlog = []
+
+    ## @brief Puffert eine Nachricht an die CLI (thread-sicher).
+    #  @param msg Nachricht als String.
+    def send(self, msg):
+        self.loop.call_soon_threadsafe(self._write, encode_frame(msg))
+
+    ## @brief Puffert bereits kodierte Rahmen (receive_worker.py) unverändert (thread-sicher).
+    #  @param frames Hintereinanderliegende Rahmen als Bytes.
+    #  @param count Anzahl Rahmen.
+    def send_frames(self, frames, count):
+        self.loop.call_soon_threadsafe(self._write, frames, count)
+
+    def _write(self, frame, count=1):
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(frame)
+            IPC_FRAMES.inc(n=count)
+        else:
+            self.backlog.append(frame)
+
+    ## @brief Anzahl zurückgestauter Rahmen (ohne verbundene CLI).
+    def pending_frames(self):
+        return len(self.backlog)
+
+    ## @brief Übernimmt eine neue CLI-Verbindung und schreibt den Rückstau.
+    #  @param writer asyncio.StreamWriter der CLI.
+    def attach(self, writer):
+        self.writer = writer
+        if self.backlog:
+            writer.write(b"".join(self.backlog))
+            self.backlog = []
+
+    ## @brief Schließt die aktuelle Verbindung und entfernt die Socket-Datei.
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if os.path.exists(IPC_SOCKET):
+            os.remove(IPC_SOCKET)
+
+## 15) UDP-Empfang beider Engines: Fehler zählen, jedes TIMING_SAMPLE-te Datagramm messen.
+#  Die asyncio-Engine leitet davon ihr DatagramProtocol ab (siehe run_asyncio).
+class DatagramHandler:
+    def __init__(self, config):
+        self.config = config
+        self.seen = 0
+
+    def datagram_received(self, data, addr):
+        self.seen += 1
+        timed = self.seen % TIMING_SAMPLE == 0
+        start = time.perf_counter() if timed else 0.0
+        try:
+            handle_datagram(data, addr, self.config)
+        except Exception as e:
+            DATAGRAMS_DROPPED.inc("error")
+            print(f"{RED}Fehler bei Datagramm von {addr}: {e}{RESET}")
+        if timed:
+            DATAGRAM_SECONDS.observe(time.perf_counter() - start)
+
+## 16) asyncio-Engine: Empfängt ein Bild, höchstens `limit` gleichzeitig.
+#  @param reader StreamReader der Verbindung.
+#  @param writer StreamWriter der Verbindung.
+#  @param image_dir Zielordner.
+#  @param limit Semaphore für die maximale Anzahl paralleler Transfers.
+#  @param codecs Eigene Kompressionsverfahren (für file_transfer).
+#  @param max_size Größte angenommene Datei (für file_transfer).
+async def handle_tcp_stream(reader, writer, image_dir, limit, codecs=(), max_size=file_transfer.MAX_FILE_SIZE):
+    async with limit:
+        started = time.perf_counter()
+        part_path = None
+        try:
+            header = await reader.readline()
+            if header.startswith(file_transfer.PROTOCOL_CMDS):
+                await file_transfer.serve_stream(reader, writer, header, image_dir,
+                                                 lambda sender, filename: write_to_cli(f"IMG {sender} {filename}"),
+                                                 codecs, max_size)
+                return
+            if not header.startswith(b"IMG"): return
+            _, sender, filename, size_str = header.decode().strip().split()
+            filename = os.path.basename(filename)
+            remaining = int(size_str)
+            fd, part_path = tempfile.mkstemp(dir=image_dir, prefix=".", suffix=".part")
+            h = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f:
+                while remaining > 0:
+                    chunk = await reader.read(min(RECV_BUFSIZE, remaining))
+                    if not chunk: break
+                    f.write(chunk)
+                    h.update(chunk)
+                    remaining -= len(chunk)
+            file_transfer.IMAGE_BYTES.inc(n=int(size_str) - remaining)
+            if remaining == 0:
+                filename = await asyncio.get_running_loop().run_in_executor(
+                    None, ImageStore(image_dir).add, part_path, h.hexdigest(), filename)
+                part_path = None
+                file_transfer.IMAGES.inc()
+                write_to_cli(f"IMG {sender} {filename}")
+        except Exception as e:
+            print(f"{RED}[TCP] Fehler bei Bildempfang: {e}{RESET}")
+        finally:
+            IMAGE_SECONDS.observe(time.perf_counter() - started)
+            if part_path is not None and os.path.exists(part_path):
+                os.remove(part_path)
+            writer.close()
+
+## 17) asyncio-Engine: Liest gerahmte CLI-Kommandos.
+#  SEND_IMAGE (TCP-Connect & Upload) und OFFLINE_* (fsync) blockieren und laufen
+#  daher im begrenzten Executor.
+#  @param reader StreamReader der CLI.
+#  @param writer StreamWriter der CLI.
+#  @param config Config.
+#  @param executor ThreadPoolExecutor für ausgehende Bilder.
+async def serve_cli(reader, writer, config, executor):
+    loop = asyncio.get_running_loop()
+    cli_channel.attach(writer)
+    try:
+        while True:
+            (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+            line = (await reader.readexactly(length)).decode("utf-8", errors="ignore")
+            dispatch_cli_command(loop, line, config, executor)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        if cli_channel.writer is writer:
+            cli_channel.writer = None
+        writer.close()
+
+## 17) Führt ein CLI-Kommando auf dem Loop aus (blockierende im Executor).
+def dispatch_cli_command(loop, line, config, executor):
+    if line.startswith(("SEND_IMAGE ", "OFFLINE_")):
+        loop.run_in_executor(executor, handle_cli_command, line, config)
+    else:
+        handle_cli_command(line, config)
+
+## 18) asyncio-Engine: UDP, TCP-Bildserver, CLI-Kanal und Heartbeats auf einem Loop.
+#  asyncio & concurrent.futures werden erst hier importiert (kürzerer Start der Thread-Engine);
+#  der Import bindet den globalen Namen, den serve_cli & handle_tcp_stream nutzen.
+#  @param port UDP-Port (TCP-Bilder auf port + 1).
+#  @param config Config (max_transfers begrenzt parallele Bildtransfers).
+#  @param channel CLI-Kanal (eingebettet) oder None → Unix-Socket IPC_SOCKET.
+#  @param ready Optionaler Callback, sobald UDP, TCP & CLI-Kanal bereit sind.
+def run_asyncio(port, config, channel=None, ready=None):
+    global asyncio
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    class UdpProtocol(DatagramHandler, asyncio.DatagramProtocol):
+        pass
+
+    async def main():
+        global cli_channel
+        loop = asyncio.get_running_loop()
+        cli_channel = channel or AsyncCliChannel(loop)
+        max_transfers = int(config.get("max_transfers", 8))
+        limit = asyncio.Semaphore(max_transfers)
+        executor = ThreadPoolExecutor(max_workers=max_transfers)
+        image_dir = config.get("imagepath", "receive")
+        os.makedirs(image_dir, exist_ok=True)
+        workers = int(config.get("receive_workers", 0))
+        rcvbuf = int(config.get("udp_rcvbuf", receive_ring.UDP_RCVBUF))
+        for udp_port in config["port"]:
+            await loop.create_datagram_endpoint(lambda: UdpProtocol(config),
+                                                sock=bind_udp(udp_port, workers > 0, rcvbuf))
+        if workers:
+            relayed = UdpProtocol(config)
+            start_receive_workers(config["port"], workers,
+                                  lambda data, addr: loop.call_soon_threadsafe(relayed.datagram_received, data, addr))
+        await asyncio.start_server(lambda r, w: handle_tcp_stream(r, w, image_dir, limit, compression.advertised(config),
+                                                                  int(config.get("max_file_size", file_transfer.MAX_FILE_SIZE))),
+                                   port=port + 1, reuse_address=True)
+        if channel is None:
+            if os.path.exists(IPC_SOCKET):
+                os.remove(IPC_SOCKET)
+            await asyncio.start_unix_server(lambda r, w: serve_cli(r, w, config, executor), path=IPC_SOCKET)
+        else:
+            def pump():
+                for line in channel.messages():
+                    loop.call_soon_threadsafe(dispatch_cli_command, loop, line, config, executor)
+            threading.Thread(target=pump, daemon=True).start()
+        if ready is not None:
+            ready()
+        interval = float(config.get("heartbeat_interval", 5))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                send_heartbeat(config["handle"], port, config["whoisport"])
+            except OSError as e:
+                print(f"{RED}Fehler beim Heartbeat: {e}{RESET}")
+    asyncio.run(main())
+
+## 19) Sauberer Shutdown: LEAVE senden, Empfangsprozesse beenden, Offline-Speicher schreiben.
+def shutdown():
+    config = get_config()
+    if groups is not None:
+        groups.leave_all()
+    send_leave(config["handle"], config["whoisport"])
+    for proc in worker_procs:
+        proc.terminate()
+    if offline_store is not None:
+        offline_store.flush()
+    if cli_channel is not None:
+        cli_channel.close()
+
+## 19) SIGTERM-Handler.
 #  @param signum Signal.
 #  @param frame Frame.
 def handle_sigterm(signum, frame):
-    config = get_config()
-    send_leave(config["handle"], config["whoisport"])
+    shutdown()
     sys.exit(0)
 
-## 13) Startet alle Threads & Bindings.
+## 19b) Übernimmt eine alte receive/offline_messages.txt einmalig in den Offline-Speicher.
+#  @param store OfflineStore.
+def import_legacy_offline(store):
+    if not os.path.exists(LEGACY_OFFLINE_TXT):
+        return
+    with open(LEGACY_OFFLINE_TXT, encoding="utf-8") as f:
+        for line in f:
+            sender, sep, text = line.rstrip("\n").partition(": ")
+            if sep:
+                store.append(sender, text)
+    store.flush()
+    os.remove(LEGACY_OFFLINE_TXT)
+
+## 20) Startet alle Threads & Bindings (oder die asyncio-Engine laut config.toml).
+#  Änderungen an config.toml (z.B. autoreply) werden live in `config` übernommen;
+#  Ports, Engine & receive_workers gelten erst nach einem Neustart.
+#  @param config Config (live aktualisiert).
+#  @param channel CLI-Kanal; None → IpcChannel-Server auf IPC_SOCKET (eigener Prozess).
+#  @param ready Optionaler Callback, sobald UDP-Ports & CLI-Kanal gebunden sind.
+def start(config, channel=None, ready=None):
+    global offline_store, reliable_endpoint, cli_channel, groups, known_users
+    port = config["port"][0]
+    engine = config.get("engine", "threads")
+    offline_store = OfflineStore(OFFLINE_DIR)
+    import_legacy_offline(offline_store)
+    if config.get("reliable_delivery", False):
+        reliable_endpoint = Endpoint(config, lambda sender, text, msg_id: deliver_msg(sender, text, config, msg_id),
+                                     on_reliable_fail, int(config.get("reliable_window", 32)))
+    known_users = PeerTableWriter(config.get("peer_table", PEER_TABLE))
+    groups = Groups(config, known_users, deliver_group_msg, write_to_cli)
+    metrics.gauge("bymy_udp_receive_drops", "Vom Kernel verworfene Datagramme am UDP-Port",
+                  fn=lambda: metrics.udp_socket_drops(port))
+    metrics.gauge("bymy_receive_queue_datagrams", "Empfangene, noch nicht verarbeitete Datagramme (Thread-Engine)",
+                  fn=lambda: sum(len(ring) for ring in receive_rings))
+    metrics.gauge("bymy_ipc_backlog_frames", "Noch nicht an die CLI geschriebene Rahmen",
+                  fn=lambda: cli_channel.pending_frames() if cli_channel is not None else None)
+    metrics.set_enabled(config.get("metrics", True))
+    if config.get("metrics_dir"):
+        metrics.start_dump(config["metrics_dir"], "network", float(config.get("metrics_interval", 10)))
+    print(f"{YELLOW}[NETWORK] gestartet auf Port {port} (Engine: {engine}){RESET}\n")
+    if engine == "asyncio":
+        run_asyncio(port, config, channel, ready)
+        return
+    if channel is None:
+        cli_channel = IpcChannel(IPC_SOCKET, server=True)
+        cli_channel.listen()
+    else:
+        cli_channel = channel
+    workers = int(config.get("receive_workers", 0))
+    rcvbuf = int(config.get("udp_rcvbuf", receive_ring.UDP_RCVBUF))
+    for sock in [bind_udp(udp_port, workers > 0, rcvbuf) for udp_port in config["port"]]:
+        threading.Thread(target=listen_on_port, args=(sock, config), name=f"udp-listen-{sock.getsockname()[1]}",
+                         daemon=True).start()
+    if workers:
+        start_receive_workers(config["port"], workers, DatagramHandler(config).datagram_received)
+    threading.Thread(target=tcp_image_receiver, args=(port, config), name="tcp-image", daemon=True).start()
+    threading.Thread(target=heartbeat_loop, args=(port, config), name="heartbeat", daemon=True).start()
+    if ready is not None:
+        ready()
+    read_cli_pipe(config)
+
+## 20) Als eigener Prozess (main.sh): Bereitschaft über BYMY_READY melden.
 if __name__ == "__main__":
-    if not os.path.exists(PIPE_CLI_TO_NET): os.mkfifo(PIPE_CLI_TO_NET)
-    if not os.path.exists(PIPE_NET_TO_CLI): os.mkfifo(PIPE_NET_TO_CLI)
     config = get_config()
+    watch_config(config.update)
     signal.signal(signal.SIGTERM, handle_sigterm)
     signal.signal(signal.SIGINT, handle_sigterm)
-    port = config["port"][0]
-    print(f"{YELLOW}[NETWORK] gestartet auf Port {port}{RESET}\n")
-    threading.Thread(target=tcp_image_receiver, args=(port, config), daemon=True).start()
-    threading.Thread(target=listen_on_port, args=(port, config), daemon=True).start()
-    read_cli_pipe(config)
\ No newline at end of file
+    profiling.install(config, "network")
+    start(config, ready=lambda: signal_ready("network"))
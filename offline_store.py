@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+## @file offline_store.py
+#  @brief Dauerhafter Speicher für Nachrichten, die im Abwesenheitsmodus eintreffen
+#  @details
+#  Ersetzt receive/offline_messages.txt (eine Zeile pro open/append/close).
+#  Struktur & Ablauf:
+#   1) Segmentiertes Append-only-Log: segment-000001.log, ... (je eine JSON-Zeile pro Nachricht)
+#   2) Group-Commit: append puffert, ein Hintergrund-Thread schreibt gesammelt mit einem fsync
+#   3) Index im Speicher: (zeit, absender, segment, offset) plus Index nach Absender;
+#      abgeschlossene Segmente erhalten eine .idx-Datei, der Start liest nur diese
+#      und das aktive Segment (kein JSON-Parsen jeder einzelnen Nachricht)
+#   4) Deduplizierung über die ID auf dem Draht (RMSG: Sitzung & seq, GMSG: Absender & ID);
+#      einfache MSG tragen keine ID und werden nie verworfen
+#   5) Seitenweises Abspielen (page) und Quittieren gelesener Nachrichten (ack)
+#  Es gibt genau einen Schreiber (den Netzwerkprozess); die CLI liest mit writer=False.
+
+import os, json, time, bisect, hashlib, threading
+from collections import deque
+
+SEGMENT_PREFIX = "segment-"
+CURSOR_FILE = "cursor"
+
+## @brief Speicher-ID einer Nachricht, die auf dem Draht eine ID trägt.
+#  @param ident ID je Absender (z.B. "<sitzung>.<seq>" bei RMSG, die GMSG-ID).
+#  @return Hex-String.
+def wire_id(sender, ident):
+    return hashlib.sha1(f"{sender}\0{ident}".encode("utf-8")).hexdigest()[:16]
+
+## @brief ID einer Nachricht ohne eigene ID auf dem Draht.
+#  Die laufende Nummer je Absender unterscheidet gleiche Nachrichten derselben Sekunde
+#  (zweimal "ok" hintereinander sind zwei Nachrichten).
+#  @param seq Laufende Nummer der Nachricht dieses Absenders.
+#  @return Hex-String.
+def message_id(sender, text, ts, seq):
+    return hashlib.sha1(f"{sender}\0{text}\0{int(ts)}\0{seq}".encode("utf-8")).hexdigest()[:16]
+
+## 1) Append-only-Speicher für Offline-Nachrichten.
+class OfflineStore:
+    ## @brief Öffnet (bzw. legt an) den Speicher und liest den Index ein.
+    #  @param directory Ordner der Segmente.
+    #  @param segment_bytes Größe, ab der ein neues Segment begonnen wird.
+    #  @param commit_interval Max. Wartezeit in Sekunden bis zum gemeinsamen fsync.
+    #  @param writer True im schreibenden Prozess (startet den Commit-Thread).
+    def __init__(self, directory, segment_bytes=1 << 20, commit_interval=0.2, writer=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.write_lock = threading.Lock()  # serialisiert Schreiben & Quittieren, nicht append
+        self.index = []       # [(zeit, absender, segment, offset)] in Ankunftsreihenfolge
+        self.by_sender = {}   # {absender: [position im index, ...]}
+        self.seen = deque(maxlen=10000)
+        self.seen_set = set()
+        self.sequence = {}    # {absender: laufende Nummer} für message_id
+        self.pending = []
+        self.segment = 1
+        self.active = []      # [[zeit, absender, offset, id]] des aktiven Segments (für die .idx-Datei)
+        self.writer = writer
+        self._scan()
+        if writer:
+            threading.Thread(target=self._commit_loop, daemon=True).start()
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:06d}.log")
+
+    def _idx_path(self, segment):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:06d}.idx")
+
+    def _segments(self):
+        names = [n for n in os.listdir(self.directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(".log")]
+        return sorted(int(n[len(SEGMENT_PREFIX):-4]) for n in names)
+
+    def _read_cursor(self):
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE), encoding="utf-8") as f:
+                segment, offset = f.read().split()
+            return int(segment), int(offset)
+        except (OSError, ValueError):
+            return 0, 0
+
+    ## 3) Baut den Index aus den Segmenten auf (Nachrichten vor dem Cursor gelten als gelesen).
+    def _scan(self):
+        cursor = self._read_cursor()
+        self.segment = max(1, cursor[0])
+        for segment in self._segments():
+            self.segment = segment
+            try:
+                with open(self._idx_path(segment), encoding="utf-8") as f:
+                    entries = json.load(f)
+                self.active = None  # abgeschlossen
+            except (OSError, ValueError):
+                entries = self.active = self._scan_segment(segment)
+            for ts, sender, offset, msg_id in entries:
+                if self.writer:
+                    self._remember(msg_id)
+                if (segment, offset) >= cursor:
+                    self._add_to_index({"ts": ts, "sender": sender}, segment, offset)
+        if self.active is None:
+            self.segment += 1
+            self.active = []
+
+    ## @brief Liest ein Segment ohne .idx-Datei Zeile für Zeile.
+    #  @return [[zeit, absender, offset, id], ...]
+    def _scan_segment(self, segment):
+        entries = []
+        with open(self._path(segment), "rb") as f:
+            offset = 0
+            for line in f:
+                start, offset = offset, offset + len(line)
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                entries.append([rec["ts"], rec["sender"], start, rec["id"]])
+        return entries
+
+    ## @brief Schließt das aktive Segment ab: .idx-Datei schreiben, nächstes Segment beginnen.
+    def _seal(self):
+        tmp = self._idx_path(self.segment) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.active))
+        os.replace(tmp, self._idx_path(self.segment))
+        self.segment += 1
+        self.active = []
+
+    def _remember(self, msg_id):
+        if len(self.seen) == self.seen.maxlen:
+            self.seen_set.discard(self.seen[0])
+        self.seen.append(msg_id)
+        self.seen_set.add(msg_id)
+
+    def _add_to_index(self, rec, segment, offset):
+        self.by_sender.setdefault(rec["sender"], []).append(len(self.index))
+        self.index.append((rec["ts"], rec["sender"], segment, offset))
+
+    ## 2/4) Nimmt eine Nachricht an (gepuffert, Duplikate werden verworfen).
+    #  @param sender Absender.
+    #  @param text Nachricht.
+    #  @param msg_id Optionale ID (wire_id; sonst aus Absender, Text, Sekunde & laufender Nummer
+    #                gebildet – Duplikate erkennt nur eine mitgegebene ID).
+    #  @return False, wenn die Nachricht schon gespeichert war.
+    def append(self, sender, text, msg_id=None):
+        ts = time.time()
+        with self.cond:
+            if msg_id is None:
+                seq = self.sequence[sender] = self.sequence.get(sender, 0) + 1
+                msg_id = message_id(sender, text, ts, seq)
+            if msg_id in self.seen_set:
+                return False
+            self._remember(msg_id)
+            self.pending.append({"id": msg_id, "ts": ts, "sender": sender, "text": text})
+            self.cond.notify()
+        return True
+
+    def _commit_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+            time.sleep(self.commit_interval)
+            self.flush()
+
+    ## 2) Schreibt alle gepufferten Nachrichten mit einem gemeinsamen fsync.
+    #  append blockiert währenddessen nicht; neue Nachrichten landen im nächsten Batch.
+    def flush(self):
+        with self.write_lock:
+            with self.cond:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return
+            written = []
+            f = open(self._path(self.segment), "ab")
+            offset = f.seek(0, os.SEEK_END)
+            try:
+                for rec in batch:
+                    if offset >= self.segment_bytes:
+                        f.flush(); os.fsync(f.fileno()); f.close()
+                        self._seal()
+                        f = open(self._path(self.segment), "ab")
+                        offset = 0
+                    line = json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n"
+                    written.append((rec, self.segment, offset))
+                    self.active.append([rec["ts"], rec["sender"], offset, rec["id"]])
+                    f.write(line)
+                    offset += len(line)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                f.close()
+            with self.lock:
+                for rec, segment, offset in written:
+                    self._add_to_index(rec, segment, offset)
+
+    ## @brief Anzahl ungelesener Nachrichten.
+    def count(self):
+        with self.lock:
+            return len(self.index) + len(self.pending)
+
+    ## @brief Liest Datensätze zu Indexeinträgen (ein open pro Segment).
+    def _read(self, entries):
+        out, handles = [], {}
+        try:
+            for _, _, segment, offset in entries:
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open(self._path(segment), "rb")
+                f.seek(offset)
+                out.append(json.loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        return out
+
+    ## 5) Liefert eine Seite ungelesener Nachrichten.
+    #  @param start Position der ersten Nachricht.
+    #  @param limit Anzahl Nachrichten.
+    #  @return Liste von {"id", "ts", "sender", "text"}.
+    def page(self, start, limit):
+        with self.lock:
+            entries = self.index[start:start + limit]
+        return self._read(entries)
+
+    ## 3) Nachrichten eines Absenders (neueste zuletzt).
+    #  @param sender Absender.
+    #  @param limit Maximale Anzahl (die letzten).
+    def from_sender(self, sender, limit=50):
+        with self.lock:
+            entries = [self.index[i] for i in self.by_sender.get(sender, [])[-limit:]]
+        return self._read(entries)
+
+    ## 3) Nachrichten ab einem Zeitpunkt (binäre Suche, der Index ist zeitlich sortiert).
+    #  @param ts Unix-Zeitpunkt.
+    #  @param limit Maximale Anzahl.
+    def since(self, ts, limit=50):
+        with self.lock:
+            i = bisect.bisect_left(self.index, (ts,))
+            entries = self.index[i:i + limit]
+        return self._read(entries)
+
+    ## 5) Quittiert die ersten n Nachrichten: Cursor setzen, vollständig gelesene Segmente löschen.
+    #  @param n Anzahl gelesener Nachrichten.
+    def ack(self, n):
+        self.flush()
+        with self.write_lock, self.lock:
+            n = min(n, len(self.index))
+            if n == 0:
+                return
+            rest = self.index[n:]
+            cursor = (rest[0][2], rest[0][3]) if rest else (self.segment + 1, 0)
+            tmp = os.path.join(self.directory, CURSOR_FILE + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(f"{cursor[0]} {cursor[1]}")
+            os.replace(tmp, os.path.join(self.directory, CURSOR_FILE))
+            for segment in self._segments():
+                if segment < cursor[0]:
+                    os.remove(self._path(segment))
+                    if os.path.exists(self._idx_path(segment)):
+                        os.remove(self._idx_path(segment))
+            if not rest:
+                self.segment += 1
+                self.active = []
+            self.index = []
+            self.by_sender = {}
+            for ts, sender, segment, offset in rest:
+                self.by_sender.setdefault(sender, []).append(len(self.index))
+                self.index.append((ts, sender, segment, offset))
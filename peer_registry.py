@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+## @file peer_registry.py
+#  @brief Indizierte Teilnehmerliste für Discovery & Netzwerk (skaliert auf tausende Peers)
+#  @details
+#  Struktur & Ablauf:
+#   1) PeerRegistry – handle → (ip, port) plus Sekundärindizes nach IP und (ip, port)
+#   2) pages – KNOWNUSERS-Antwort in Datagramme unter MAX_DATAGRAM Bytes aufteilen
+#   3) PageAssembler – Seiten auf Empfängerseite wieder zusammensetzen
+#   4) ExpiryHeap – Ablaufzeiten (TTL) per Min-Heap, O(log n) pro Aktualisierung
+#   5) TokenBuckets – Ratenbegrenzung je Handle (wiederholte JOINs)
+#   6) Announcements – JOIN/LEAVE eines Takts als DELTA-Seiten für alle Peers
+#
+#  Seitenformat: KNOWNUSERS <h1 ip1 p1>, <h2 ip2 p2>, ..., EPOCH <e>, PAGE <n>/<gesamt>
+#  Die Einträge "EPOCH e" und "PAGE n/gesamt" haben nur zwei Felder und werden von
+#  alten Clients, die nur dreiteilige Einträge übernehmen, ignoriert.
+#
+#  Versionierte Deltas: Jede Änderung der Liste erhöht die Epoche um 1. Auf
+#  "WHO <e>" antwortet der Discovery-Dienst nur mit den Änderungen seit e:
+#  DELTA JOIN <h> <ip> <port>, LEAVE <h>, ..., BASE <e>, EPOCH <neu>, PAGE <n>/<gesamt>
+#  Liegt e außerhalb des Änderungsprotokolls, folgt die volle KNOWNUSERS-Liste.
+
+import heapq, time
+from collections import deque
+
+## Maximale Datagrammgröße: bleibt unter der typischen Ethernet-MTU (keine IP-Fragmentierung).
+MAX_DATAGRAM = 1200
+
+## 1) Teilnehmerliste mit O(1)-Lookups nach Handle, IP und (ip, port).
+class PeerRegistry:
+    ## @brief Legt eine leere Liste an.
+    #  @param history Anzahl Änderungen, die für Delta-Antworten vorgehalten werden.
+    def __init__(self, history=4096):
+        self.by_handle = {}  # {handle: (ip, port)}
+        self.by_ip = {}      # {ip: {handle: None, ...}} (Einfügereihenfolge bleibt erhalten)
+        self.by_addr = {}    # {(ip, port): handle}
+        # Start in Millisekunden: nach einem Neustart liegen alte Epochen der Clients
+        # außerhalb des Protokolls und führen zu einer vollen Liste.
+        self.epoch = time.time_ns() // 1_000_000
+        self.changes = deque(maxlen=history)  # [(epoche, handle, "JOIN h ip p" | "LEAVE h"), ...]
+
+    def __len__(self):
+        return len(self.by_handle)
+
+    def __contains__(self, handle):
+        return handle in self.by_handle
+
+    def __getitem__(self, handle):
+        return self.by_handle[handle]
+
+    ## @brief Alle Einträge als (handle, (ip, port)).
+    def items(self):
+        return self.by_handle.items()
+
+    ## @brief Fügt einen Nutzer hinzu oder aktualisiert seine Adresse.
+    #  @param handle Name des Nutzers.
+    #  @param ip IP-Adresse.
+    #  @param port UDP-Port.
+    def add(self, handle, ip, port):
+        if self.by_handle.get(handle) == (ip, port):
+            return
+        self._unlink(handle)
+        self.by_handle[handle] = (ip, port)
+        self.by_ip.setdefault(ip, {})[handle] = None
+        self.by_addr[(ip, port)] = handle
+        self._record(handle, f"JOIN {handle} {ip} {port}")
+
+    ## @brief Entfernt einen Nutzer (falls vorhanden).
+    #  @param handle Name des Nutzers.
+    #  @return Die alte Adresse oder None.
+    def remove(self, handle):
+        addr = self._unlink(handle)
+        if addr is not None:
+            self._record(handle, f"LEAVE {handle}")
+        return addr
+
+    def _unlink(self, handle):
+        addr = self.by_handle.pop(handle, None)
+        if addr is None:
+            return None
+        ip, port = addr
+        handles = self.by_ip.get(ip)
+        if handles is not None:
+            handles.pop(handle, None)
+            if not handles:
+                del self.by_ip[ip]
+        if self.by_addr.get(addr) == handle:
+            del self.by_addr[addr]
+        return addr
+
+    def _record(self, handle, entry):
+        self.epoch += 1
+        self.changes.append((self.epoch, handle, entry))
+
+    ## @brief Änderungen seit einer Epoche, je Handle nur die letzte.
+    #  @param since Epoche des Clients.
+    #  @return Liste von "JOIN ..."/"LEAVE ..."-Einträgen oder None, wenn since
+    #          nicht mehr (oder nie) im Protokoll liegt.
+    def changes_since(self, since):
+        if since == self.epoch:
+            return []
+        if since > self.epoch or not self.changes or since < self.changes[0][0] - 1:
+            return None
+        latest = {}
+        for epoch, handle, entry in self.changes:
+            if epoch > since:
+                latest.pop(handle, None)
+                latest[handle] = entry
+        return list(latest.values())
+
+    ## @brief Port des zuerst registrierten Nutzers mit dieser IP (für WHO-Antworten).
+    #  @param ip Absender-IP.
+    #  @return Port oder None.
+    def port_for_ip(self, ip):
+        handles = self.by_ip.get(ip)
+        if not handles:
+            return None
+        return self.by_handle[next(iter(handles))][1]
+
+    ## @brief Handle zu einer genauen Adresse.
+    #  @param ip IP-Adresse.
+    #  @param port UDP-Port.
+    #  @return Handle oder None.
+    def handle_for_addr(self, ip, port):
+        return self.by_addr.get((ip, port))
+
+    ## 2) Teilt die KNOWNUSERS-Antwort in Seiten unter max_bytes auf.
+    #  @param max_bytes Maximale Bytes pro Datagramm.
+    #  @return Liste von Datagrammen (Bytes).
+    def pages(self, max_bytes=MAX_DATAGRAM):
+        return paginate([f"{h} {ip} {p}" for h, (ip, p) in self.by_handle.items()], max_bytes,
+                        trailer=[f"EPOCH {self.epoch}"])
+
+    ## @brief Antwort auf "WHO <since>": Delta-Seiten oder (zu alt) die volle Liste.
+    #  @param since Epoche des Clients.
+    #  @param max_bytes Maximale Bytes pro Datagramm.
+    #  @return Liste von Datagrammen (Bytes).
+    def delta_pages(self, since, max_bytes=MAX_DATAGRAM):
+        changes = self.changes_since(since)
+        if changes is None:
+            return self.pages(max_bytes)
+        return paginate(changes, max_bytes, prefix="DELTA",
+                        trailer=[f"BASE {since}", f"EPOCH {self.epoch}"])
+
+## @brief Verpackt Einträge in nummerierte Seiten.
+#  @param entries Liste von Eintrags-Strings.
+#  @param max_bytes Maximale Bytes pro Datagramm.
+#  @param prefix Kommando am Anfang jeder Seite.
+#  @param trailer Zusätzliche Einträge, die jede Seite trägt (z.B. EPOCH).
+#  @return Liste von Datagrammen (Bytes).
+def paginate(entries, max_bytes=MAX_DATAGRAM, prefix="KNOWNUSERS", trailer=()):
+    trailer = list(trailer)
+    budget = max_bytes - len(f"{prefix} , PAGE 99999/99999") - sum(len(t) + 2 for t in trailer)
+    groups, current, size = [], [], 0
+    for entry in entries:
+        n = len(entry.encode("utf-8")) + 2
+        if current and size + n > budget:
+            groups.append(current)
+            current, size = [], 0
+        current.append(entry)
+        size += n
+    groups.append(current)
+    total = len(groups)
+    return [f"{prefix} {', '.join(g + trailer + [f'PAGE {i}/{total}'])}".encode("utf-8")
+            for i, g in enumerate(groups, 1)]
+
+## @brief Zerlegt eine Seite in Einträge und Metadaten (PAGE, EPOCH, BASE).
+#  @param msg Nachricht als String (KNOWNUSERS ... oder DELTA ...).
+#  @return (Liste von Feldlisten, {"page": (n, gesamt), "epoch": e, "base": b}).
+def parse_page(msg):
+    entries, meta = [], {}
+    for entry in msg.partition(" ")[2].split(", "):
+        p = entry.split()
+        if len(p) == 2 and p[0] == "PAGE":
+            n, _, total = p[1].partition("/")
+            if n.isdigit() and total.isdigit():
+                meta["page"] = (int(n), int(total))
+        elif len(p) == 2 and p[0] in ("EPOCH", "BASE") and p[1].isdigit():
+            meta[p[0].lower()] = int(p[1])
+        elif p:
+            entries.append(p)
+    return entries, meta
+
+## @brief Zerlegt eine KNOWNUSERS-Nachricht in Einträge und Seiteninfo.
+#  @param msg Nachricht als String.
+#  @return (Liste von (handle, ip, port), (seite, gesamt) oder None).
+def parse_knownusers(msg):
+    entries, meta = parse_page(msg)
+    users = []
+    for p in entries:
+        if len(p) == 3 and p[2].isdigit():
+            users.append((p[0], p[1], int(p[2])))
+    return users, meta.get("page")
+
+## 3) Setzt KNOWNUSERS-Seiten eines Absenders wieder zusammen.
+class PageAssembler:
+    def __init__(self):
+        self.pending = {}  # {absender: (gesamt, {seite: [einträge]})}
+
+    ## @brief Nimmt eine Seite an.
+    #  @param source Absender (z.B. Adresse des Discovery-Dienstes).
+    #  @param users Einträge der Seite.
+    #  @param page (seite, gesamt) oder None für ungeteilte Antworten.
+    #  @return Vollständige Liste, sobald alle Seiten da sind, sonst None.
+    def add(self, source, users, page):
+        if page is None:
+            return users
+        n, total = page
+        known_total, pages = self.pending.get(source, (total, {}))
+        if known_total != total or n in pages:
+            pages = {}
+        pages[n] = users
+        if len(pages) < total:
+            self.pending[source] = (total, pages)
+            return None
+        self.pending.pop(source, None)
+        return [u for i in sorted(pages) for u in pages[i]]
+
+## 4) Ablaufzeiten per Min-Heap mit verzögertem Löschen.
+#  Jede Aktualisierung legt einen neuen Eintrag an; veraltete Einträge werden beim
+#  Herausnehmen verworfen. Ein Tick kostet nur O(1), solange nichts abgelaufen ist.
+class ExpiryHeap:
+    def __init__(self):
+        self.deadlines = {}  # {key: aktuelle Ablaufzeit}
+        self.heap = []       # [(ablaufzeit, key), ...]
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    ## @brief Setzt (oder verlängert) die Ablaufzeit eines Schlüssels.
+    #  @param key Schlüssel (z.B. Handle).
+    #  @param deadline Ablaufzeitpunkt (time.monotonic()-Skala).
+    def touch(self, key, deadline):
+        self.deadlines[key] = deadline
+        heapq.heappush(self.heap, (deadline, key))
+
+    ## @brief Entfernt einen Schlüssel aus der Überwachung.
+    def discard(self, key):
+        self.deadlines.pop(key, None)
+
+    ## @brief Nimmt alle bis `now` abgelaufenen Schlüssel heraus.
+    #  @param now Aktueller Zeitpunkt.
+    #  @return Liste abgelaufener Schlüssel.
+    def pop_expired(self, now):
+        expired = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, key = heapq.heappop(self.heap)
+            if self.deadlines.get(key) == deadline:
+                del self.deadlines[key]
+                expired.append(key)
+        return expired
+
+## 5) Token-Bucket je Schlüssel (z.B. Handle): höchstens burst Ereignisse am Stück,
+#  danach rate pro Sekunde.
+class TokenBuckets:
+    def __init__(self):
+        self.buckets = {}  # {key: (tokens, zeitpunkt)}
+
+    ## @brief Verbraucht ein Token, falls vorhanden.
+    #  @param key Schlüssel.
+    #  @param rate Tokens pro Sekunde (≤ 0 → unbegrenzt).
+    #  @param burst Größe des Buckets.
+    #  @param now Aktueller Zeitpunkt (time.monotonic()-Skala).
+    #  @return True, wenn das Ereignis erlaubt ist.
+    def allow(self, key, rate, burst, now):
+        if rate <= 0:
+            return True
+        tokens, last = self.buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            return False
+        self.buckets[key] = (tokens - 1, now)
+        return True
+
+    ## @brief Vergisst wieder volle Buckets (begrenzt den Speicher bei wechselnden Handles).
+    def prune(self, rate, burst, now):
+        self.buckets = {key: (tokens, last) for key, (tokens, last) in self.buckets.items()
+                        if rate > 0 and tokens + (now - last) * rate < burst}
+
+## 6) Sammelt JOIN/LEAVE-Ankündigungen eines Takts (je Handle nur der letzte Stand)
+#  und verpackt sie als DELTA-Seiten – dasselbe Format wie die Antwort auf "WHO <e>".
+#  BASE ist die Epoche der vorigen Ankündigung: Clients mit einer Epoche ≥ BASE
+#  übernehmen die Seiten, alle anderen haben eine Ankündigung verpasst (→ WHO).
+#  Ein Nutzer erhält seinen eigenen Eintrag nicht (wie beim einzelnen JOIN).
+class Announcements:
+    ## @param epoch Aktuelle Epoche der Teilnehmerliste.
+    def __init__(self, epoch):
+        self.pending = {}  # {handle: "JOIN h ip p" | "LEAVE h"}
+        self.base = epoch
+        self.due = None    # Versandzeitpunkt (Beginn des Takts + Intervall)
+
+    def __len__(self):
+        return len(self.pending)
+
+    ## @brief Merkt eine Änderung vor; die erste eines Takts legt den Versandzeitpunkt fest.
+    #  @param handle Name des Nutzers.
+    #  @param entry "JOIN h ip p" oder "LEAVE h".
+    #  @param due Versandzeitpunkt, falls noch keiner ansteht.
+    def add(self, handle, entry, due):
+        self.pending.pop(handle, None)
+        self.pending[handle] = entry
+        if self.due is None:
+            self.due = due
+
+    ## @brief Verpackt den Takt in Seiten und beginnt den nächsten.
+    #  Alle Empfänger erhalten dieselben Seiten, auch wer selbst im Takt vorkommt;
+    #  Clients überspringen ihren eigenen Eintrag (network_process, DELTA).
+    #  @param epoch Aktuelle Epoche der Teilnehmerliste.
+    #  @param max_bytes Maximale Bytes pro Datagramm.
+    #  @return Liste von Datagrammen (Bytes).
+    def flush(self, epoch, max_bytes=MAX_DATAGRAM):
+        pages = paginate(list(self.pending.values()), max_bytes, prefix="DELTA",
+                         trailer=[f"BASE {self.base}", f"EPOCH {epoch}"])
+        self.pending.clear()
+        self.base, self.due = epoch, None
+        return pages
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+## @file peer_table.py
+#  @brief Teilnehmerliste im gemeinsamen Speicher (mmap) für Netzwerk- und CLI-Prozess
+#  @details
+#  Der Netzwerkprozess ist der einzige Schreiber; die CLI liest ohne Lock und ohne
+#  IPC-Rundlauf ("who", Prüfung des Chatpartners). Bisher führte die CLI eine eigene
+#  Kopie, die über KNOWNUSERS/DELTA/LEAVE-Zeilen nachgezogen wurde.
+#
+#  Dateiaufbau (PEER_TABLE, Standard "bymy.peers" im Arbeitsordner):
+#   Kopf    HEADER: Kennung, Sequenz, belegte Plätze (Hochwassermarke), Kapazität
+#   Plätze  RECORD je Nutzer: Handle (UTF-8), IP, Port, belegt-Flag – feste Größe,
+#           ein Nutzer behält seinen Platz, freie Plätze werden wiederverwendet
+#  Seqlock: Der Schreiber setzt die Sequenz vor einer Änderung auf einen ungeraden,
+#  danach auf den nächsten geraden Wert. Ein Leser kopiert Kopf & Plätze und prüft,
+#  ob die Sequenz gerade und unverändert blieb; sonst liest er erneut. Bei
+#  unveränderter Sequenz liefert er seine letzte Kopie (ein struct-Zugriff).
+#  Struktur & Ablauf:
+#   1) Format – HEADER, RECORD, Kapazität
+#   2) PeerTableWriter – dict der Netzwerkseite, spiegelt jede Änderung in die Datei
+#   3) PeerTableReader – dict-ähnliche Sicht der CLI (in, Iteration, len, get, items)
+
+import os, mmap, struct, threading
+
+## 1) Format.
+PEER_TABLE = "bymy.peers"
+MAGIC = b"BYPT"
+HEADER = struct.Struct("=4sxxxxQII")   # Kennung, Sequenz, Hochwassermarke, Kapazität
+RECORD = struct.Struct("=64s16sHB5x")  # Handle, IP, Port, belegt
+CAPACITY = 16384                       # ≈ 1,4 MiB; nur beschriebene Seiten belegen Speicher
+HANDLE_BYTES = 64
+SEQ_OFFSET = 8
+HIGH_OFFSET = 16
+MAX_RETRIES = 1000
+
+def _size(capacity):
+    return HEADER.size + capacity * RECORD.size
+
+## 2) Teilnehmerliste der Netzwerkseite: ein gewöhnliches dict (schnelle Lookups auf dem
+#  heißen Pfad), dessen Änderungen zusätzlich in die gemeinsame Datei geschrieben werden.
+#  Änderungen sind über ein Lock serialisiert (mehrere Empfangsthreads pro Port möglich).
+class PeerTableWriter(dict):
+    ## @brief Legt die Datei an bzw. leert sie (gleiche Inode: laufende Leser bleiben gültig).
+    #  Eine vorhandene Datei wird nie verkleinert (Leser mit alter Abbildung bekämen SIGBUS).
+    #  @param path Dateipfad.
+    #  @param capacity Mindestanzahl Plätze.
+    def __init__(self, path=PEER_TABLE, capacity=CAPACITY):
+        super().__init__()
+        self.path = path
+        self.lock = threading.Lock()
+        self.slots = {}   # {handle: platz}
+        self.free = []
+        self.high = 0
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            size = max(os.fstat(fd).st_size, _size(capacity))
+            os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.capacity = (size - HEADER.size) // RECORD.size
+        if self.map[:4] != MAGIC:
+            HEADER.pack_into(self.map, 0, MAGIC, 0, 0, self.capacity)
+        # alte Datei (Neustart): unter dem Seqlock leeren, Leser verwerfen ihre Kopie
+        self._begin()
+        self.map[HEADER.size:] = bytes(size - HEADER.size)
+        struct.pack_into("=I", self.map, HIGH_OFFSET + 4, self.capacity)
+        self._end()
+
+    def _begin(self):
+        seq = HEADER.unpack_from(self.map)[1]
+        self.seq = seq + 1 if seq % 2 == 0 else seq + 2  # ungerade: Änderung läuft
+        struct.pack_into("=Q", self.map, SEQ_OFFSET, self.seq)
+
+    ## @brief Schließt eine Änderung ab: erst die Hochwassermarke, zuletzt die (gerade) Sequenz.
+    def _end(self):
+        struct.pack_into("=I", self.map, HIGH_OFFSET, self.high)
+        struct.pack_into("=Q", self.map, SEQ_OFFSET, self.seq + 1)
+
+    def _store(self, handle, addr):
+        slot = self.slots.get(handle)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            elif self.high < self.capacity:
+                slot, self.high = self.high, self.high + 1
+            else:
+                return  # voll: nur im dict (CLI sieht den Nutzer nicht)
+            self.slots[handle] = slot
+        ip, port = addr
+        RECORD.pack_into(self.map, HEADER.size + slot * RECORD.size,
+                         handle.encode("utf-8"), ip.encode("ascii", "replace"), port, 1)
+
+    def _clear(self, handle):
+        slot = self.slots.pop(handle, None)
+        if slot is not None:
+            RECORD.pack_into(self.map, HEADER.size + slot * RECORD.size, b"", b"", 0, 0)
+            self.free.append(slot)
+
+    ## @brief Fügt einen Nutzer hinzu oder aktualisiert seine Adresse.
+    def __setitem__(self, handle, addr):
+        with self.lock:
+            if dict.get(self, handle) == addr:
+                return
+            dict.__setitem__(self, handle, addr)
+            if len(handle.encode("utf-8")) > HANDLE_BYTES:
+                return
+            self._begin()
+            self._store(handle, addr)
+            self._end()
+
+    def __delitem__(self, handle):
+        with self.lock:
+            dict.__delitem__(self, handle)
+            self._begin()
+            self._clear(handle)
+            self._end()
+
+    ## @brief Entfernt einen Nutzer (wie dict.pop).
+    def pop(self, handle, *default):
+        with self.lock:
+            if handle not in self:
+                return dict.pop(self, handle, *default)
+            self._begin()
+            self._clear(handle)
+            self._end()
+            return dict.pop(self, handle)
+
+
+## 3) Lesesicht der CLI: verhält sich für in, Iteration, len, get & items wie ein dict.
+class PeerTableReader:
+    ## @brief Öffnet die Datei beim ersten Zugriff (sie entsteht mit dem Netzwerkprozess).
+    #  @param path Dateipfad.
+    def __init__(self, path=PEER_TABLE):
+        self.path = path
+        self.map = None
+        self.seq = None
+        self.users = {}
+
+    def _open(self):
+        try:
+            with open(self.path, "rb") as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # fehlt noch oder ist leer
+            self.map = None
+
+    ## @brief Aktuelle Teilnehmerliste (neu gelesen nur, wenn sich die Sequenz geändert hat).
+    #  @return {handle: (ip, port)} – nicht verändern, wird bis zur nächsten Änderung geteilt.
+    def snapshot(self):
+        if self.map is None:
+            self._open()
+            if self.map is None:
+                return self.users
+        for _ in range(MAX_RETRIES):
+            magic, seq, high, capacity = HEADER.unpack_from(self.map)
+            if magic != MAGIC:
+                return self.users
+            if seq == self.seq:
+                return self.users
+            if seq & 1:
+                continue  # Schreiber ist mitten in einer Änderung
+            if _size(capacity) > len(self.map):
+                self._open()  # Schreiber mit größerer Kapazität neu gestartet
+                continue
+            data = self.map[HEADER.size:HEADER.size + high * RECORD.size]
+            if HEADER.unpack_from(self.map)[1] != seq:
+                continue
+            users = {}
+            for handle, ip, port, used in RECORD.iter_unpack(data):
+                if used:
+                    users[handle.rstrip(b"\0").decode("utf-8", "replace")] = (ip.rstrip(b"\0").decode("ascii"), port)
+            self.seq, self.users = seq, users
+            return users
+        return self.users
+
+    def __contains__(self, handle):
+        return handle in self.snapshot()
+
+    def __iter__(self):
+        return iter(list(self.snapshot()))
+
+    def __len__(self):
+        return len(self.snapshot())
+
+    def __bool__(self):
+        return bool(self.snapshot())
+
+    def __getitem__(self, handle):
+        return self.snapshot()[handle]
+
+    def get(self, handle, default=None):
+        return self.snapshot().get(handle, default)
+
+    def items(self):
+        return list(self.snapshot().items())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+## @file profiling.py
+#  @brief Zuschaltbares Profiling für Discovery, Netzwerk & CLI (Ausgabe per SIGUSR1)
+#  @details
+#  Aktivierung über config.toml (profile = "cprofile", "sample", "memory", kommagetrennt
+#  kombinierbar; Standard "off") oder die Umgebungsvariable BYMY_PROFILE (hat Vorrang),
+#  z.B. BYMY_PROFILE=cprofile,sample ./main.sh
+#  "kill -USR1 <pid>" schreibt den aktuellen Stand nach profile_dir, ohne den Prozess
+#  anzuhalten; gemessen wird danach weiter (Werte sind kumulativ seit dem Start).
+#   cprofile – deterministisch, ein cProfile.Profile je Thread (threading.setprofile),
+#              Threads mit gleichem Namen zusammengefasst → <thread>.prof (pstats/snakeviz)
+#   sample   – Stichproben aller Thread-Stacks per ITIMER_PROF (nur CPU-Zeit des Prozesses
+#              löst aus) → samples.folded (flamegraph.pl, speedscope)
+#   memory   – tracemalloc-Snapshot → .tracemalloc; die größten Allokationsorte und der
+#              Zuwachs seit dem letzten Abzug folgen im Hintergrund → -memory.txt
+#  Zu jedem Abzug gehört eine Zusammenfassung (.txt) mit den teuersten Funktionen je Thread.
+#  Struktur & Ablauf:
+#   1) modes/thread_key – Konfiguration lesen, Thread-Namen vereinheitlichen
+#   2) install – Modi starten & SIGUSR1 belegen (im Hauptthread, vor dem Start der Threads)
+#   3) _start_cprofile/_sample – Erfassung je Thread bzw. per Signal-Timer
+#   4) dump – alle Modi in Dateien schreiben (Speicherauswertung in eigenem Thread)
+
+import os, re, sys, time, signal, atexit, threading, io, cProfile, pstats, tracemalloc
+from collections import Counter
+
+RESET = "\033[0m"; YELLOW = "\033[93m"
+
+ENV_VAR = "BYMY_PROFILE"
+MODES = ("cprofile", "sample", "memory")
+PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.005   # Sekunden CPU-Zeit zwischen zwei Stichproben
+STACK_DEPTH = 64
+TRACE_FRAMES = 10
+TOP = 25
+
+_process = None
+_dir = PROFILE_DIR
+_active = []
+_lock = threading.Lock()
+_profiles = []          # [(thread, cProfile.Profile)]
+_samples = Counter()    # {(thread, stack): anzahl}
+_sampling = False       # Python-Signalhandler können sich gegenseitig unterbrechen
+_labels = {}            # {code: "funktion (datei:zeile)"}
+_memory_lock = threading.Lock()
+_last_stats = None     # {traceback: Statistic} des letzten Abzugs
+
+## 1) Aktive Modi laut BYMY_PROFILE bzw. config.toml.
+#  @param config Config (profile).
+#  @return Liste aus MODES (leer → aus).
+def modes(config):
+    text = os.environ.get(ENV_VAR) or config.get("profile", "off")
+    return [mode for mode in text.replace(" ", "").split(",") if mode in MODES]
+
+## 1) Name eines Threads für die Zuordnung: "Thread-7 (handle_tcp_connection)" → "handle_tcp_connection",
+#  damit kurzlebige Threads derselben Funktion (z.B. je Bildverbindung) zusammengefasst werden.
+def thread_key(name):
+    return re.sub(r"^Thread-\d+ \((.*)\)$", r"\1", name)
+
+## 2) Startet die gewählten Modi & belegt SIGUSR1 mit dump.
+#  Threads, die vor dem Aufruf gestartet wurden, erfasst cprofile nicht.
+#  @param config Config (profile, profile_dir, profile_interval).
+#  @param process Prozessname für die Dateinamen ("network", "cli", …).
+#  @return Liste der aktiven Modi.
+def install(config, process):
+    global _process, _dir, _active
+    _active = modes(config)
+    if not _active:
+        return []
+    _process = process
+    _dir = config.get("profile_dir") or PROFILE_DIR
+    if "memory" in _active:
+        tracemalloc.start(TRACE_FRAMES)
+    if "sample" in _active:
+        interval = float(config.get("profile_interval", SAMPLE_INTERVAL))
+        signal.signal(signal.SIGPROF, _sample)
+        signal.siginterrupt(signal.SIGPROF, False)  # blockierende Aufrufe nicht unterbrechen
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        atexit.register(signal.setitimer, signal.ITIMER_PROF, 0)  # sonst beendet SIGPROF das Herunterfahren
+    if "cprofile" in _active:
+        threading.setprofile(_thread_hook)
+        _start_cprofile()
+    signal.signal(signal.SIGUSR1, dump)
+    print(f"{YELLOW}[PROFIL] {process}: {', '.join(_active)} – Abzug mit kill -USR1 {os.getpid()}{RESET}")
+    return _active
+
+## 3) Erster Profil-Aufruf in einem neuen Thread: eigenes Profil anlegen.
+#  enable() ersetzt diesen Hook für den Thread durch cProfile. Ab Python 3.12 misst ein
+#  Profil prozessweit (sys.monitoring); dann erfasst das erste Profil alle Threads.
+def _thread_hook(frame, event, arg):
+    try:
+        _start_cprofile()
+    except ValueError:
+        sys.setprofile(None)
+
+def _start_cprofile():
+    profile = cProfile.Profile()
+    profile.enable()
+    with _lock:
+        _profiles.append((threading.current_thread(), profile))
+
+def _stop_cprofile():
+    with _lock:
+        for entry in [e for e in _profiles if e[0] is threading.current_thread()]:
+            entry[1].disable()
+            _profiles.remove(entry)
+
+## 3) SIGPROF-Handler: Stack jedes Threads als eine Stichprobe zählen.
+#  Trifft ein Signal ein, während der Handler noch läuft, entfällt diese Stichprobe.
+def _sample(signum, frame):
+    global _sampling
+    if _sampling:
+        return
+    _sampling = True
+    try:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, top in sys._current_frames().items():
+            stack = []
+            while top is not None and len(stack) < STACK_DEPTH:
+                code = top.f_code
+                label = _labels.get(code)
+                if label is None:
+                    label = _labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(label)
+                top = top.f_back
+            _samples[(thread_key(names.get(ident, str(ident))), tuple(reversed(stack)))] += 1
+    finally:
+        _sampling = False
+
+## @brief Momentaufnahme eines laufenden Profils für pstats
+#  (Profile.create_stats würde das Profil abschalten).
+class _Snapshot:
+    def __init__(self, profile):
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self):
+        pass
+
+def _safe(name):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+def _dump_cprofile(base, out):
+    with _lock:
+        entries = list(_profiles)
+    by_thread = {}
+    for thread, profile in entries:
+        snapshot = _Snapshot(profile)
+        if snapshot.stats:  # Thread hat seit dem Start nichts ausgeführt
+            by_thread.setdefault(thread_key(thread.name), []).append(snapshot)
+    files = []
+    for key, snapshots in sorted(by_thread.items()):
+        text = io.StringIO()
+        stats = pstats.Stats(snapshots[0], stream=text)
+        if snapshots[1:]:
+            stats.add(*snapshots[1:])
+        path = f"{base}-{_safe(key)}.prof"
+        stats.dump_stats(path)
+        files.append(path)
+        stats.sort_stats("cumulative").print_stats(TOP)
+        out.write(f"\n=== cProfile: Thread {key} ({len(snapshots)} Thread(s)) ===\n{text.getvalue()}")
+    return files
+
+def _dump_samples(base, out):
+    samples = dict(_samples)
+    path = f"{base}-samples.folded"
+    with open(path, "w", encoding="utf-8") as f:
+        for (key, stack), count in sorted(samples.items()):
+            f.write(f"{';'.join((key,) + stack)} {count}\n")
+    per_thread, leaves = Counter(), Counter()
+    for (key, stack), count in samples.items():
+        per_thread[key] += count
+        if stack:
+            leaves[(key, stack[-1])] += count
+    total = sum(per_thread.values()) or 1
+    out.write(f"\n=== Stichproben ({total}) ===\n")
+    for key, count in per_thread.most_common():
+        out.write(f"{100 * count / total:6.1f} %  {key}\n")
+        for (_, leaf), n in [item for item in leaves.most_common() if item[0][0] == key][:5]:
+            out.write(f"         {100 * n / total:6.1f} %  {leaf}\n")
+    return [path]
+
+## @brief Snapshot sofort schreiben (C, schnell); die Auswertung gruppiert jede Allokation
+#  in Python und dauert bei großem Heap Sekunden – sie läuft daher in einem eigenen Thread.
+def _dump_memory(base, out):
+    snapshot = tracemalloc.take_snapshot()
+    path = f"{base}.tracemalloc"
+    snapshot.dump(path)
+    current, peak = tracemalloc.get_traced_memory()
+    out.write(f"\n=== tracemalloc: aktuell {current >> 10} KiB, Spitze {peak >> 10} KiB "
+              f"(Auswertung: {base}-memory.txt) ===\n")
+    threading.Thread(target=_analyse_memory, args=(snapshot, f"{base}-memory.txt"),
+                     name="profile-memory", daemon=True).start()
+    return [path]
+
+## @brief Größte Allokationsorte & Zuwachs seit dem letzten Abzug (Auswertungsthread).
+#  Der Zuwachs wird aus den gemerkten Statistiken berechnet, statt beide Snapshots
+#  erneut zu gruppieren (Snapshot.compare_to).
+def _analyse_memory(snapshot, path):
+    global _last_stats
+    _stop_cprofile()  # die Auswertung selbst nicht mitmessen
+    with _memory_lock:
+        try:
+            stats = snapshot.statistics("lineno")
+            lines = [f"=== tracemalloc: {len(snapshot.traces)} Allokationen ==="]
+            lines += [str(stat) for stat in stats[:TOP]]
+            if _last_stats is not None:
+                diffs = []
+                for stat in stats:
+                    old = _last_stats.pop(stat.traceback, None)
+                    diffs.append(tracemalloc.StatisticDiff(
+                        stat.traceback, stat.size, stat.size - (old.size if old else 0),
+                        stat.count, stat.count - (old.count if old else 0)))
+                for old in _last_stats.values():
+                    diffs.append(tracemalloc.StatisticDiff(old.traceback, 0, -old.size, 0, -old.count))
+                diffs.sort(key=lambda d: (abs(d.size_diff), d.size, abs(d.count_diff), d.count), reverse=True)
+                lines += ["", "--- Zuwachs seit dem letzten Abzug ---"] + [str(d) for d in diffs[:TOP]]
+            _last_stats = {stat.traceback: stat for stat in stats}
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            print(f"{YELLOW}[PROFIL] Speicherauswertung geschrieben: {path}{RESET}")
+        except Exception as e:
+            print(f"{YELLOW}[PROFIL] Speicherauswertung fehlgeschlagen: {e}{RESET}")
+
+## 4) Schreibt den Stand aller aktiven Modi nach profile_dir (SIGUSR1-Handler, Prozess läuft weiter).
+#  @return Liste der geschriebenen Dateien.
+def dump(signum=None, frame=None):
+    os.makedirs(_dir, exist_ok=True)
+    base = os.path.join(_dir, f"{_process}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}")
+    out = io.StringIO()
+    files = []
+    try:
+        if "cprofile" in _active:
+            files += _dump_cprofile(base, out)
+        if "sample" in _active:
+            files += _dump_samples(base, out)
+        if "memory" in _active:
+            files += _dump_memory(base, out)
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        files.append(f"{base}.txt")
+        print(f"{YELLOW}[PROFIL] {len(files)} Datei(en) geschrieben: {base}.txt{RESET}")
+    except Exception as e:  # ein fehlgeschlagener Abzug darf den Prozess nicht beenden
+        print(f"{YELLOW}[PROFIL] Abzug fehlgeschlagen: {e}{RESET}")
+    return files
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+## @file receive_ring.py
+#  @brief Entkoppelter UDP-Empfang: Stoßweise lesen, begrenzt puffern, getrennt verarbeiten
+#  @details
+#  Bisher verarbeitete der Empfangsthread jedes Datagramm selbst (Parsen, Offline-Speicher,
+#  Autoreply, CLI). Solange er damit beschäftigt war, las niemand den Socket, und bei
+#  einem Stoß lief der Kernel-Puffer über. Jetzt liest ein Thread nur noch – so viele
+#  Datagramme wie ohne Warten vorliegen – in einen begrenzten Ring; ein zweiter Thread
+#  verarbeitet sie in Empfangsreihenfolge.
+#  Überlaufregel: Ist der Ring voll, werden neu eintreffende Datagramme verworfen
+#  (Tail-Drop) und als bymy_datagrams_dropped_total{reason="queue_full"} gezählt.
+#  Bereits angenommene Datagramme bleiben erhalten; RMSG wiederholt der Sender,
+#  eine verlorene DELTA-Seite fällt über die Epoche auf (neues WHO).
+#  Struktur & Ablauf:
+#   1) set_rcvbuf – Kernel-Empfangspuffer vergrößern (config.toml: udp_rcvbuf)
+#   2) DatagramRing – begrenzte Warteschlange (config.toml: receive_queue)
+#   3) drain – ein blockierendes recvfrom, danach bis zu BATCH ohne Warten
+
+import socket, threading
+from collections import deque
+
+UDP_RCVBUF = 4 * 1024 * 1024
+RING_SIZE = 8192
+BATCH = 64
+
+## 1) Setzt den Kernel-Empfangspuffer.
+#  SO_RCVBUF wird auf net.core.rmem_max begrenzt; mit CAP_NET_ADMIN (z.B. als root)
+#  gilt SO_RCVBUFFORCE auch darüber. Der Kernel meldet den doppelten Wert (Verwaltungsanteil).
+#  @param sock UDP-Socket.
+#  @param size Gewünschte Größe in Bytes (0 → Systemvorgabe behalten).
+#  @return Tatsächliche Größe laut Kernel.
+def set_rcvbuf(sock, size):
+    if size > 0:
+        for option in (getattr(socket, "SO_RCVBUFFORCE", None), socket.SO_RCVBUF):
+            if option is None:
+                continue
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, option, size)
+                break
+            except OSError:
+                pass
+    return sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+## 2) Begrenzte Warteschlange zwischen Empfangs- und Verarbeitungsthread.
+class DatagramRing:
+    ## @brief Legt einen leeren Ring an.
+    #  @param capacity Maximale Anzahl gepufferter Datagramme.
+    def __init__(self, capacity=RING_SIZE):
+        self.capacity = capacity
+        self.items = deque()
+        self.cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.items)
+
+    ## @brief Hängt einen Stoß an (ein Lock & höchstens ein Wecken pro Stoß).
+    #  @param batch Liste von (daten, addr).
+    #  @return Anzahl verworfener Datagramme (Ring voll).
+    def put_batch(self, batch):
+        with self.cond:
+            room = self.capacity - len(self.items)
+            self.items.extend(batch[:room])
+            self.cond.notify()
+        return max(0, len(batch) - room)
+
+    ## @brief Entnimmt alles Vorliegende (wartet, solange der Ring leer ist).
+    #  @param limit Höchstens so viele Datagramme.
+    #  @return Liste von (daten, addr).
+    def get_batch(self, limit=BATCH):
+        with self.cond:
+            while not self.items:
+                self.cond.wait()
+            return [self.items.popleft() for _ in range(min(limit, len(self.items)))]
+
+## 3) Liest einen Stoß: wartet auf das erste Datagramm, holt dann alles ohne Warten Vorliegende.
+#  @param sock Blockierender UDP-Socket.
+#  @param limit Höchstens so viele Datagramme.
+#  @return Liste von (daten, addr), mindestens ein Eintrag.
+#  @throws OSError bei Socket-Fehlern vor dem ersten Datagramm.
+def drain(sock, limit=BATCH):
+    batch = [sock.recvfrom(65535)]
+    try:
+        while len(batch) < limit:
+            batch.append(sock.recvfrom(65535, socket.MSG_DONTWAIT))
+    except OSError:  # BlockingIOError: nichts mehr da; andere Fehler meldet der nächste Aufruf
+        pass
+    return batch
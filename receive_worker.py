@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+## @file receive_worker.py
+#  @brief Zusätzlicher UDP-Empfangsprozess des Netzwerkprozesses (SO_REUSEPORT)
+#  @details
+#  Wird von network_process.py gestartet (config.toml: receive_workers = N pro Port).
+#  Alle Empfangs-Sockets eines Ports bilden eine SO_REUSEPORT-Gruppe; der Kernel
+#  verteilt die Datagramme nach Absender (Quell-IP/-Port) auf die Prozesse.
+#  Struktur & Ablauf:
+#   1) bind_reuseport – Socket der Gruppe anlegen (auch vom Hauptprozess genutzt)
+#   2) classify – MSG direkt als fertigen CLI-Rahmen kodieren, alles andere
+#      (Teilnehmerliste, RMSG, Abwesenheit) roh an den Hauptprozess weiterreichen,
+#      der die Peer-Tabelle und den einzigen CLI-Kanal besitzt
+#   3) run – Datagramme stoßweise lesen (select + bis zu BATCH ohne Warten)
+#      und je Stoß mit einem sendall an den Hauptprozess übergeben
+#  Aufzeichnungsformat zum Hauptprozess: RECORD_HEADER (Art, Anzahl, Länge) + Nutzdaten.
+#   C: Anzahl fertige CLI-Rahmen hintereinander (werden unverändert durchgereicht)
+#   R: ein Datagramm als "<ip> <port> <daten>" für handle_datagram
+
+import os, sys, socket, struct, select
+from config_handler import get_config, watch_config
+from ipc_channel import encode_frame
+from receive_ring import UDP_RCVBUF, BATCH, set_rcvbuf
+
+AWAY_FLAG = "away.flag"
+RECORD_HEADER = struct.Struct("!cII")
+KIND_CLI = b"C"
+KIND_RAW = b"R"
+
+## 1) UDP-Socket als Mitglied einer SO_REUSEPORT-Gruppe.
+#  @param port UDP-Port.
+#  @param rcvbuf Kernel-Empfangspuffer (config.toml: udp_rcvbuf).
+#  @return Gebundener Socket.
+def bind_reuseport(port, rcvbuf=UDP_RCVBUF):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    set_rcvbuf(sock, rcvbuf)
+    sock.bind(("", port))
+    return sock
+
+## @brief Kodiert eine Aufzeichnung für den Hauptprozess.
+def encode_record(kind, count, payload):
+    return RECORD_HEADER.pack(kind, count, len(payload)) + payload
+
+## 2) Verarbeitet einen Stoß Datagramme.
+#  @param batch Liste von (daten, addr).
+#  @param handle Eigener Name (eigene MSG werden verworfen).
+#  @param away True im Abwesenheitsmodus (MSG gehen dann an den Hauptprozess).
+#  @return Bytes zum Senden an den Hauptprozess.
+def classify(batch, handle, away):
+    frames, records = [], []
+    for data, addr in batch:
+        if not away and data.startswith(b"MSG "):
+            parts = data.decode("utf-8", errors="ignore").strip().split(" ", 2)
+            if len(parts) == 3:
+                if parts[1] != handle:
+                    frames.append(encode_frame(f"MSG {parts[1]} {parts[2]}"))
+                continue
+        if frames:  # Reihenfolge innerhalb des Stoßes bleibt erhalten
+            records.append(encode_record(KIND_CLI, len(frames), b"".join(frames)))
+            frames = []
+        records.append(encode_record(KIND_RAW, 1, f"{addr[0]} {addr[1]} ".encode() + data))
+    if frames:
+        records.append(encode_record(KIND_CLI, len(frames), b"".join(frames)))
+    return b"".join(records)
+
+## 3) Empfangsschleife; endet, wenn der Hauptprozess die Verbindung schließt.
+#  Ein select pro Stoß (nicht pro Datagramm) wartet auf Daten oder das Ende des Hauptprozesses.
+#  @param port UDP-Port.
+#  @param upstream Verbundener Socket zum Hauptprozess.
+def run(port, upstream):
+    config = get_config()
+    watch_config(config.update)
+    sock = bind_reuseport(port, int(config.get("udp_rcvbuf", UDP_RCVBUF)))
+    sock.setblocking(False)
+    while True:
+        readable, _, _ = select.select([sock, upstream], [], [])
+        if upstream in readable:
+            return  # EOF: Hauptprozess beendet
+        batch = []
+        try:
+            while len(batch) < BATCH:
+                batch.append(sock.recvfrom(65535))
+        except BlockingIOError:
+            pass
+        out = classify(batch, config["handle"], os.path.exists(AWAY_FLAG))
+        if out:
+            try:
+                upstream.sendall(out)
+            except OSError:
+                return
+
+if __name__ == "__main__":
+    port, fd = int(sys.argv[1]), int(sys.argv[2])
+    try:
+        run(port, socket.socket(fileno=fd))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+
+## @file reliable.py
+#  @brief Zuverlässige, gefensterte Zustellung von Chat-Nachrichten über UDP
+#  @details
+#  send_msg schickt sonst ein einzelnes MSG-Datagramm ohne Bestätigung. Dieses
+#  Modul ergänzt optional (config.toml: reliable_delivery) einen Modus mit
+#  Sequenznummern pro Peer, Schiebefenster, selektiven Bestätigungen, adaptiver
+#  Wartezeit bis zur Wiederholung (RTO nach Jacobson/Karels, Karn) und eigener
+#  Fragmentierung langer Texte unterhalb der MTU.
+#
+#  Protokoll (Antworten gehen an die Absenderadresse des Datagramms, d.h. an den
+#  eigenen Socket des Endpoints, nicht an den Chat-Port):
+#   RSYN <absender> [<verfahren>]                      → RSYNACK <empfänger> [<verfahren>]
+#   RMSG <absender> <sitzung> <seq> <i>/<n>[/<verfahren>] <daten>
+#                                                      → RACK <empfänger> <sitzung> <kumulativ> <a-b,c-d|->
+#   (unbekannte Sitzung, seq > 1)                      → RRST <empfänger> <sitzung>
+#  Alte Peers kennen RSYN nicht und antworten nicht; an sie geht weiter ein
+#  einfaches MSG. Bis die Antwort auf RSYN da ist, wird ebenfalls MSG gesendet.
+#  <verfahren> ist die Liste der Kompressionsverfahren (compression.py, z.B.
+#  "zlib,lzma"); längere Texte an Peers, die eines davon angekündigt haben, gehen
+#  komprimiert (Fragmente sind dann Binärdaten, /<verfahren> in jedem Fragment).
+#
+#  Struktur & Ablauf:
+#   1) Konstanten & split_bytes (Fragmentierung; der Empfänger setzt Bytes zusammen)
+#   2) _Stream – Senderzustand pro Peer (Fenster, ausstehende Fragmente, RTO)
+#   3) _Inbox – Empfängerzustand pro Absender (Umordnung, Zusammensetzen)
+#   4) Endpoint.send – Fähigkeit prüfen, ggf. komprimieren, fragmentieren & ins Fenster stellen
+#   5) Endpoint.handle_datagram – RSYN/RMSG am Chat-Port annehmen & bestätigen
+#   6) _recv_loop – RSYNACK/RACK/RRST am eigenen Socket verarbeiten
+#   7) _timer_loop – Wiederholung nach RTO, Aufgeben nach MAX_RETRIES
+
+import os, socket, threading, time
+from collections import deque
+import compression, fanout, metrics
+
+## 1) Standardwerte.
+WINDOW = 32              # max. unbestätigte Fragmente pro Peer
+FRAGMENT_BYTES = 1000    # Nutzdaten pro Fragment (Kopf + Text bleibt unter MAX_DATAGRAM)
+INITIAL_RTO = 0.3
+MIN_RTO = 0.02
+MAX_RTO = 2.0
+MAX_RETRIES = 8
+PROBE_TIMEOUT = 2.0      # ohne RSYNACK gilt ein Peer danach als alter Client
+REPROBE_AFTER = 60.0     # alte Clients werden danach erneut geprüft
+SACK_SPAN = 16 * WINDOW  # größte SACK-Spanne, die beim Parsen akzeptiert wird
+MAX_SACK_RANGES = 8
+MAX_MESSAGE_BYTES = 1 << 20  # Obergrenze beim Zusammensetzen & Entpacken einer Nachricht
+
+RETRANSMITS = metrics.counter("bymy_reliable_retransmits_total", "Wiederholte Fragmente")
+DELIVERED = metrics.counter("bymy_reliable_delivered_total", "Zuverlässig empfangene Nachrichten")
+FAILED = metrics.counter("bymy_reliable_failed_total", "Aufgegebene Nachrichten (Fallback auf MSG)")
+RTT = metrics.histogram("bymy_reliable_rtt_seconds", "Gemessene Umlaufzeit (ohne Wiederholungen)")
+
+## @brief Teilt Nutzdaten in Stücke von höchstens `limit` Bytes.
+#  Der Empfänger dekodiert erst die vollständige Nachricht, Zeichengrenzen sind daher egal.
+#  @param data Nachricht (UTF-8 oder komprimiert).
+#  @param limit Maximale Bytes pro Stück.
+#  @return Liste von Bytes (mindestens ein Element).
+def split_bytes(data, limit=FRAGMENT_BYTES):
+    return [data[i:i + limit] for i in range(0, len(data), limit)] or [b""]
+
+def _new_session():
+    return os.urandom(4).hex()
+
+## @brief Formatiert empfangene seqs oberhalb des kumulativen Acks als Bereiche "a-b,c-d".
+def _sack_ranges(seqs):
+    ranges = []
+    for seq in sorted(seqs):
+        if ranges and seq == ranges[-1][1] + 1:
+            ranges[-1][1] = seq
+        else:
+            if len(ranges) == MAX_SACK_RANGES:
+                break
+            ranges.append([seq, seq])
+    return ",".join(f"{a}-{b}" for a, b in ranges) or "-"
+
+def _parse_sack(text):
+    seqs = set()
+    if text == "-":
+        return seqs
+    for part in text.split(","):
+        a, _, b = part.partition("-")
+        if a.isdigit() and b.isdigit() and int(b) - int(a) < SACK_SPAN:
+            seqs.update(range(int(a), int(b) + 1))
+    return seqs
+
+## 2) Senderzustand gegenüber einem Peer.
+class _Stream:
+    def __init__(self, addr):
+        self.addr = addr
+        self.session = _new_session()
+        self.next_seq = 1
+        self.queue = deque()     # [(msg_id, i/n[/verfahren], daten)] warten auf Platz im Fenster
+        self.outstanding = {}    # {seq: [datagramm, gesendet, frist, wiederholungen, msg_id]}
+        self.messages = {}       # {msg_id: [text, offene_fragmente]}
+        self.srtt = None
+        self.rttvar = 0.0
+        self.rto = INITIAL_RTO
+
+    ## @brief Neue RTT-Messung einrechnen (RFC 6298).
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(MAX_RTO, max(MIN_RTO, self.srtt + 4 * self.rttvar))
+        RTT.observe(rtt)
+
+    ## @brief Texte aller noch nicht vollständig bestätigten Nachrichten (in Sendereihenfolge).
+    def unacked(self):
+        return [text for text, left in self.messages.values() if left > 0]
+
+## 3) Empfängerzustand für einen Absender.
+class _Inbox:
+    def __init__(self, session):
+        self.session = session
+        self.expected = 1
+        self.buffer = {}   # {seq: (i, n, text)} außerhalb der Reihenfolge, höchstens ein Fenster
+        self.parts = []    # Fragmente (Bytes) der Nachricht, die gerade zusammengesetzt wird
+        self.size = 0      # Bytes in parts; über MAX_MESSAGE_BYTES wird die Nachricht verworfen (parts = None)
+
+## 4–7) Zuverlässiger Endpunkt eines Netzwerkprozesses.
+class Endpoint:
+    ## @brief Legt den eigenen Socket an und startet Empfangs- & Timer-Thread.
+    #  @param config Config-Dict (handle wird bei jedem Senden gelesen).
+    #  @param deliver Callback(absender, text, id) für vollständig empfangene Nachrichten
+    #                 (id = "<sitzung>.<seq des letzten Fragments>", eindeutig je Absender).
+    #  @param on_fail Callback(handle, [texte]) für Nachrichten, die aufgegeben wurden.
+    #  @param window Max. unbestätigte Fragmente pro Peer.
+    def __init__(self, config, deliver, on_fail, window=WINDOW):
+        self.config = config
+        self.deliver = deliver
+        self.on_fail = on_fail
+        self.window = window
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("", 0))
+        self.lock = threading.Condition()  # Senderzustand & Timer
+        self.inbox_lock = threading.Lock()
+        self.capable = {}   # {handle: (True | False | None=geprüft, zeitpunkt)}
+        self.codecs = {}    # {handle: [verfahren]} laut RSYN/RSYNACK
+        self.streams = {}   # {handle: _Stream}
+        self.inboxes = {}   # {absender: _Inbox}
+        self.msg_ids = 0
+        threading.Thread(target=self._recv_loop, daemon=True).start()
+        threading.Thread(target=self._timer_loop, daemon=True).start()
+
+    ## 4) Stellt eine Nachricht zuverlässig zu, falls der Peer das Protokoll kennt.
+    #  @param handle Empfänger.
+    #  @param addr (ip, port) des Empfängers.
+    #  @param text Nachricht.
+    #  @return True, wenn übernommen; False → Aufrufer sendet einfaches MSG.
+    def send(self, handle, addr, text):
+        now = time.monotonic()
+        with self.lock:
+            state, since = self.capable.get(handle, (None, None))
+            if state is None and since is not None and now - since > PROBE_TIMEOUT:
+                state, since = self.capable[handle] = (False, now)
+            if state is not True:
+                if since is None or (state is False and now - since > REPROBE_AFTER):
+                    state, since = self.capable[handle] = (None, now)
+                if state is None:
+                    # jede Nachricht während der Prüfung wiederholt das RSYN (falls es verloren ging)
+                    self._transmit(self._hello("RSYN").encode("utf-8"), addr)
+                return False
+            stream = self.streams.get(handle)
+            if stream is None:
+                stream = self.streams[handle] = _Stream(addr)
+            stream.addr = addr
+            self._enqueue(stream, text, self._codec(handle))
+            self._fill_window(handle, stream, now)
+            return True
+
+    ## @brief "RSYN"/"RSYNACK" mit eigenem Handle und eigenen Kompressionsverfahren.
+    def _hello(self, cmd):
+        return f"{cmd} {self.config['handle']} {compression.format_list(compression.advertised(self.config))}"
+
+    def _codec(self, handle):
+        return compression.choose(self.config, self.codecs.get(handle, ()))
+
+    def _enqueue(self, stream, text, codec):
+        self.msg_ids += 1
+        payload, codec = compression.compress(codec, text.encode("utf-8"))
+        fragments = split_bytes(payload)
+        suffix = f"/{codec}" if codec else ""
+        stream.messages[self.msg_ids] = [text, len(fragments)]
+        for i, part in enumerate(fragments, 1):
+            stream.queue.append((self.msg_ids, f"{i}/{len(fragments)}{suffix}", part))
+
+    def _fill_window(self, handle, stream, now):
+        me = self.config["handle"]
+        while stream.queue and len(stream.outstanding) < self.window:
+            msg_id, position, part = stream.queue.popleft()
+            seq = stream.next_seq
+            stream.next_seq += 1
+            datagram = f"RMSG {me} {stream.session} {seq} {position} ".encode("utf-8") + part
+            stream.outstanding[seq] = [datagram, now, now + stream.rto, 0, msg_id]
+            self._transmit(datagram, stream.addr)
+        self.lock.notify()
+
+    def _transmit(self, datagram, addr):
+        try:
+            self.sock.sendto(datagram, addr)
+        except OSError:
+            pass
+
+    ## 5) Verarbeitet RSYN/RMSG, die am Chat-Port eintreffen.
+    #  @param data Datagramm als Bytes (Fragmente können komprimiert sein).
+    #  @param addr Absenderadresse (eigener Socket des sendenden Endpoints).
+    #  @return True, wenn das Datagramm zu diesem Protokoll gehört.
+    def handle_datagram(self, data, addr):
+        if data.startswith(b"RSYN "):
+            parts = data.decode("utf-8", errors="ignore").split()
+            if len(parts) in (2, 3):
+                self._mark_capable(parts[1], parts[2] if len(parts) == 3 else None)
+            fanout.send_to(self._hello("RSYNACK"), addr)
+            return True
+        if not data.startswith(b"RMSG "):
+            return False
+        parts = data.split(b" ", 5)
+        if len(parts) < 5 or not parts[3].isdigit():
+            return True
+        sender, session = parts[1].decode("utf-8", errors="ignore"), parts[2].decode("ascii", errors="ignore")
+        seq = int(parts[3])
+        self._mark_capable(sender)
+        i, n, codec = (parts[4].decode("ascii", errors="ignore").split("/") + [None])[:3]
+        if not (i.isdigit() and n.isdigit()) or (codec is not None and codec not in compression.CODECS):
+            return True
+        text = parts[5] if len(parts) == 6 else b""
+        if len(text) > FRAGMENT_BYTES:
+            return True  # größer, als ein Sender je fragmentiert
+        me = self.config["handle"]
+        complete = []
+        with self.inbox_lock:
+            inbox = self.inboxes.get(sender)
+            if inbox is None or inbox.session != session:
+                if seq != 1:
+                    fanout.send_to(f"RRST {me} {session}", addr)
+                    return True
+                inbox = self.inboxes[sender] = _Inbox(session)
+            # nur innerhalb des Empfangsfensters puffern (reliable_window, auf beiden Seiten gleich);
+            # alles dahinter wird weder gespeichert noch bestätigt und später wiederholt
+            if inbox.expected <= seq < inbox.expected + self.window:
+                inbox.buffer[seq] = (int(i), int(n), codec, text)
+                while inbox.expected in inbox.buffer:
+                    fi, fn, fcodec, ftext = inbox.buffer.pop(inbox.expected)
+                    inbox.expected += 1
+                    if inbox.parts is not None:
+                        inbox.size += len(ftext)
+                        inbox.parts.append(ftext)
+                        if inbox.size > MAX_MESSAGE_BYTES:
+                            inbox.parts = None  # zu groß: restliche Fragmente nur noch bestätigen
+                    if fi == fn:
+                        if inbox.parts is not None:
+                            complete.append((f"{session}.{inbox.expected - 1}", fcodec, b"".join(inbox.parts)))
+                        inbox.parts, inbox.size = [], 0
+            ack = f"RACK {me} {session} {inbox.expected - 1} {_sack_ranges(inbox.buffer)}"
+        fanout.send_to(ack, addr)
+        for msg_id, fcodec, payload in complete:
+            if fcodec is not None:
+                try:
+                    payload = compression.decompress(fcodec, payload, MAX_MESSAGE_BYTES)
+                except compression.DecompressError:
+                    continue  # bestätigt, aber unlesbar: verwerfen statt endlos wiederholen
+            DELIVERED.inc()
+            self.deliver(sender, payload.decode("utf-8", errors="ignore"), msg_id)
+        return True
+
+    ## 6) Liest Antworten (RSYNACK/RACK/RRST) am eigenen Socket.
+    def _recv_loop(self):
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(65535)
+            except OSError:
+                return
+            parts = data.decode("utf-8", errors="ignore").split()
+            if len(parts) in (2, 3) and parts[0] == "RSYNACK":
+                self._mark_capable(parts[1], parts[2] if len(parts) == 3 else None)
+            elif len(parts) == 5 and parts[0] == "RACK" and parts[3].isdigit():
+                self._on_ack(parts[1], parts[2], int(parts[3]), _parse_sack(parts[4]))
+            elif len(parts) == 3 and parts[0] == "RRST":
+                self._on_reset(parts[1], parts[2])
+
+    ## @brief Wer RSYN, RSYNACK oder RMSG schickt, beherrscht das Protokoll.
+    #  @param codecs Angekündigte Kompressionsverfahren (nur bei RSYN/RSYNACK).
+    def _mark_capable(self, handle, codecs=None):
+        with self.lock:
+            if codecs is not None:
+                self.codecs[handle] = compression.parse_list(codecs)
+            if self.capable.get(handle, (None,))[0] is not True:
+                self.capable[handle] = (True, time.monotonic())
+
+    def _on_ack(self, handle, session, cumulative, sacked):
+        now = time.monotonic()
+        with self.lock:
+            stream = self.streams.get(handle)
+            if stream is None or stream.session != session:
+                return
+            acked = [seq for seq in stream.outstanding if seq <= cumulative or seq in sacked]
+            for seq in acked:
+                _, sent, _, retries, msg_id = stream.outstanding.pop(seq)
+                if retries == 0:
+                    stream.sample(now - sent)
+                entry = stream.messages.get(msg_id)
+                if entry is not None:
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        del stream.messages[msg_id]
+            # Schnelle Wiederholung: Lücken unterhalb eines selektiv bestätigten Fragments
+            if sacked and stream.srtt is not None:
+                highest = max(sacked)
+                for seq, entry in stream.outstanding.items():
+                    if seq < highest and now - entry[1] > stream.srtt:
+                        self._retransmit(stream, seq, entry, now)
+            self._fill_window(handle, stream, now)
+
+    ## @brief Der Empfänger kennt die Sitzung nicht (z.B. Neustart): neu nummeriert erneut senden.
+    def _on_reset(self, handle, session):
+        with self.lock:
+            stream = self.streams.get(handle)
+            if stream is None or stream.session != session:
+                return
+            texts = stream.unacked()
+            fresh = self.streams[handle] = _Stream(stream.addr)
+            codec = self._codec(handle)
+            for text in texts:
+                self._enqueue(fresh, text, codec)
+            self._fill_window(handle, fresh, time.monotonic())
+
+    def _retransmit(self, stream, seq, entry, now):
+        entry[1] = now
+        entry[3] += 1
+        entry[2] = now + min(MAX_RTO, stream.rto * (2 ** entry[3]))
+        RETRANSMITS.inc()
+        self._transmit(entry[0], stream.addr)
+
+    ## 7) Wiederholt überfällige Fragmente; gibt einen Peer nach MAX_RETRIES auf.
+    def _timer_loop(self):
+        while True:
+            failed = []
+            with self.lock:
+                now = time.monotonic()
+                next_deadline = None
+                for handle, stream in list(self.streams.items()):
+                    for seq, entry in list(stream.outstanding.items()):
+                        if entry[2] <= now:
+                            if entry[3] >= MAX_RETRIES:
+                                failed.append((handle, stream.unacked()))
+                                del self.streams[handle]
+                                self.capable[handle] = (False, now)
+                                break
+                            self._retransmit(stream, seq, entry, now)
+                        if next_deadline is None or entry[2] < next_deadline:
+                            next_deadline = entry[2]
+                if not failed:
+                    self.lock.wait(None if next_deadline is None else max(0.0, next_deadline - now))
+            for handle, texts in failed:
+                FAILED.inc(n=len(texts))
+                self.on_fail(handle, texts)
+
+    ## @brief Anzahl noch unbestätigter Nachrichten (alle Peers).
+    def pending(self):
+        with self.lock:
+            return sum(len(s.messages) for s in self.streams.values())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+## @file renderer.py
+#  @brief Gebündelte, gedrosselte Terminalausgabe eingehender Meldungen (CLI)
+#  @details
+#  Bisher rief listen_pipe_loop für jede MSG-, JOIN- und IMG-Zeile print auf; unter
+#  patch_stdout bedeutet jede Ausgabe Löschen & Neuzeichnen der Eingabezeile. Bei
+#  einem Stoß (viel beschäftigter Peer, JOIN-Sturm) beschäftigte das einen Kern und
+#  die Eingabe hing. Jetzt sammelt der Renderer die Meldungen und gibt sie in Frames
+#  aus – höchstens fps pro Sekunde, jeder Frame ein einziges print.
+#  Struktur & Ablauf:
+#   1) Renderer.post/joined – Meldung bzw. Beitritt vormerken (nur Lock & deque)
+#   2) _compose – ein Frame: Beitritte zusammengefasst ("A, B und 37 weitere …"),
+#      höchstens frame_lines Zeilen, ältere als Hinweis auf /recent
+#   3) _loop – Ausgabethread: wartet auf Meldungen, gibt aus, schläft 1/fps
+#   4) recent/flush – begrenzter Scrollback im Speicher; Rest vor dem Beenden ausgeben
+
+import time, threading
+from collections import deque
+
+RESET = "\033[0m"; YELLOW = "\033[93m"
+
+RENDER_FPS = 10
+FRAME_LINES = 30
+SCROLLBACK = 1000
+JOIN_NAMES = 3   # so viele Namen nennt die Zusammenfassung, der Rest wird gezählt
+
+## 1–4) Ausgabestufe der CLI.
+class Renderer:
+    ## @brief Startet den Ausgabethread.
+    #  @param fps Höchstens so viele Frames pro Sekunde.
+    #  @param frame_lines Höchstens so viele Meldungen pro Frame (neueste zuerst behalten).
+    #  @param scrollback Anzahl gemerkter Meldungen für /recent.
+    #  @param write Ausgabefunktion für einen Frame (Standard: print).
+    def __init__(self, fps=RENDER_FPS, frame_lines=FRAME_LINES, scrollback=SCROLLBACK, write=None):
+        self.interval = 1.0 / max(fps, 1)
+        self.write = write or print
+        self.cond = threading.Condition()
+        self.pending = deque(maxlen=frame_lines)
+        self.skipped = 0     # nicht mehr in den Frame passende Meldungen
+        self.joins = {}      # {handle: None} in Beitrittsreihenfolge
+        self.scrollback = deque(maxlen=scrollback)
+        self.frames = 0
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    ## 1) Merkt eine Meldung für den nächsten Frame vor.
+    #  @param line Fertig formatierte Zeile (ohne Zeilenumbruch).
+    def post(self, line):
+        with self.cond:
+            if len(self.pending) == self.pending.maxlen:
+                self.skipped += 1
+            self.pending.append(line)
+            self.scrollback.append(line)
+            self.cond.notify()
+
+    ## 1) Merkt einen Beitritt vor (mehrere im selben Frame werden zusammengefasst).
+    #  @param handle Name des Nutzers.
+    def joined(self, handle):
+        with self.cond:
+            self.joins[handle] = None
+            self.scrollback.append(f"{handle} ist dem Chat beigetreten.")
+            self.cond.notify()
+
+    ## 2) Baut den Text eines Frames und leert die Vormerkungen (Lock wird gehalten).
+    #  @return Text oder None, wenn nichts anliegt.
+    def _compose(self):
+        if not self.pending and not self.joins:
+            return None
+        lines = []
+        if self.joins:
+            names = list(self.joins)
+            if len(names) == 1:
+                lines.append(f"{names[0]} ist dem Chat beigetreten.")
+            elif len(names) <= JOIN_NAMES + 1:
+                lines.append(f"{', '.join(names[:-1])} und {names[-1]} sind dem Chat beigetreten.")
+            else:
+                lines.append(f"{', '.join(names[:JOIN_NAMES])} und {len(names) - JOIN_NAMES} weitere "
+                             f"sind dem Chat beigetreten.")
+        if self.skipped:
+            lines.append(f"{YELLOW}… {self.skipped} ältere Meldungen übersprungen (/recent zeigt sie){RESET}")
+        lines.extend(self.pending)
+        self.pending.clear()
+        self.joins.clear()
+        self.skipped = 0
+        return "\n" + "\n".join(lines)
+
+    ## 3) Ausgabethread: ein print pro Frame, danach Pause bis zum nächsten Frame.
+    def _loop(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.joins:
+                    self.cond.wait()
+                text = self._compose()
+            self.write(text)
+            self.frames += 1
+            time.sleep(self.interval)
+
+    ## 4) Die letzten Meldungen aus dem Scrollback.
+    #  @param n Anzahl.
+    #  @return Liste von Zeilen (älteste zuerst).
+    def recent(self, n):
+        with self.cond:
+            return list(self.scrollback)[-n:] if n > 0 else []
+
+    ## 4) Gibt Vorgemerktes sofort aus (z.B. vor dem Beenden).
+    def flush(self):
+        with self.cond:
+            text = self._compose()
+        if text is not None:
+            self.write(text)
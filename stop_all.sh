@@ -6,9 +6,9 @@
 #
 # @details
 # Ablauf:
-# 1) Beendet alle Python-Prozesse für CLI, Netzwerk und Discovery.
-# 2) Löscht die Named Pipes.
-# 3) Entfernt Flag-Dateien und gespeicherte Offline-Nachrichten.
+# 1) Beendet alle Python-Prozesse für CLI, Netzwerk, Discovery, Empfangsprozesse und bymy.py.
+# 2) Löscht den IPC-Socket, die Teilnehmertabelle (bymy.peers) und ggf. alte Named Pipes.
+# 3) Entfernt Flag-Dateien (verpasste Nachrichten in receive/offline/ bleiben erhalten).
 #
 # @note Dieses Skript kann gefahrlos mehrfach aufgerufen werden.
 ##
@@ -16,9 +16,12 @@
 pkill -f cli_process.py
 pkill -f network_process.py
 pkill -f discovery_process.py
+pkill -f receive_worker.py
+pkill -f bymy.py
 
 rm -f cli_to_network.pipe
 rm -f network_to_cli.pipe
+rm -f bymy.sock
+rm -f bymy.peers
 
 rm -f away.flag
-rm -f receive/offline_messages.txt
\ No newline at end of file